@@ -0,0 +1,36 @@
+"""
+Create engine_response_cache table for the engine response cache (Postgres backend)
+
+Revision ID: 0007_add_response_cache
+Revises: 0006_add_is_branded
+Create Date: 2025-09-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0007_add_response_cache'
+down_revision = '0006_add_is_branded'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'engine_response_cache',
+        sa.Column('key', sa.String(), primary_key=True),
+        sa.Column('engine', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('response', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    # Used to purge expired entries
+    op.create_index('ix_engine_response_cache_expires_at', 'engine_response_cache', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_engine_response_cache_expires_at', table_name='engine_response_cache')
+    op.drop_table('engine_response_cache')
@@ -0,0 +1,46 @@
+"""
+Create query_jobs table (durable queue for scheduled query batches)
+
+Revision ID: 0008_create_query_jobs
+Revises: 0007_add_response_cache
+Create Date: 2025-09-03 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_create_query_jobs'
+down_revision = '0007_add_response_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'query_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('batch_date', sa.Date(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('query', sa.Text(), nullable=False),
+        sa.Column('engine', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('intent', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('run_id', sa.String(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint('batch_date', 'seq', name='uq_query_jobs_batch_seq'),
+    )
+    # Claim scans filter by batch and status
+    op.create_index('ix_query_jobs_batch_status', 'query_jobs', ['batch_date', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_query_jobs_batch_status', table_name='query_jobs')
+    op.drop_table('query_jobs')
@@ -0,0 +1,107 @@
+"""
+Create run_citations and run_entities (normalized links/entities of runs) and backfill them
+
+Revision ID: 0009_run_citations_entities
+Revises: 0008_create_query_jobs
+Create Date: 2025-09-05 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_run_citations_entities'
+down_revision = '0008_create_query_jobs'
+branch_labels = None
+depends_on = None
+
+# Lowercased netloc without www. (matches run_children.citation_domain / extract.to_domains)
+DOMAIN_SQL = r"coalesce(regexp_replace(lower(substring({url} from '^[^:/?#]+://([^/?#]*)')), '^www\.', ''), '')"
+
+# automated_runs JSON columns may hold the array serialized as a JSON string
+JSON_ARRAY_SQL = """
+    CASE
+        WHEN json_typeof({col}) = 'array' THEN {col}
+        WHEN json_typeof({col}) = 'string' AND left(ltrim({col} #>> '{{}}'), 1) = '[' THEN ({col} #>> '{{}}')::json
+        ELSE '[]'::json
+    END
+"""
+
+
+def _backfill_citations(source: str, elements_sql: str, ts_sql: str) -> None:
+    url = "CASE json_typeof(l.e) WHEN 'string' THEN l.e #>> '{}' WHEN 'object' THEN l.e ->> 'url' END"
+    op.execute(f"""
+        INSERT INTO run_citations (run_source, run_id, rank, ts, url, domain, is_brand_domain)
+        SELECT '{source}', r.id, l.ord, {ts_sql}, c.url, {DOMAIN_SQL.format(url='c.url')},
+               strpos({DOMAIN_SQL.format(url='c.url')}, 'extremenetworks.com') > 0
+        FROM {source} r
+        CROSS JOIN LATERAL json_array_elements({elements_sql}) WITH ORDINALITY AS l(e, ord)
+        CROSS JOIN LATERAL (SELECT {url} AS url) c
+        WHERE coalesce(c.url, '') <> ''
+    """)
+
+
+def _backfill_entities(source: str, elements_sql: str, ts_sql: str) -> None:
+    name = "CASE json_typeof(l.e) WHEN 'string' THEN l.e #>> '{}' WHEN 'object' THEN coalesce(l.e ->> 'name', l.e ->> 'entity') END"
+    op.execute(f"""
+        INSERT INTO run_entities (run_source, run_id, rank, ts, name, first_pos, is_brand)
+        SELECT '{source}', r.id, l.ord, {ts_sql}, n.name,
+               CASE WHEN json_typeof(l.e) = 'object' AND (l.e ->> 'first_pos') ~ '^[0-9]+$'
+                    THEN (l.e ->> 'first_pos')::int END,
+               lower(n.name) IN ('extreme networks', 'extremenetworks')
+        FROM {source} r
+        CROSS JOIN LATERAL json_array_elements({elements_sql}) WITH ORDINALITY AS l(e, ord)
+        CROSS JOIN LATERAL (SELECT {name} AS name) n
+        WHERE coalesce(n.name, '') <> ''
+    """)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'run_citations',
+        sa.Column('run_source', sa.String(), primary_key=True),
+        sa.Column('run_id', sa.String(), primary_key=True),
+        sa.Column('rank', sa.Integer(), primary_key=True),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('url', sa.Text(), nullable=False),
+        sa.Column('domain', sa.String(), nullable=False),
+        sa.Column('is_brand_domain', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_table(
+        'run_entities',
+        sa.Column('run_source', sa.String(), primary_key=True),
+        sa.Column('run_id', sa.String(), primary_key=True),
+        sa.Column('rank', sa.Integer(), primary_key=True),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('first_pos', sa.Integer(), nullable=True),
+        sa.Column('is_brand', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+    # Backfill before indexing so the bulk insert does not maintain indexes row by row
+    runs_ts = "r.ts AT TIME ZONE 'UTC'"
+    _backfill_citations('runs', "CASE WHEN jsonb_typeof(r.links) = 'array' THEN r.links::json ELSE '[]'::json END", runs_ts)
+    _backfill_entities(
+        'runs',
+        """CASE WHEN jsonb_typeof(r.vendors) = 'array' AND jsonb_array_length(r.vendors) > 0 THEN r.vendors::json
+                WHEN jsonb_typeof(r.entities_normalized) = 'array' THEN r.entities_normalized::json
+                ELSE '[]'::json END""",
+        runs_ts,
+    )
+    _backfill_citations('automated_runs', JSON_ARRAY_SQL.format(col='r.links'), 'r.ts')
+    _backfill_entities('automated_runs', JSON_ARRAY_SQL.format(col='r.entities_normalized'), 'r.ts')
+
+    # Leaderboards filter by window and group by domain / entity name
+    op.create_index('ix_run_citations_source_ts', 'run_citations', ['run_source', 'ts'])
+    op.create_index('ix_run_citations_domain', 'run_citations', ['domain'])
+    op.create_index('ix_run_entities_source_ts', 'run_entities', ['run_source', 'ts'])
+    op.create_index('ix_run_entities_name', 'run_entities', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_run_entities_name', table_name='run_entities')
+    op.drop_index('ix_run_entities_source_ts', table_name='run_entities')
+    op.drop_index('ix_run_citations_domain', table_name='run_citations')
+    op.drop_index('ix_run_citations_source_ts', table_name='run_citations')
+    op.drop_table('run_entities')
+    op.drop_table('run_citations')
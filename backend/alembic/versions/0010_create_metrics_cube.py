@@ -0,0 +1,65 @@
+"""
+Create metrics_cube and metrics_cube_facets (additive per-day rollups of runs)
+
+Existing runs are folded in with scripts/rebuild_metrics_cube.py; new runs are added as they are written.
+
+Revision ID: 0010_create_metrics_cube
+Revises: 0009_run_citations_entities
+Create Date: 2025-09-06 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_create_metrics_cube'
+down_revision = '0009_run_citations_entities'
+branch_labels = None
+depends_on = None
+
+
+def _cell_key() -> list:
+    return [
+        sa.Column('run_source', sa.String(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('engine', sa.String(), primary_key=True),
+        sa.Column('model', sa.String(), primary_key=True, server_default=''),
+        sa.Column('intent_category', sa.String(), primary_key=True, server_default=''),
+        sa.Column('is_branded', sa.Boolean(), primary_key=True, server_default=sa.false()),
+    ]
+
+
+def upgrade() -> None:
+    counters = [
+        'runs', 'failures', 'brand_mentions', 'runs_with_links', 'runs_with_entities',
+        'citations', 'brand_citations', 'entity_mentions', 'mention_citations', 'mention_domains',
+        'priced_runs', 'latency_runs', 'scored_citations',
+    ]
+    op.create_table(
+        'metrics_cube',
+        *_cell_key(),
+        *[sa.Column(name, sa.Integer(), nullable=False, server_default='0') for name in counters],
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('cost_usd', sa.Numeric(18, 6), nullable=False, server_default='0'),
+        sa.Column('latency_ms_sum', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('quality_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_table(
+        'metrics_cube_facets',
+        *_cell_key(),
+        sa.Column('facet', sa.String(), primary_key=True),
+        sa.Column('value', sa.String(), primary_key=True),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('runs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rank_sum', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    # Leaderboards read one facet of one source over a day range
+    op.create_index('ix_metrics_cube_facets_facet_day', 'metrics_cube_facets', ['run_source', 'facet', 'day'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_metrics_cube_facets_facet_day', table_name='metrics_cube_facets')
+    op.drop_table('metrics_cube_facets')
+    op.drop_table('metrics_cube')
@@ -0,0 +1,38 @@
+"""
+Create dirty_metrics_partitions (daily_metrics partitions waiting to be recomputed)
+
+Automated runs never marked metrics_computed are queued, so the first processor pass fills their days.
+
+Revision ID: 0011_dirty_metrics_partitions
+Revises: 0010_create_metrics_cube
+Create Date: 2025-09-07 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011_dirty_metrics_partitions'
+down_revision = '0010_create_metrics_cube'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dirty_metrics_partitions',
+        sa.Column('run_source', sa.String(), primary_key=True),
+        sa.Column('date', sa.Date(), primary_key=True),
+        sa.Column('engine', sa.String(), primary_key=True),
+        sa.Column('marked_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.execute("""
+        INSERT INTO dirty_metrics_partitions (run_source, date, engine, marked_at)
+        SELECT DISTINCT 'automated_runs', ts::date, engine, now()
+        FROM automated_runs
+        WHERE NOT coalesce(metrics_computed, false)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('dirty_metrics_partitions')
@@ -0,0 +1,30 @@
+"""
+Create data_versions (counters that invalidate cached /metrics responses)
+
+Revision ID: 0012_create_data_versions
+Revises: 0011_dirty_metrics_partitions
+Create Date: 2025-09-08 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_create_data_versions'
+down_revision = '0011_dirty_metrics_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.execute("INSERT INTO data_versions (name, version, updated_at) VALUES ('metrics', 0, now())")
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
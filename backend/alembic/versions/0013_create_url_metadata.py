@@ -0,0 +1,36 @@
+"""
+Create url_metadata (citation page titles cached per normalized URL, including failures)
+
+Revision ID: 0013_create_url_metadata
+Revises: 0012_create_data_versions
+Create Date: 2025-09-09 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_create_url_metadata'
+down_revision = '0012_create_data_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_metadata',
+        sa.Column('url', sa.Text(), primary_key=True),
+        sa.Column('domain', sa.String(), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    # Used to find stale entries to refetch or purge
+    op.create_index('ix_url_metadata_expires_at', 'url_metadata', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_url_metadata_expires_at', table_name='url_metadata')
+    op.drop_table('url_metadata')
@@ -0,0 +1,32 @@
+"""
+Add runs.query_norm (normalized query text) with exact-match and pg_trgm indexes for run lookup
+
+Revision ID: 0014_add_runs_query_norm
+Revises: 0013_create_url_metadata
+Create Date: 2025-09-10 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0014_add_runs_query_norm'
+down_revision = '0013_create_url_metadata'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    op.execute("ALTER TABLE runs ADD COLUMN IF NOT EXISTS query_norm text;")
+    # Same rule as services.run_lookup.normalize_query
+    op.execute("UPDATE runs SET query_norm = btrim(regexp_replace(lower(query), '[^a-z0-9]+', ' ', 'g')) WHERE query_norm IS NULL;")
+
+    # Exact match within a time window; trigram similarity (%) for near-duplicates
+    op.execute("CREATE INDEX IF NOT EXISTS ix_runs_query_norm_ts ON runs (query_norm, ts);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_runs_query_norm_trgm ON runs USING gin (query_norm gin_trgm_ops);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_runs_query_norm_trgm;")
+    op.execute("DROP INDEX IF EXISTS ix_runs_query_norm_ts;")
+    op.execute("ALTER TABLE runs DROP COLUMN IF EXISTS query_norm;")
@@ -0,0 +1,31 @@
+"""
+Add daily_metrics.run_source to the primary key so runs and automated_runs metrics of one day coexist
+
+Revision ID: 0015_add_daily_metrics_run_source
+Revises: 0014_add_runs_query_norm
+Create Date: 2025-09-12 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0015_add_daily_metrics_run_source'
+down_revision = '0014_add_runs_query_norm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows cannot tell which table they came from; they are labelled runs, and
+    # scripts/backfill_daily_metrics.py --source automated_runs rebuilds the automated ones
+    op.execute("ALTER TABLE daily_metrics ADD COLUMN IF NOT EXISTS run_source varchar NOT NULL DEFAULT 'runs';")
+    op.execute("ALTER TABLE daily_metrics DROP CONSTRAINT IF EXISTS daily_metrics_pkey;")
+    op.execute("ALTER TABLE daily_metrics ADD PRIMARY KEY (date, engine, brand_context, run_source);")
+
+
+def downgrade() -> None:
+    # Keep one row per (date, engine, brand_context) before restoring the narrower key
+    op.execute("DELETE FROM daily_metrics WHERE run_source <> 'runs' AND EXISTS (SELECT 1 FROM daily_metrics r WHERE r.run_source = 'runs' AND r.date = daily_metrics.date AND r.engine = daily_metrics.engine AND r.brand_context = daily_metrics.brand_context);")
+    op.execute("ALTER TABLE daily_metrics DROP CONSTRAINT IF EXISTS daily_metrics_pkey;")
+    op.execute("ALTER TABLE daily_metrics ADD PRIMARY KEY (date, engine, brand_context);")
+    op.execute("ALTER TABLE daily_metrics DROP COLUMN IF EXISTS run_source;")
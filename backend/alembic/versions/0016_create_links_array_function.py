@@ -0,0 +1,47 @@
+"""
+Create links_array(json): automated_runs.links as a JSON array, tolerating malformed legacy strings
+
+Revision ID: 0016_create_links_array_function
+Revises: 0015_add_daily_metrics_run_source
+Create Date: 2025-09-14 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0016_create_links_array_function'
+down_revision = '0015_add_daily_metrics_run_source'
+branch_labels = None
+depends_on = None
+
+# Older rows hold the array serialized as a JSON string; one that does not parse must read as [] instead
+# of failing the whole aggregate, like the Python path that skipped bad rows
+LINKS_ARRAY_FUNCTION = """
+CREATE OR REPLACE FUNCTION links_array(links json) RETURNS json
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    IF json_typeof(links) = 'array' THEN
+        RETURN links;
+    END IF;
+    IF json_typeof(links) = 'string' AND left(ltrim(links #>> '{}'), 1) = '[' THEN
+        BEGIN
+            links := (links #>> '{}')::json;
+        EXCEPTION WHEN invalid_text_representation THEN
+            RETURN '[]'::json;
+        END;
+        IF json_typeof(links) = 'array' THEN
+            RETURN links;
+        END IF;
+    END IF;
+    RETURN '[]'::json;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    op.execute(LINKS_ARRAY_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS links_array(json);")
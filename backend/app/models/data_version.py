@@ -0,0 +1,11 @@
+from __future__ import annotations
+from sqlalchemy import Column, String, BigInteger, DateTime
+from ..services.database import Base
+
+#data versions are counters bumped in every transaction that changes the data behind cached dashboard responses
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)  # "metrics"
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
@@ -7,10 +7,12 @@ from ..services.database import Base
 class DailyMetrics(Base):
     __tablename__ = "daily_metrics"
 
-    # Composite primary key: date + engine + brand_context
+    # Composite primary key: date + engine + brand_context + run_source
     date = Column(Date, primary_key=True, nullable=False)
     engine = Column(String, primary_key=True, nullable=False)
     brand_context = Column(String, primary_key=True, nullable=False)  # "extreme_networks", "competitors", "overall"
+    # Table the metrics were computed from ("runs" or "automated_runs"); each source recomputes only its own rows
+    run_source = Column(String, primary_key=True, nullable=False, default="runs")
     
     # Run counts and costs
     total_runs = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+from sqlalchemy import Column, BigInteger, Integer, String, Date, DateTime, Numeric, Boolean, Float, Index
+from ..services.database import Base
+
+#the metrics cube holds additive per-day rollups of runs so dashboard windows sum O(days) rows instead of scanning runs
+class MetricsCube(Base):
+    __tablename__ = "metrics_cube"
+
+    # Cell key: run_source + day + engine + model + intent_category + is_branded
+    run_source = Column(String, primary_key=True)  # parent table: "runs" or "automated_runs"
+    day = Column(Date, primary_key=True)  # UTC day of the run's ts
+    engine = Column(String, primary_key=True)
+    model = Column(String, primary_key=True, default="")  # "" when the run has no model
+    intent_category = Column(String, primary_key=True, default="")  # runs.intent / automated_runs.intent_category, "" when unset
+    is_branded = Column(Boolean, primary_key=True, default=False)
+
+    # Run counts
+    runs = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)  # status other than ok/completed
+    brand_mentions = Column(Integer, nullable=False, default=0)  # runs with extreme_mentioned
+    runs_with_links = Column(Integer, nullable=False, default=0)
+    runs_with_entities = Column(Integer, nullable=False, default=0)
+
+    # Citation and entity totals
+    citations = Column(Integer, nullable=False, default=0)
+    brand_citations = Column(Integer, nullable=False, default=0)  # links to extremenetworks.com or a subdomain
+    entity_mentions = Column(Integer, nullable=False, default=0)
+    mention_citations = Column(Integer, nullable=False, default=0)  # citations of runs mentioning Extreme
+    mention_domains = Column(Integer, nullable=False, default=0)  # distinct domains per run, summed over runs mentioning Extreme
+
+    # Cost and performance
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Numeric(18, 6), nullable=False, default=0)
+    priced_runs = Column(Integer, nullable=False, default=0)  # runs with cost_usd > 0
+    latency_ms_sum = Column(BigInteger, nullable=False, default=0)
+    latency_runs = Column(Integer, nullable=False, default=0)  # runs with latency_ms > 0
+
+    # Citation quality (MetricsService heuristic over citations_enriched)
+    scored_citations = Column(Integer, nullable=False, default=0)
+    quality_sum = Column(Float, nullable=False, default=0)
+
+    updated_at = Column(DateTime, nullable=False)
+
+
+#facets are per-cell counts for one value of a facet: "domain" (citations), "entity" (mentions) or "latency" (histogram bucket)
+class MetricsCubeFacet(Base):
+    __tablename__ = "metrics_cube_facets"
+    __table_args__ = (
+        Index("ix_metrics_cube_facets_facet_day", "run_source", "facet", "day"),
+    )
+
+    run_source = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    engine = Column(String, primary_key=True)
+    model = Column(String, primary_key=True, default="")
+    intent_category = Column(String, primary_key=True, default="")
+    is_branded = Column(Boolean, primary_key=True, default=False)
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)  # domain, entity name, or latency bucket upper bound in ms ("inf" for overflow)
+
+    hits = Column(Integer, nullable=False, default=0)  # citations / mentions / runs in the bucket
+    runs = Column(Integer, nullable=False, default=0)  # distinct runs contributing
+    rank_sum = Column(BigInteger, nullable=False, default=0)  # sum of 1-based list positions (entities)
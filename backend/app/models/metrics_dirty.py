@@ -0,0 +1,14 @@
+from __future__ import annotations
+from sqlalchemy import Column, String, Date, DateTime
+from ..services.database import Base
+
+#dirty partitions are the (source, date, engine) slices of daily_metrics whose runs changed since they were last computed
+class DirtyMetricsPartition(Base):
+    __tablename__ = "dirty_metrics_partitions"
+
+    run_source = Column(String, primary_key=True)  # "runs" or "automated_runs"
+    date = Column(Date, primary_key=True)  # UTC day of the changed runs
+    engine = Column(String, primary_key=True)
+
+    # Bumped on every change; the processor only clears a partition if nothing re-marked it meanwhile
+    marked_at = Column(DateTime, nullable=False)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, UniqueConstraint, Index
+from ..services.database import Base
+
+#query jobs are the materialized daily plan; workers claim them so a batch survives crashes and can be drained in parallel
+class QueryJob(Base):
+    __tablename__ = "query_jobs"
+    __table_args__ = (
+        UniqueConstraint("batch_date", "seq", name="uq_query_jobs_batch_seq"),
+        Index("ix_query_jobs_batch_status", "batch_date", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_date = Column(Date, nullable=False)  # date of the daily plan this job belongs to
+    seq = Column(Integer, nullable=False)  # position in the plan; jobs are claimed in this order
+
+    query = Column(Text, nullable=False)
+    engine = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    intent = Column(String, nullable=True)
+
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String, nullable=True)  # worker holding the lease
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # running jobs past this are reclaimed
+
+    run_id = Column(String, nullable=True)  # runs.id written when the job completed
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,15 @@
+from __future__ import annotations
+from sqlalchemy import Column, String
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from ..services.database import Base
+
+#cached normalized engine responses, keyed by a hash of everything that determines the answer
+class ResponseCacheEntry(Base):
+    __tablename__ = "engine_response_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of (engine, model, prompt, temperature, prompt_version, system prompt)
+    engine = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    response = Column(JSONB, nullable=False)  # normalized dict returned by call_engine
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
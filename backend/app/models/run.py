@@ -3,6 +3,13 @@ from sqlalchemy import Column, Integer, String, Text, Boolean, Numeric
 from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
 from ..services.database import Base
 
+
+def _query_norm_default(context) -> str:
+    # Local import to avoid circular deps (run_lookup queries this model)
+    from ..services.run_lookup import normalize_query
+    return normalize_query(context.get_current_parameters().get("query"))
+
+
 #runs are the individual runs that are run by the system, or by the user (through query endpoint)
 class Run(Base):
     __tablename__ = "runs"
@@ -14,6 +21,9 @@ class Run(Base):
     prompt_version = Column(String, nullable=True)
     intent = Column(String, nullable=True)
     query = Column(Text, nullable=False)
+    # Normalized query for /runs/lookup (exact btree and pg_trgm GIN indexes); the default covers single-row
+    # inserts only, multi-row INSERT ... VALUES must pass it (db_writer.run_values does)
+    query_norm = Column(Text, nullable=True, default=_query_norm_default)
     status = Column(String, nullable=False)
 
     latency_ms = Column(Integer, nullable=False, default=0)
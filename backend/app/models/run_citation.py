@@ -0,0 +1,20 @@
+from __future__ import annotations
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
+from ..services.database import Base
+
+#run citations are the links of a run, one row per link, so domain leaderboards are indexed SQL instead of JSON scans
+class RunCitation(Base):
+    __tablename__ = "run_citations"
+    __table_args__ = (
+        Index("ix_run_citations_source_ts", "run_source", "ts"),
+        Index("ix_run_citations_domain", "domain"),
+    )
+
+    run_source = Column(String, primary_key=True)  # parent table: "runs" or "automated_runs"
+    run_id = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 1-based position in the run's links
+    ts = Column(DateTime, nullable=False)  # copied from the parent run for window filters
+
+    url = Column(Text, nullable=False)
+    domain = Column(String, nullable=False)  # lowercased netloc without www.
+    is_brand_domain = Column(Boolean, nullable=False, default=False)  # extremenetworks.com or a subdomain
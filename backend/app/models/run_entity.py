@@ -0,0 +1,20 @@
+from __future__ import annotations
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
+from ..services.database import Base
+
+#run entities are the vendors a run mentions, one row per vendor in answer order, for indexed entity leaderboards
+class RunEntity(Base):
+    __tablename__ = "run_entities"
+    __table_args__ = (
+        Index("ix_run_entities_source_ts", "run_source", "ts"),
+        Index("ix_run_entities_name", "name"),
+    )
+
+    run_source = Column(String, primary_key=True)  # parent table: "runs" or "automated_runs"
+    run_id = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 1-based position in the run's entity list
+    ts = Column(DateTime, nullable=False)  # copied from the parent run for window filters
+
+    name = Column(String, nullable=False)
+    first_pos = Column(Integer, nullable=True)  # character offset of the first mention
+    is_brand = Column(Boolean, nullable=False, default=False)  # Extreme Networks
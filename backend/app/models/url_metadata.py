@@ -0,0 +1,15 @@
+from __future__ import annotations
+from sqlalchemy import Column, String, Text, Integer, DateTime
+from ..services.database import Base
+
+#fetched page metadata per normalized citation URL, shared by every run that cites it; failures are cached too
+class UrlMetadata(Base):
+    __tablename__ = "url_metadata"
+
+    url = Column(Text, primary_key=True)  # normalized (tracking params, fragment and www. stripped)
+    domain = Column(String, nullable=False)
+    title = Column(Text, nullable=True)  # None when the fetch failed or the page had no <title>
+    status_code = Column(Integer, nullable=True)  # None when no response arrived
+    error = Column(String, nullable=True)  # http_error, not_html, no_title, timeout, fetch_error
+    fetched_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -7,34 +7,52 @@ import json
 import time
 import traceback
 import os
-import requests
 
 from ..schemas.query_schemas import QueryRequest, QueryResponse
-from ..services.run_query import run_single_engine, run_single_engine_error
+from ..services.run_query import run_engines
 from ..services.adapters.chatgpt_api import _get_openai_client
-from ..services.extract import extract_competitors, extract_links, to_domains
+from ..services.http_clients import get_http_client
+from ..services.rate_limiter import estimate_tokens
+from ..services.engines import _limiter_for
+from ..services.extract import IncrementalExtractor
 from ..services.pricing import estimate_cost
-from ..services.db_writer import persist_run_to_db
+from ..services.run_writer import enqueue_run
 from ..services.run_query import make_run_id
-from .runs import _enrich_citations, _normalize_entities
+from .runs import _normalize_entities
+from ..services.url_metadata import enrich_citations
 
 #query endpoint 
 router = APIRouter(prefix="/query", tags=["query"])
 
+
+#SSE events for vendors and citations found so far in a streamed answer
+def _extraction_events(sse_event, new_vendors, new_links) -> list[str]:
+    events = [
+        sse_event("entity", {
+            "name": v.name,
+            "first_pos": v.first_pos,
+            "is_brand": (v.name or "").lower() == "extreme networks",
+        })
+        for v in new_vendors
+    ]
+    events.extend(sse_event("citation", {"url": u}) for u in new_links)
+    return events
+
+#holds a rate limiter slot for the whole stream; the generator reports 429/5xx and token usage on the lease.
+#keyed like the non-stream engine calls (resolved model id), so both paths share one budget per upstream model
+def _rate_limited(provider: str, model_id: str, prompt: str, make_gen):
+    with _limiter_for(provider, model_id).acquire(estimate_tokens(prompt)) as lease:
+        yield from make_gen(lease)
+
 #run query endpoint is when user provides a custom query and we run it through the provided model
 @router.post("/run", response_model=QueryResponse)
-def run_query(req: QueryRequest) -> QueryResponse:
+async def run_query(req: QueryRequest) -> QueryResponse:
     if not req.query or len(req.query.strip()) < 3: #validating query length
         raise HTTPException(status_code=400, detail="Query too short.")
 
     ts_iso = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    runs = []
-
-    for eng in req.engines:
-        try:
-            runs.append(run_single_engine(req, eng, ts_iso))
-        except Exception as e:
-            runs.append(run_single_engine_error(req, eng, ts_iso, e))
+    # Engines run concurrently; a failing or timed-out engine becomes its own error run
+    runs = await run_engines(req, ts_iso)
 
     return QueryResponse(status="ok", runs=runs)
 
@@ -58,7 +76,7 @@ def stream_query(
         payload = data if isinstance(data, str) else json.dumps(data)
         return f"event: {event}\ndata: {payload}\n\n"
 
-    def gen():
+    def gen(lease):
         t0 = time.time()
         client = _get_openai_client()
         run_id = make_run_id("openai" if engine == "openai" else "perplexity")
@@ -66,6 +84,7 @@ def stream_query(
         yield sse_event("start", {"run_id": run_id, "ts": ts_iso})
 
         full_text_parts: list[str] = []
+        extractor = IncrementalExtractor()
         input_tokens = 0
         output_tokens = 0
         model_id = model or ("gpt-4o-search-preview" if engine == "openai" else "sonar")
@@ -98,6 +117,7 @@ def stream_query(
                         if isinstance(delta, str) and delta:
                             full_text_parts.append(delta)
                             yield sse_event("delta", {"text": delta})
+                            yield from _extraction_events(sse_event, *extractor.feed(delta))
                         # capture usage if included in streaming chunks (final chunk usually)
                         try:
                             u = getattr(chunk, "usage", None)
@@ -109,12 +129,11 @@ def stream_query(
                     except Exception:
                         continue
 
-                # Persist final run
+                # Persist final run; extraction already ran incrementally, only the tail is left
                 text = "".join(full_text_parts)
-                vendors = extract_competitors(text)
-                links = extract_links(text)
-                domains = to_domains(links)
-                citations_enriched = _enrich_citations(links, max_titles=0)
+                yield from _extraction_events(sse_event, *extractor.finish())
+                vendors, links, domains = extractor.vendors, extractor.links, extractor.domains
+                citations_enriched = enrich_citations(links, max_titles=0)
                 entities_normalized = _normalize_entities([v.model_dump() for v in vendors])
 
                 latency_ms = int((time.time() - t0) * 1000)
@@ -142,9 +161,11 @@ def stream_query(
                     "extreme_mentioned": any((v.name or "").lower() == "extreme networks" for v in vendors),
                     "extreme_rank": next((i for i, v in enumerate(vendors, start=1) if (v.name or "").lower() == "extreme networks"), None),
                 }
-                persist_run_to_db(csv_row)
+                lease.set_tokens(input_tokens + output_tokens)
+                enqueue_run(csv_row)
                 yield sse_event("done", {"run_id": run_id})
             except Exception as e:
+                lease.observe_error(e)
                 # Log full traceback for visibility
                 try:
                     print("STREAM ERROR:", repr(e))
@@ -179,6 +200,7 @@ def stream_query(
                     if content:
                         yield sse_event("delta", {"text": content})
                         full_text_parts.append(content)
+                        yield from _extraction_events(sse_event, *extractor.feed(content))
                     # usage if provided
                     try:
                         usage = getattr(resp, "usage", None)
@@ -189,10 +211,9 @@ def stream_query(
                         pass
                     # Persist final run after fallback
                     text = "".join(full_text_parts)
-                    vendors = extract_competitors(text)
-                    links = extract_links(text)
-                    domains = to_domains(links)
-                    citations_enriched = _enrich_citations(links, max_titles=0)
+                    yield from _extraction_events(sse_event, *extractor.finish())
+                    vendors, links, domains = extractor.vendors, extractor.links, extractor.domains
+                    citations_enriched = enrich_citations(links, max_titles=0)
                     entities_normalized = _normalize_entities([v.model_dump() for v in vendors])
                     latency_ms = int((time.time() - t0) * 1000)
                     cost_usd = estimate_cost(input_tokens, output_tokens, None, model_id)
@@ -218,9 +239,11 @@ def stream_query(
                         "extreme_mentioned": any((v.name or "").lower() == "extreme networks" for v in vendors),
                         "extreme_rank": next((i for i, v in enumerate(vendors, start=1) if (v.name or "").lower() == "extreme networks"), None),
                     }
-                    persist_run_to_db(csv_row)
+                    lease.set_tokens(input_tokens + output_tokens)
+                    enqueue_run(csv_row)
                     yield sse_event("done", {"run_id": run_id})
                 except Exception as e2:
+                    lease.observe_error(e2)
                     # Include error type and message for frontend visibility
                     err_payload = {"message": str(e2), "type": type(e2).__name__}
                     try:
@@ -247,9 +270,9 @@ def stream_query(
                 'stream': True,
             }
             try:
-                with requests.post(url, headers=headers, json=payload, stream=True, timeout=60) as resp:
+                with get_http_client("perplexity").stream("POST", url, headers=headers, json=payload, timeout=60) as resp:
                     resp.raise_for_status()
-                    for raw_line in resp.iter_lines(decode_unicode=True):
+                    for raw_line in resp.iter_lines():
                         if not raw_line:
                             continue
                         if raw_line.startswith(':'):
@@ -270,6 +293,7 @@ def stream_query(
                                     if isinstance(delta, str) and delta:
                                         full_text_parts.append(delta)
                                         yield sse_event('delta', {'text': delta})
+                                        yield from _extraction_events(sse_event, *extractor.feed(delta))
                             except Exception:
                                 pass
                             try:
@@ -280,10 +304,9 @@ def stream_query(
                                 pass
                 # persist
                 text = ''.join(full_text_parts)
-                vendors = extract_competitors(text)
-                links = extract_links(text)
-                domains = to_domains(links)
-                citations_enriched = _enrich_citations(links, max_titles=0)
+                yield from _extraction_events(sse_event, *extractor.finish())
+                vendors, links, domains = extractor.vendors, extractor.links, extractor.domains
+                citations_enriched = enrich_citations(links, max_titles=0)
                 entities_normalized = _normalize_entities([v.model_dump() for v in vendors])
                 latency_ms = int((time.time() - t0) * 1000)
                 cost_usd = estimate_cost(input_tokens, output_tokens, None, model_id)
@@ -309,9 +332,11 @@ def stream_query(
                     'extreme_mentioned': any((v.name or '').lower() == 'extreme networks' for v in vendors),
                     'extreme_rank': next((i for i, v in enumerate(vendors, start=1) if (v.name or '').lower() == 'extreme networks'), None),
                 }
-                persist_run_to_db(csv_row)
+                lease.set_tokens(input_tokens + output_tokens)
+                enqueue_run(csv_row)
                 yield sse_event('done', {'run_id': run_id})
             except Exception as e:
+                lease.observe_error(e)
                 try:
                     print('PPLX STREAM ERROR:', repr(e))
                     traceback.print_exc()
@@ -319,8 +344,9 @@ def stream_query(
                     pass
                 yield sse_event('error', {'message': str(e), 'type': type(e).__name__})
 
+    stream_model = model or ("gpt-4o-search-preview" if engine == "openai" else "sonar")
     return StreamingResponse(
-        gen(),
+        _rate_limited("openai" if engine == "openai" else "perplexity", stream_model, query, gen),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -344,7 +370,7 @@ def stream_query_perplexity(
         payload = data if isinstance(data, str) else json.dumps(data)
         return f"event: {event}\ndata: {payload}\n\n"
 
-    def gen():
+    def gen(lease):
         t0 = time.time()
         api_key = os.getenv('PERPLEXITY_API_KEY')
         if not api_key:
@@ -372,11 +398,12 @@ def stream_query_perplexity(
         input_tokens = 0
         output_tokens = 0
         full_text_parts: list[str] = []
+        extractor = IncrementalExtractor()
 
         try:
-            with requests.post(url, headers=headers, json=payload, stream=True, timeout=60) as resp:
+            with get_http_client("perplexity").stream("POST", url, headers=headers, json=payload, timeout=60) as resp:
                 resp.raise_for_status()
-                for raw_line in resp.iter_lines(decode_unicode=True):
+                for raw_line in resp.iter_lines():
                     if not raw_line:
                         continue
                     if raw_line.startswith(':'):
@@ -399,6 +426,7 @@ def stream_query_perplexity(
                                 if isinstance(delta, str) and delta:
                                     full_text_parts.append(delta)
                                     yield sse_event('delta', {'text': delta})
+                                    yield from _extraction_events(sse_event, *extractor.feed(delta))
                         except Exception:
                             pass
                         # usage occasionally present at end
@@ -411,10 +439,9 @@ def stream_query_perplexity(
 
             # persist final run
             text = ''.join(full_text_parts)
-            vendors = extract_competitors(text)
-            links = extract_links(text)
-            domains = to_domains(links)
-            citations_enriched = _enrich_citations(links, max_titles=0)
+            yield from _extraction_events(sse_event, *extractor.finish())
+            vendors, links, domains = extractor.vendors, extractor.links, extractor.domains
+            citations_enriched = enrich_citations(links, max_titles=0)
             entities_normalized = _normalize_entities([v.model_dump() for v in vendors])
             latency_ms = int((time.time() - t0) * 1000)
             cost_usd = estimate_cost(input_tokens, output_tokens, None, model or 'sonar')
@@ -441,9 +468,11 @@ def stream_query_perplexity(
                 'extreme_mentioned': any((v.name or '').lower() == 'extreme networks' for v in vendors),
                 'extreme_rank': next((i for i, v in enumerate(vendors, start=1) if (v.name or '').lower() == 'extreme networks'), None),
             }
-            persist_run_to_db(csv_row)
+            lease.set_tokens(input_tokens + output_tokens)
+            enqueue_run(csv_row)
             yield sse_event('done', {'run_id': run_id})
         except Exception as e:
+            lease.observe_error(e)
             try:
                 print('PPLX STREAM ERROR:', repr(e))
                 traceback.print_exc()
@@ -452,7 +481,7 @@ def stream_query_perplexity(
             yield sse_event('error', {'message': str(e), 'type': type(e).__name__})
 
     return StreamingResponse(
-        gen(),
+        _rate_limited("perplexity", model or 'sonar', query, gen),
         media_type='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
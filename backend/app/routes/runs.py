@@ -3,20 +3,19 @@
 from __future__ import annotations
 from typing import Any, Dict, List
 import json
-import re
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
-import requests
-import string
-
-# Optional fuzzy similarity fallback
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, desc
 from sqlalchemy.orm import Session
 
 from ..services.database import get_db
+from ..services.run_writer import get_run_writer
+from ..services.dirty_metrics import mark_dirty
+from ..services.metrics_cube import rebuild_cube
+from ..services.run_children import naive_utc
+from ..services.url_metadata import enrich_citations
+from ..services.enrichment_queue import get_enrichment_queue, needs_enrichment
+from ..services.run_lookup import lookup_runs as find_matching_runs
 from ..models.run import Run
 
 
@@ -67,73 +66,6 @@ def _serialize_run(row: Run, include_details: bool = False) -> Dict[str, Any]:
     return base
 
 
-_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
-
-#normalize url to remove tracking params and www.
-def _normalize_url(url: str) -> str:
-    try:
-        p = urlparse(url)
-        # drop tracking params
-        q = [(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not k.lower().startswith(("utm_", "gclid", "fbclid"))]
-        new = p._replace(query=urlencode(q), fragment="")
-        # normalize scheme/netloc casing and strip www.
-        netloc = (new.netloc or "").lower()
-        if netloc.startswith("www."):
-            netloc = netloc[4:]
-        new = new._replace(netloc=netloc)
-        return urlunparse(new)
-    except Exception:
-        return url
-
-#get domain from url using urlparse
-def _domain_from_url(url: str) -> str:
-    try:
-        netloc = urlparse(url).netloc.lower()
-        return netloc[4:] if netloc.startswith("www.") else netloc
-    except Exception:
-        return ""
-
-#fetch title from url using requests scraping
-def _fetch_title(url: str, timeout: float = 2.0) -> str | None:
-    try:
-        resp = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0 (compatible; EGTBot/1.0)"})
-        if resp.status_code >= 400:
-            return None
-        html = resp.text[:200000]  # guard large docs
-        m = _TITLE_RE.search(html)
-        if m:
-            title = re.sub(r"\s+", " ", m.group(1)).strip()
-            return title[:300]
-    except Exception:
-        return None
-    return None
-
-#enriching citations by fetching titles from urls
-def _enrich_citations(links: List[str], max_titles: int = 10) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    seen = set()
-    for rank, raw in enumerate(links or [], start=1):
-        if not isinstance(raw, str) or not raw:
-            continue
-        url_n = _normalize_url(raw)
-        if url_n in seen:
-            continue
-        seen.add(url_n)
-        item = {
-            "url": url_n,
-            "domain": _domain_from_url(url_n),
-            "rank": rank,
-            "title": None,
-        }
-        out.append(item)
-
-    # fetch a few titles
-    for i, item in enumerate(out[:max_titles]):
-        t = _fetch_title(item["url"]) or None
-        if t:
-            item["title"] = t
-    return out
-
 #list runs
 @router.get("")
 def list_runs(limit: int = Query(default=50, ge=1, le=200), offset: int = Query(default=0, ge=0), db: Session = Depends(get_db)) -> Dict[str, Any]:
@@ -146,40 +78,45 @@ def list_runs(limit: int = Query(default=50, ge=1, le=200), offset: int = Query(
 @router.get("/{run_id}")
 def get_run(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     row: Run | None = db.get(Run, run_id)
+    if not row and get_run_writer().pending(run_id):
+        # Just-finished run still in the write-behind buffer; flush it so the read sees it
+        try:
+            get_run_writer().flush()
+        except Exception:
+            pass
+        row = db.get(Run, run_id)
     if not row:
         raise HTTPException(status_code=404, detail="Run not found")
     if row.deleted:
         raise HTTPException(status_code=404, detail="Run not found")
     data = _serialize_run(row, include_details=True)
+    data.update(_enrichment(row, data))
+    return data
 
-    # Use cached enrichment if available; otherwise compute and persist for future requests
-    citations_cached = row.citations_enriched or []
-    entities_cached = row.entities_normalized or []
-    if citations_cached and entities_cached:
-        data["citations"] = citations_cached
-        data["entities"] = entities_cached
-        return data
+#poll for background enrichment of a run (titles/entities) after GET /runs/{id} reported it pending
+@router.get("/{run_id}/enrichment")
+def get_run_enrichment(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    row: Run | None = db.get(Run, run_id)
+    if not row or row.deleted:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"id": run_id, **_enrichment(row, _serialize_run(row, include_details=True))}
 
-    # Prefer enriched citations cached at write-time; backfill if missing.
-    if row.citations_enriched:
-        data["citations"] = row.citations_enriched
-    else:
-        links = data.get("links") or []
-        data["citations"] = _enrich_citations(links)
-    entities = row.entities_normalized or _normalize_entities(data.get("vendors") or [])
 
-    # persist back
-    if not row.citations_enriched or not row.entities_normalized:
-        try:
-            row.citations_enriched = data["citations"]
-            row.entities_normalized = entities
-            db.add(row)
-            db.commit()
-        except Exception:
-            db.rollback()
+def _enrichment(row: Run, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Citations and entities for a run detail; never waits on the network.
 
-    data["entities"] = entities
-    return data
+    Runs without enriched citations get title-less citations now and are queued for the enrichment
+    workers, which fetch titles and persist both columns; enrichment_pending tells the UI to poll.
+    """
+    queue = get_enrichment_queue()
+    pending = needs_enrichment(row)
+    if pending:
+        queue.submit(row.id)
+    return {
+        "citations": row.citations_enriched or enrich_citations(data.get("links") or [], max_titles=0),
+        "entities": row.entities_normalized or _normalize_entities(data.get("vendors") or []),
+        "enrichment_pending": pending,
+    }
 
 #delete run functionality
 @router.delete("/{run_id}")
@@ -190,6 +127,10 @@ def delete_run(run_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     try:
         row.deleted = True
         db.add(row)
+        db.flush()
+        # daily_metrics and the cube exclude deleted runs, so the run's day is recomputed in both
+        mark_dirty(db, "runs", [{"ts": row.ts, "engine": row.engine}])
+        rebuild_cube(db, "runs", [naive_utc(row.ts).date()])
         db.commit()
         return {"ok": True, "id": run_id}
     except Exception:
@@ -221,7 +162,8 @@ def _normalize_entities(vendors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 #lookup runs using search filters prompted by user
 @router.post("/lookup")
 def lookup_runs(payload: Dict[str, Any], db: Session = Depends(get_db)) -> Dict[str, Any]:
-    """Find same-day runs for the exact query text (case-insensitive), optionally filtered by engines.
+    """Find recent runs for the same query text (normalized), optionally filtered by engines.
+    Looks back over the current UTC day unless lookback_hours is given (up to 30 days).
     Returns latest per engine, most recent first.
     """
     query_text = (payload.get("query") or "").strip()
@@ -229,92 +171,10 @@ def lookup_runs(payload: Dict[str, Any], db: Session = Depends(get_db)) -> Dict[
     if not query_text:
         return {"matches": []}
 
-    # same-day in UTC
-    # WHERE date(ts AT TIME ZONE 'UTC') = CURRENT_DATE
-    stmt = select(Run).where(
-        func.date(func.timezone('UTC', Run.ts)) == func.current_date(),
-    ).order_by(desc(Run.ts))
-
-    rows_today: List[Run] = list(db.scalars(stmt).all())
-
-    def _normalize_text(s: str) -> str:
-        s = (s or "").lower().strip()
-        # collapse whitespace
-        s = re.sub(r"\s+", " ", s)
-        # strip surrounding quotes
-        s = s.strip("'\"")
-        # remove simple punctuation except in URLs; since we compare queries, drop most punctuation
-        allowed = set(string.ascii_lowercase + string.digits + " ")
-        s = "".join(ch if ch in allowed else " " for ch in s)
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
-
-    q_norm = _normalize_text(query_text)
-
-    # 1) Exact normalized match per engine (latest)
-    exact_matches: Dict[str, Dict[str, Any]] = {}
-    for r in rows_today:
-        if engines and r.engine not in engines:
-            continue
-        if _normalize_text(r.query) == q_norm and r.engine not in exact_matches:
-            exact_matches[r.engine] = {"id": r.id, "engine": r.engine, "ts": r.ts.isoformat()}
-
-    if exact_matches:
-        ordered = []
-        added = set()
-        for r in rows_today:
-            if r.engine in exact_matches and r.engine not in added:
-                ordered.append(exact_matches[r.engine])
-                added.add(r.engine)
-        return {"matches": ordered}
-
-    # 2) Fuzzy fallback using TF-IDF cosine similarity
-    # Build corpus: [query_norm] + unique normalized texts from today
-    candidates: List[tuple[str, Run]] = []
-    seen_texts = set()
-    for r in rows_today:
-        if engines and r.engine not in engines:
-            continue
-        rn = _normalize_text(r.query)
-        if not rn:
-            continue
-        key = (rn, r.engine)
-        if key in seen_texts:
-            continue
-        seen_texts.add(key)
-        candidates.append((rn, r))
-
-    if not candidates:
-        return {"matches": []}
-
-    corpus = [q_norm] + [c[0] for c in candidates]
+    lookback_hours = payload.get("lookback_hours")
     try:
-        vec = TfidfVectorizer(ngram_range=(1, 2), min_df=1)
-        X = vec.fit_transform(corpus)
-        sims = cosine_similarity(X[0:1], X[1:]).flatten()
-    except Exception:
-        sims = []
-
-    # threshold for near-duplicate queries
-    THRESH = 0.90
-    scored = []
-    for (norm_text, run_obj), score in zip(candidates, sims):
-        if score >= THRESH:
-            scored.append((score, run_obj))
-
-    # choose latest per engine among high-score matches
-    fuzzy_matches: Dict[str, Dict[str, Any]] = {}
-    for _, r in sorted(scored, key=lambda x: x[1].ts, reverse=True):
-        if r.engine not in fuzzy_matches:
-            fuzzy_matches[r.engine] = {"id": r.id, "engine": r.engine, "ts": r.ts.isoformat()}
-
-    ordered = []
-    added = set()
-    for r in rows_today:
-        if r.engine in fuzzy_matches and r.engine not in added:
-            ordered.append(fuzzy_matches[r.engine])
-            added.add(r.engine)
-
-    return {"matches": ordered}
-
+        lookback_hours = float(lookback_hours) if lookback_hours is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="lookback_hours must be a number")
 
+    return {"matches": find_matching_runs(db, query_text, engines, lookback_hours)}
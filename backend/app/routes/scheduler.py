@@ -1,13 +1,14 @@
 #scheduler endpoint is used to schedule daily queries to be run automatically, in order to compute daily metrics for dashboard
 
 from __future__ import annotations
+import asyncio
 from datetime import date, datetime
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel
 
 from ..services.query_scheduler import QueryScheduler, run_daily_queries
-from ..services.metrics import MetricsService
+from ..services.dirty_metrics import process_dirty_partitions
 from ..services.database import get_db
 
 router = APIRouter(prefix="/scheduler", tags=["scheduler"])
@@ -91,7 +92,8 @@ async def execute_daily_queries(
         
         # Execute queries
         start_time = datetime.utcnow()
-        results = scheduler.execute_daily_queries(target_date, dry_run=request.dry_run)
+        # Blocking batch (engine calls fan out on worker pools); keep it off the event loop
+        results = await asyncio.to_thread(scheduler.execute_daily_queries, target_date, dry_run=request.dry_run)
         execution_time = (datetime.utcnow() - start_time).total_seconds()
         
         # Calculate status distribution
@@ -100,12 +102,9 @@ async def execute_daily_queries(
             status = result['status']
             status_distribution[status] = status_distribution.get(status, 0) + 1
         
-        # If not a dry run, compute metrics in background
+        # If not a dry run, recompute the daily metrics partitions the batch dirtied in background
         if not request.dry_run:
-            background_tasks.add_task(
-                _compute_metrics_for_date,
-                target_date.isoformat()
-            )
+            background_tasks.add_task(_process_dirty_metrics)
         
         return QueryExecutionResponse(
             target_date=target_date.isoformat(),
@@ -151,23 +150,15 @@ async def get_scheduler_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _compute_metrics_for_date(date_str: str):
-    """Background task to compute metrics for a specific date."""
+def _process_dirty_metrics():
+    """Background task to recompute the daily metrics partitions marked dirty by new runs."""
     try:
-        target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         db = next(get_db())
-        metrics_service = MetricsService(db)
-        
-        # Compute metrics for all engines
-        metrics = metrics_service.compute_daily_metrics(target_date)
-        
-        # Upsert to database
-        metrics_service.upsert_daily_metrics(metrics)
-        
-        print(f"✅ Metrics computed and stored for {date_str}")
+        counts = process_dirty_partitions(db)
+        print(f"✅ Metrics recomputed for {counts['partitions']} dirty partitions")
         
     except Exception as e:
-        print(f"❌ Error computing metrics for {date_str}: {e}")
+        print(f"❌ Error recomputing dirty metrics: {e}")
 
 
 # Import Run model at the top level
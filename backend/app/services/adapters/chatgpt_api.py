@@ -1,22 +1,55 @@
-from openai import OpenAI
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 import os
-try:
+
+from ..http_clients import get_http_client, get_async_http_client
+
+if TYPE_CHECKING:
+    # The SDK takes ~0.5s to import; it is loaded on first client use, not at worker boot
+    from openai import AsyncOpenAI, OpenAI
+
+
+class _NoBadRequestError(Exception):
+    pass
+
+
+def _bad_request_error() -> type:
     # SDK v1 provides BadRequestError; fall back gracefully if unavailable
-    from openai import BadRequestError  # type: ignore
-except Exception:  # pragma: no cover
-    class BadRequestError(Exception):
-        pass
+    try:
+        from openai import BadRequestError  # type: ignore
+        return BadRequestError
+    except Exception:  # pragma: no cover
+        return _NoBadRequestError
 
 load_dotenv()
 
+# Clients are reused across calls so requests share the pooled keep-alive connections
+_openai_clients: dict = {}
+
+
+def _cached_client(kind: str, factory, http_client):
+    # Rebuild only when the API key or the underlying pooled transport changes
+    api_key = os.getenv("OPENAI_API_KEY")
+    cached = _openai_clients.get(kind)
+    if cached and cached[0] == api_key and cached[1] is http_client:
+        return cached[2]
+    # Without a key the SDK falls back to its default env discovery.
+    # SDK retries are off: services.rate_limiter retries 429/5xx and adapts concurrency to them.
+    kwargs = {"http_client": http_client, "max_retries": 0}
+    client = factory(api_key=api_key, **kwargs) if api_key else factory(**kwargs)
+    _openai_clients[kind] = (api_key, http_client, client)
+    return client
+
 def _get_openai_client() -> OpenAI:
     # Single source of truth: OPENAI_API_KEY
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        return OpenAI(api_key=api_key)
-    # Fallback to default env discovery (OpenAI SDK will look up env vars internally)
-    return OpenAI()
+    from openai import OpenAI
+    return _cached_client("sync", OpenAI, get_http_client("openai"))
+
+def _get_async_openai_client() -> AsyncOpenAI:
+    # Same key discovery as the sync client, for the asyncio engine path
+    from openai import AsyncOpenAI
+    return _cached_client("async", AsyncOpenAI, get_async_http_client("openai"))
 
 SYSTEM_PROMPT = """
 You are an AI search assistant.
@@ -36,18 +69,8 @@ def _supports_temperature(model_id: str | None) -> bool:
     return True
 
 
-def run_query(prompt: str, model: str | None = None, max_output_tokens: int = 500, temperature: float | None = None):
-    # Responses API migration: https://platform.openai.com/docs/guides/migrate-to-responses
-    # Prefer structured input blocks for Responses API
-    input_blocks = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": prompt},
-            ],
-        }
-    ]
-
+def resolve_model(model: str | None = None) -> str:
+    """Map a requested model id (or the env default) to the id actually sent to OpenAI."""
     # Preferred default model via env, fallback to nano ID, with alias support
     env_default = os.getenv("OPENAI_MODEL_ID", "gpt-4o-search-preview")
     requested = model or env_default
@@ -66,6 +89,22 @@ def run_query(prompt: str, model: str | None = None, max_output_tokens: int = 50
         "gpt-4o-search-preview": "gpt-4o-search-preview",
     }
     resolved_model = model_alias.get(requested, requested)
+    return resolved_model
+
+
+def run_query(prompt: str, model: str | None = None, max_output_tokens: int = 500, temperature: float | None = None):
+    # Responses API migration: https://platform.openai.com/docs/guides/migrate-to-responses
+    # Prefer structured input blocks for Responses API
+    input_blocks = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "input_text", "text": prompt},
+            ],
+        }
+    ]
+
+    resolved_model = resolve_model(model)
 
     client = _get_openai_client()
     # Use Responses API for GPT-5 family; use Chat Completions for older/search-preview models
@@ -102,7 +141,7 @@ def run_query(prompt: str, model: str | None = None, max_output_tokens: int = 50
                 except Exception:
                     pass
             return resp
-        except BadRequestError as e:
+        except _bad_request_error() as e:
             # Retry with simple string input if the model rejects structured input
             try:
                 resp = client.responses.create(
@@ -161,7 +200,66 @@ def run_query(prompt: str, model: str | None = None, max_output_tokens: int = 50
                 except Exception:
                     pass
             return resp
-        except BadRequestError as e:
+        except _bad_request_error() as e:
+            print("OPENAI CHAT 400:", getattr(e, "status_code", None), getattr(e, "response", None))
+            raise
+        except Exception as e:
+            print("OPENAI CHAT ERROR:", repr(e))
+            raise
+
+
+async def run_query_async(prompt: str, model: str | None = None, max_output_tokens: int = 500, temperature: float | None = None):
+    """Asyncio counterpart of run_query (same model routing and fallbacks) on AsyncOpenAI."""
+    input_blocks = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "input_text", "text": prompt},
+            ],
+        }
+    ]
+    resolved_model = resolve_model(model)
+    client = _get_async_openai_client()
+    temp_arg = float(temperature) if (temperature is not None and _supports_temperature(resolved_model)) else None
+    temp_kwargs = {"temperature": temp_arg} if temp_arg is not None else {}
+
+    if str(resolved_model).startswith("gpt-5"):
+        try:
+            return await client.responses.create(
+                model=resolved_model,
+                instructions=SYSTEM_PROMPT.strip(),
+                input=input_blocks,
+                max_output_tokens=max_output_tokens,
+                **temp_kwargs,
+            )
+        except _bad_request_error() as e:
+            # Retry with simple string input if the model rejects structured input
+            try:
+                return await client.responses.create(
+                    model=resolved_model,
+                    instructions=SYSTEM_PROMPT.strip(),
+                    input=prompt,
+                    max_output_tokens=max_output_tokens,
+                    **temp_kwargs,
+                )
+            except Exception:
+                print("OPENAI 400 (both formats failed):", getattr(e, "status_code", None), getattr(e, "response", None))
+                raise
+        except Exception as e:
+            print("OPENAI ERROR:", repr(e))
+            raise
+    else:
+        try:
+            return await client.chat.completions.create(
+                model=resolved_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT.strip()},
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=max_output_tokens,
+                **temp_kwargs,
+            )
+        except _bad_request_error() as e:
             print("OPENAI CHAT 400:", getattr(e, "status_code", None), getattr(e, "response", None))
             raise
         except Exception as e:
@@ -1,17 +1,15 @@
-import requests
 import os
+import httpx
 from dotenv import load_dotenv
 
+from ..http_clients import get_http_client, get_async_http_client
+
 load_dotenv()
 
-def run_query(prompt: str, temperature: float = 0.2, model: str = 'sonar'):
-    """Run a query through Perplexity API"""
-    api_key = os.getenv('PERPLEXITY_API_KEY')
-    if not api_key:
-        raise ValueError("PERPLEXITY_API_KEY environment variable not set")
-    
-    # Enhanced prompt for better source citation
-    enhanced_prompt = f"""You are a competitive intelligence researcher. When answering, ALWAYS include the full URLs and sources you find.
+PERPLEXITY_URL = 'https://api.perplexity.ai/chat/completions'
+
+# Wraps the user question; also hashed into the engine response cache key
+PROMPT_TEMPLATE = """You are a competitive intelligence researcher. When answering, ALWAYS include the full URLs and sources you find.
 
 IMPORTANT: For every fact, statistic, or claim you make, include the complete URL where you found this information. Include whatever sources you discover - company websites, news articles, press releases, industry reports, etc.
 
@@ -24,37 +22,83 @@ Format citations as:
 Do NOT use numbered citations like [1][2][3]. Instead, include the actual URLs inline with your text.
 
 Question: {prompt}"""
+
+
+def _build_request(prompt: str, temperature: float, model: str):
+    """Return (headers, json payload) for a Perplexity chat completion."""
+    api_key = os.getenv('PERPLEXITY_API_KEY')
+    if not api_key:
+        raise ValueError("PERPLEXITY_API_KEY environment variable not set")
     
-    try:
-        response = requests.post(
-            'https://api.perplexity.ai/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': model or 'sonar',
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': enhanced_prompt
-                    }
-                ],
-                'temperature': temperature
+    # Enhanced prompt for better source citation
+    enhanced_prompt = PROMPT_TEMPLATE.format(prompt=prompt)
+
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+    payload = {
+        'model': model or 'sonar',
+        'messages': [
+            {
+                'role': 'user',
+                'content': enhanced_prompt
             }
-        )
+        ],
+        'temperature': temperature
+    }
+    return headers, payload
+
+
+def _error_response(message: str):
+    """Error shape understood by engines._normalize_perplexity."""
+    return {
+        "text": f"Error: {message}",
+        "model": "perplexity",
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0}
+    }
+
+
+def _is_retryable(response) -> bool:
+    # 429 / 5xx (and connection failures) are raised so the rate limiter can back off and retry
+    # instead of storing an error answer
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def run_query(prompt: str, temperature: float = 0.2, model: str = 'sonar'):
+    """Run a query through Perplexity API"""
+    headers, payload = _build_request(prompt, temperature, model)
+    
+    try:
+        response = get_http_client("perplexity").post(PERPLEXITY_URL, headers=headers, json=payload)
         
         if response.status_code == 200:
             return response.json()
+        elif _is_retryable(response):
+            response.raise_for_status()
         else:
-            return {
-                "text": f"Error: {response.status_code} - {response.text}",
-                "model": "perplexity",
-                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0}
-            }
+            return _error_response(f"{response.status_code} - {response.text}")
+    except (httpx.HTTPStatusError, httpx.TransportError):
+        raise
+    except Exception as e:
+        return _error_response(str(e))
+
+
+async def run_query_async(prompt: str, temperature: float = 0.2, model: str = 'sonar', timeout: float | None = None):
+    """Asyncio counterpart of run_query on the pooled async client."""
+    headers, payload = _build_request(prompt, temperature, model)
+
+    try:
+        client = get_async_http_client("perplexity")
+        response = await client.post(PERPLEXITY_URL, headers=headers, json=payload, **({"timeout": timeout} if timeout else {}))
+
+        if response.status_code == 200:
+            return response.json()
+        elif _is_retryable(response):
+            response.raise_for_status()
+        else:
+            return _error_response(f"{response.status_code} - {response.text}")
+    except (httpx.HTTPStatusError, httpx.TransportError):
+        raise
     except Exception as e:
-        return {
-            "text": f"Error: {str(e)}",
-            "model": "perplexity", 
-            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0}
-        }
\ No newline at end of file
+        return _error_response(str(e))
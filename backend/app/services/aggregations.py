@@ -0,0 +1,182 @@
+#SQL-side aggregations for dashboard endpoints; the database groups and counts, Python only shapes responses
+
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# automated_runs.links is JSON; older rows hold the array serialized as a JSON string, which links_array
+# (migration 0016) parses, reading malformed ones as [] instead of failing the query
+LINKS_ARRAY_SQL = "links_array(links)"
+
+# A link element is either a bare URL string or an object with a url key
+LINK_URL_SQL = """
+    lower(CASE json_typeof(e) WHEN 'string' THEN e #>> '{}' WHEN 'object' THEN e ->> 'url' END)
+"""
+
+
+def automated_engine_clause(engine: Optional[str], column: str = "engine", exact: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """SQL predicate and binds for the engine filter the metrics routes apply to automated_runs."""
+    if not engine:
+        return "", {}
+    if engine == "openai" and not exact:
+        # Older rows store the model name (gpt-*) as the engine
+        return f"AND ({column} LIKE 'gpt%' OR {column} LIKE 'openai%' OR {column} = 'openai')", {}
+    return f"AND {column} = :engine", {"engine": engine}
+
+
+def automated_children_scope(
+    table: str,
+    start_ts: datetime,
+    end_ts: Optional[datetime] = None,
+    engine: Optional[str] = None,
+    exact_engine: bool = False,
+    is_branded: Optional[bool] = None,
+    status: Optional[str] = None,
+    extreme_only: bool = False,
+) -> Tuple[str, Dict[str, Any]]:
+    """FROM/WHERE over run_citations or run_entities (alias c) of automated runs in [start_ts, end_ts).
+
+    The window is applied on the child table's (run_source, ts) index; run-level filters go through the
+    primary-key join to automated_runs (alias ar).
+    """
+    clauses = ["c.run_source = 'automated_runs'", "c.ts >= :start_ts"]
+    params: Dict[str, Any] = {"start_ts": start_ts}
+    if end_ts is not None:
+        clauses.append("c.ts < :end_ts")
+        params["end_ts"] = end_ts
+    if is_branded is not None:
+        clauses.append("ar.is_branded = :is_branded")
+        params["is_branded"] = is_branded
+    if status:
+        clauses.append("ar.status = :status")
+        params["status"] = status
+    if extreme_only:
+        clauses.append("ar.extreme_mentioned = true")
+    engine_sql, engine_params = automated_engine_clause(engine, column="ar.engine", exact=exact_engine)
+    params.update(engine_params)
+    sql = f"FROM {table} c JOIN automated_runs ar ON ar.id = c.run_id WHERE {' AND '.join(clauses)} {engine_sql}"
+    return sql, params
+
+
+def extreme_trends_by_day(db: Session, start_ts: datetime, engine: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-day runs, cost, total citations and extremenetworks.com citations for neutral runs mentioning Extreme."""
+    engine_sql, params = automated_engine_clause(engine)
+    stmt = text(f"""
+        WITH scoped AS (
+            SELECT date_trunc('day', ts) AS day,
+                   cost_usd,
+                   {LINKS_ARRAY_SQL} AS link_arr
+            FROM automated_runs
+            WHERE ts >= :start_ts
+              AND is_branded = false
+              AND extreme_mentioned = true
+              {engine_sql}
+        )
+        SELECT day,
+               count(*) AS runs_count,
+               coalesce(sum(cost_usd), 0) AS total_cost,
+               coalesce(sum(json_array_length(link_arr)), 0) AS total_citations,
+               coalesce(sum((
+                   SELECT count(*)
+                   FROM json_array_elements(link_arr) AS e
+                   WHERE strpos({LINK_URL_SQL}, 'extremenetworks.com') > 0
+               )), 0) AS extreme_citations
+        FROM scoped
+        GROUP BY day
+        ORDER BY day
+    """)
+    rows = db.execute(stmt, {"start_ts": start_ts, **params}).mappings().all()
+    return [
+        {
+            "date": row["day"].date().isoformat(),
+            "runs_count": int(row["runs_count"]),
+            "total_cost": float(row["total_cost"]),
+            "total_citations": int(row["total_citations"]),
+            "extreme_citations": int(row["extreme_citations"]),
+        }
+        for row in rows
+    ]
+
+
+def citation_summary(db: Session, **scope: Any) -> Dict[str, int]:
+    """Citation totals over a window: citations, distinct domains and runs with links."""
+    from_sql, params = automated_children_scope("run_citations", **scope)
+    row = db.execute(text(f"""
+        SELECT count(*) AS total_citations,
+               count(DISTINCT nullif(c.domain, '')) AS unique_domains,
+               count(DISTINCT c.run_id) AS runs_with_links
+        {from_sql}
+    """), params).mappings().one()
+    return {key: int(value or 0) for key, value in row.items()}
+
+
+def domain_leaderboard(
+    db: Session,
+    limit: int = 20,
+    collapse_brand: bool = False,
+    rank_by: str = "citations",
+    with_details: bool = False,
+    **scope: Any,
+) -> Dict[str, Any]:
+    """Domain leaderboard: citations, distinct URLs and runs per domain, plus the number of distinct domains.
+
+    collapse_brand folds every extremenetworks.com subdomain into one row; with_details adds the
+    distinct queries and URLs behind each listed domain.
+    """
+    from_sql, params = automated_children_scope("run_citations", **scope)
+    domain_sql = "CASE WHEN c.is_brand_domain THEN 'extremenetworks.com' ELSE c.domain END" if collapse_brand else "c.domain"
+    order_sql = "unique_urls DESC, citations DESC" if rank_by == "unique_urls" else "citations DESC, unique_urls DESC"
+    details_sql = ", array_agg(DISTINCT ar.query) AS queries, array_agg(DISTINCT c.url) AS urls" if with_details else ""
+    rows = db.execute(text(f"""
+        SELECT {domain_sql} AS domain,
+               count(*) AS citations,
+               count(DISTINCT c.url) AS unique_urls,
+               count(DISTINCT c.run_id) AS runs,
+               count(*) OVER () AS total_domains
+               {details_sql}
+        {from_sql} AND c.domain <> ''
+        GROUP BY 1
+        ORDER BY {order_sql}, domain
+        LIMIT :limit
+    """), {**params, "limit": limit}).mappings().all()
+    items = []
+    for row in rows:
+        item = {
+            "domain": row["domain"],
+            "citations": int(row["citations"]),
+            "unique_urls": int(row["unique_urls"]),
+            "runs": int(row["runs"]),
+        }
+        if with_details:
+            item["queries"] = list(row["queries"] or [])
+            item["urls"] = list(row["urls"] or [])
+        items.append(item)
+    return {"total_domains": int(rows[0]["total_domains"]) if rows else 0, "items": items}
+
+
+def entity_leaderboard(db: Session, limit: int = 15, **scope: Any) -> Dict[str, Any]:
+    """Entity leaderboard: mentions and average list position per name, plus distinct names, mentions and runs."""
+    from_sql, params = automated_children_scope("run_entities", **scope)
+    totals = db.execute(text(f"""
+        SELECT count(DISTINCT c.name) AS unique_entities,
+               count(*) AS total_mentions,
+               count(DISTINCT c.run_id) AS runs_with_entities
+        {from_sql}
+    """), params).mappings().one()
+    rows = db.execute(text(f"""
+        SELECT c.name AS name, count(*) AS mentions, avg(c.rank) AS avg_rank
+        {from_sql}
+        GROUP BY c.name
+        ORDER BY mentions DESC, name
+        LIMIT :limit
+    """), {**params, "limit": limit}).mappings().all()
+    return {
+        **{key: int(value or 0) for key, value in totals.items()},
+        "items": [
+            {"name": row["name"], "mentions": int(row["mentions"]), "avg_rank": round(float(row["avg_rank"]), 1)}
+            for row in rows
+        ],
+    }
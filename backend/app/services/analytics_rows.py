@@ -0,0 +1,50 @@
+#column-projected reads for analytics: aggregators declare the columns they use and get plain rows back, never ORM objects
+
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+ROW_BATCH = 1000
+
+# Multi-KB text columns; only read when an aggregator names them
+LARGE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "automated_runs": ("answer_text",),
+    "runs": ("raw_excerpt",),
+}
+
+
+def row_columns(model, names: Optional[Iterable[str]] = None) -> Tuple[Any, ...]:
+    """Mapped columns of model for names; without names every column except the large text ones."""
+    table = model.__table__
+    if names is None:
+        large = LARGE_COLUMNS.get(table.name, ())
+        return tuple(getattr(model, column.name) for column in table.columns if column.name not in large)
+
+    columns = []
+    for name in names:
+        if name not in table.columns:
+            raise ValueError(f"{table.name} has no column {name!r}")
+        columns.append(getattr(model, name))
+    return tuple(columns)
+
+
+def select_rows(model, names: Optional[Iterable[str]] = None) -> Select:
+    """SELECT of only the named columns of model (see row_columns); add WHERE/ORDER BY as usual."""
+    return select(*row_columns(model, names))
+
+
+def iter_rows(db: Session, stmt: Select, batch: int = ROW_BATCH) -> Iterator[Row]:
+    """Stream stmt as lightweight rows (tuples with attribute access) in batches of `batch`.
+
+    Rows never enter the session identity map, so memory stays at one batch however long the window is.
+    """
+    return iter(db.execute(stmt.execution_options(yield_per=batch)))
+
+
+def merged_columns(*groups: Sequence[str]) -> Tuple[str, ...]:
+    """Union of column name groups in first-seen order, for one scan feeding several aggregators."""
+    return tuple(dict.fromkeys(name for group in groups for name in group))
@@ -0,0 +1,483 @@
+#dashboard panels over automated_runs: each panel folds runs in one at a time, so a single scan feeds them all
+
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .analytics_rows import iter_rows, merged_columns, select_rows
+from .extract import extract_competitors
+from .metrics_cube import engine_filter
+from .run_children import child_rows
+from ..models.automated_run import AutomatedRun
+
+# Columns behind the per-run citation rows handed to every panel
+CITATION_COLUMNS = ("id", "ts", "links")
+SCAN_BATCH = 1000
+SUCCESS_STATUSES = {"ok", "completed"}
+
+COMPETITOR_BRANDS = [
+    "cisco", "juniper", "aruba", "fortinet", "palo alto", "check point",
+    "f5", "riverbed", "arista", "brocade", "ruckus", "ubiquiti", "netgear",
+    "tp-link", "d-link", "linksys", "huawei", "dell", "hpe", "nokia",
+    "meraki", "mist", "fortigate", "pan-os", "big-ip", "steelhead"
+]
+
+
+def is_branded_query(query: str) -> bool:
+    """Check if a query is branded (mentions specific competitors)."""
+    query_lower = query.lower()
+    return any(brand in query_lower for brand in COMPETITOR_BRANDS)
+
+
+def normalize_engine_name(engine: str) -> str:
+    """Normalize engine names for cleaner display."""
+    if not engine:
+        return "Unknown"
+
+    engine_lower = engine.lower()
+
+    if "gpt" in engine_lower or "openai" in engine_lower:
+        return "OpenAI"
+    elif "perplexity" in engine_lower:
+        return "Perplexity"
+    else:
+        return engine
+
+
+def classify_why_extreme_should_appear(query: str) -> str:
+    """Classify why Extreme should appear in this query response."""
+    query_lower = query.lower()
+
+    # Network infrastructure
+    if any(word in query_lower for word in ["switch", "router", "networking", "network"]):
+        return "Network Infrastructure"
+
+    # Wi-Fi and wireless
+    if any(word in query_lower for word in ["wifi", "wi-fi", "wireless", "802.11", "6e", "7"]):
+        return "Wi-Fi & Wireless"
+
+    # Security
+    if any(word in query_lower for word in ["security", "firewall", "sase", "zero trust"]):
+        return "Network Security"
+
+    # Enterprise
+    if any(word in query_lower for word in ["enterprise", "business", "corporate"]):
+        return "Enterprise Solutions"
+
+    # Cloud and automation
+    if any(word in query_lower for word in ["cloud", "automation", "ai", "ml", "orchestration"]):
+        return "Cloud & Automation"
+
+    # Data center
+    if any(word in query_lower for word in ["data center", "datacenter", "server", "storage"]):
+        return "Data Center"
+
+    return "General Networking"
+
+
+def _percentile(sorted_values: List[int], q: float) -> Optional[int]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class VisibilityPanel:
+    """AI search visibility of Extreme in neutral (non-branded) runs.
+
+    Branded means is_branded_query on the query text, as in the coverage gaps panel, so both panels
+    exclude the same runs.
+    """
+
+    COLUMNS = ("query", "extreme_mentioned") + CITATION_COLUMNS
+
+    def __init__(self):
+        self.runs = 0
+        self.neutral_runs = 0
+        self.mentions = 0
+        self.mention_citations = 0
+        self.mention_domains = 0
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]]) -> None:
+        self.runs += 1
+        if is_branded_query(run.query or ""):
+            return
+        self.neutral_runs += 1
+        if run.extreme_mentioned:
+            self.mentions += 1
+            self.mention_citations += len(citations)
+            self.mention_domains += len({c["domain"] for c in citations if c["domain"]})
+
+    def result(self) -> Dict[str, Any]:
+        mentions = self.mentions
+        mention_rate = mentions / self.neutral_runs if self.neutral_runs else 0
+        return {
+            "total_mentions": mentions,
+            "mention_rate_pct": round(mention_rate * 100, 2),
+            "total_citations": self.mention_citations,
+            "total_domains": self.mention_domains,
+            "avg_citations_per_mention": round(self.mention_citations / mentions, 2) if mentions > 0 else 0,
+            "avg_domains_per_mention": round(self.mention_domains / mentions, 2) if mentions > 0 else 0,
+            "neutral_queries_analyzed": self.neutral_runs,
+            "branded_queries_excluded": self.runs - self.neutral_runs,
+        }
+
+
+class CoverageGapsPanel:
+    """Where Extreme should be showing up but is missing."""
+
+    COLUMNS = ("query", "engine", "intent_category", "extreme_mentioned", "answer_text")
+
+    def __init__(self):
+        self.runs = 0
+        self.branded = 0
+        self.intent_analysis: Dict[str, Dict[str, Any]] = {}
+        self.gaps: List[Dict[str, Any]] = []
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        self.runs += 1
+        # Skip branded queries - only analyze neutral queries for gaps
+        if is_branded_query(run.query):
+            self.branded += 1
+            return
+
+        intent = run.intent_category or "unknown"
+        if intent not in self.intent_analysis:
+            self.intent_analysis[intent] = {"total": 0, "extreme_mentioned": 0, "gaps": []}
+
+        self.intent_analysis[intent]["total"] += 1
+
+        if run.extreme_mentioned:
+            self.intent_analysis[intent]["extreme_mentioned"] += 1
+        else:
+            # This is a coverage gap - Extreme should have been mentioned
+            # Extract competitors from the actual AI response text
+            competitor_names = [comp.name for comp in extract_competitors(run.answer_text)]
+
+            # Only consider this a gap if Extreme is NOT in the competitors list
+            if "Extreme Networks" not in competitor_names:
+                self.gaps.append({
+                    "query": run.query,
+                    "engine": normalize_engine_name(run.engine),
+                    "why_extreme_should_appear": classify_why_extreme_should_appear(run.query),
+                    "competitors_mentioned": competitor_names,
+                    "full_query": run.query,
+                    "full_ai_response": run.answer_text
+                })
+
+    def result(self) -> Dict[str, Any]:
+        # Calculate gap rates
+        for data in self.intent_analysis.values():
+            if data["total"] > 0:
+                data["gap_rate_pct"] = round((len(data["gaps"]) / data["total"]) * 100, 2)
+                data["coverage_rate_pct"] = round((data["extreme_mentioned"] / data["total"]) * 100, 2)
+
+        return {
+            "by_intent_category": self.intent_analysis,
+            "total_gaps": len(self.gaps),
+            "overall_gap_rate_pct": round(len(self.gaps) / self.runs * 100, 2) if self.runs else 0,
+            "all_gaps": self.gaps,  # Include all gaps for detailed analysis
+            "total_queries_analyzed": sum(data["total"] for data in self.intent_analysis.values()),
+            "branded_queries_filtered": self.branded
+        }
+
+
+class BrandIntentPanel:
+    """Intent split of queries where Extreme Networks was mentioned."""
+
+    COLUMNS = ("query", "engine", "extreme_mentioned", "answer_text")
+    CATEGORIES = ("informational", "branded", "comparison", "review", "product_specific", "technical")
+
+    def __init__(self):
+        self.total_mentions = 0
+        self.breakdown = {intent: 0 for intent in self.CATEGORIES}
+        self.examples: Dict[str, List[Dict[str, Any]]] = {intent: [] for intent in self.CATEGORIES}
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        if not run.extreme_mentioned or not run.query:
+            return
+
+        self.total_mentions += 1
+        query_lower = run.query.lower()
+
+        # Categorize intent based on query content
+        if any(word in query_lower for word in ["vs", "versus", "compare", "comparison"]):
+            intent = "comparison"
+        elif any(word in query_lower for word in ["review", "evaluation", "assessment"]):
+            intent = "review"
+        elif any(word in query_lower for word in ["wifi", "wi-fi", "6e", "7", "switch", "router", "sase", "aiops"]):
+            intent = "product_specific"
+        elif any(word in query_lower for word in ["specs", "specifications", "technical", "architecture", "protocol"]):
+            intent = "technical"
+        elif any(word in query_lower for word in ["extreme networks", "extreme"]):
+            intent = "branded"
+        else:
+            intent = "informational"
+
+        self.breakdown[intent] += 1
+
+        # Store context example (limit to 2 per category)
+        if len(self.examples[intent]) < 2:
+            answer = run.answer_text
+            self.examples[intent].append({
+                "query": run.query,
+                "answer_preview": answer[:200] + "..." if answer and len(answer) > 200 else (answer or "No response text"),
+                "full_answer": answer or "No response text",
+                "engine": normalize_engine_name(run.engine),
+                "intent": intent
+            })
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "total_extreme_mentions": self.total_mentions,
+            "intent_breakdown": self.breakdown,
+            "context_examples": self.examples,
+        }
+
+
+class EntityAssociationsPanel:
+    """Products and keywords AI associates with Extreme."""
+
+    COLUMNS = ("extreme_mentioned", "entities_normalized")
+
+    def __init__(self):
+        self.entity_counts: Dict[str, Dict[str, int]] = {}
+        self.product_associations: Dict[str, int] = {}
+        self.keyword_associations: Dict[str, int] = {}
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        if not run.extreme_mentioned or not run.entities_normalized:
+            return
+
+        for entity in run.entities_normalized:
+            entity_type = entity.get("type", "unknown")
+            entity_name = entity.get("name", "").lower()
+
+            counts = self.entity_counts.setdefault(entity_type, {})
+            counts[entity_name] = counts.get(entity_name, 0) + 1
+
+            # Look for product associations
+            if any(word in entity_name for word in ["wifi", "wi-fi", "6e", "6", "sase", "campus", "networking", "switch", "router"]):
+                self.product_associations[entity_name] = self.product_associations.get(entity_name, 0) + 1
+
+            # Look for keyword associations
+            if any(word in entity_name for word in ["enterprise", "cloud", "security", "automation", "ai", "ml"]):
+                self.keyword_associations[entity_name] = self.keyword_associations.get(entity_name, 0) + 1
+
+    def result(self) -> Dict[str, Any]:
+        sorted_products = sorted(self.product_associations.items(), key=lambda x: x[1], reverse=True)
+        sorted_keywords = sorted(self.keyword_associations.items(), key=lambda x: x[1], reverse=True)
+        return {
+            "entity_types": self.entity_counts,
+            "product_associations": dict(sorted_products[:10]),  # Top 10
+            "keyword_associations": dict(sorted_keywords[:10]),  # Top 10
+            "total_entity_mentions": sum(sum(counts.values()) for counts in self.entity_counts.values())
+        }
+
+
+class VisibilityTrendsPanel:
+    """Weekly/monthly movement in AI visibility."""
+
+    COLUMNS = ("ts", "extreme_mentioned", "citation_count")
+
+    def __init__(self):
+        self.weekly: Dict[str, Dict[str, int]] = {}
+        self.monthly: Dict[str, Dict[str, int]] = {}
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        run_date = run.ts.date()
+        # Weekly grouping (Monday as start of week), monthly by calendar month
+        week_key = (run_date - timedelta(days=run_date.weekday())).isoformat()
+        month_key = f"{run_date.year}-{run_date.month:02d}"
+        for data, key in ((self.weekly, week_key), (self.monthly, month_key)):
+            period = data.setdefault(key, {"total": 0, "extreme_mentioned": 0, "citations": 0})
+            period["total"] += 1
+            if run.extreme_mentioned:
+                period["extreme_mentioned"] += 1
+            period["citations"] += run.citation_count or 0
+
+    @staticmethod
+    def _trend(data_dict: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        sorted_periods = sorted(data_dict.keys())
+        if len(sorted_periods) < 2:
+            return {"trend": "insufficient_data", "change_pct": 0}
+
+        first, last = data_dict[sorted_periods[0]], data_dict[sorted_periods[-1]]
+        first_visibility = first["extreme_mentioned"] / first["total"] if first["total"] > 0 else 0
+        last_visibility = last["extreme_mentioned"] / last["total"] if last["total"] > 0 else 0
+
+        if first_visibility == 0:
+            change_pct = 100 if last_visibility > 0 else 0
+        else:
+            change_pct = ((last_visibility - first_visibility) / first_visibility) * 100
+
+        if change_pct > 5:
+            trend = "increasing"
+        elif change_pct < -5:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        return {"trend": trend, "change_pct": round(change_pct, 2)}
+
+    def result(self) -> Dict[str, Any]:
+        weekly_trend = self._trend(self.weekly)
+        monthly_trend = self._trend(self.monthly)
+        return {
+            "weekly": {"data": self.weekly, "trend": weekly_trend},
+            "monthly": {"data": self.monthly, "trend": monthly_trend},
+            "summary": {
+                "overall_trend": "increasing" if weekly_trend["change_pct"] > 0 and monthly_trend["change_pct"] > 0 else "decreasing",
+                "weekly_change_pct": weekly_trend["change_pct"],
+                "monthly_change_pct": monthly_trend["change_pct"]
+            }
+        }
+
+
+class CitationsPanel:
+    """Citation totals and most cited domains."""
+
+    COLUMNS = ("extreme_mentioned",) + CITATION_COLUMNS
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.total = 0
+        self.brand_citations = 0
+        self.extreme_run_citations = 0
+        self.runs = 0
+        self.runs_with_links = 0
+        self.domains: Dict[str, int] = {}
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]]) -> None:
+        self.runs += 1
+        self.runs_with_links += bool(citations)
+        self.total += len(citations)
+        if run.extreme_mentioned:
+            self.extreme_run_citations += len(citations)
+        for citation in citations:
+            self.brand_citations += citation["is_brand_domain"]
+            if citation["domain"]:
+                self.domains[citation["domain"]] = self.domains.get(citation["domain"], 0) + 1
+
+    def result(self) -> Dict[str, Any]:
+        top = sorted(self.domains.items(), key=lambda item: item[1], reverse=True)[:self.top_n]
+        return {
+            "total_citations": self.total,
+            "unique_domains": len(self.domains),
+            "runs_with_links": self.runs_with_links,
+            "runs_without_links": self.runs - self.runs_with_links,
+            "extreme_domain_citations": self.brand_citations,
+            "citations_in_extreme_answers": self.extreme_run_citations,
+            "top_domains": [{"domain": domain, "count": count} for domain, count in top],
+        }
+
+
+class CostPanel:
+    """Spend and failures in total and per engine."""
+
+    COLUMNS = ("engine", "status", "cost_usd")
+
+    def __init__(self):
+        self.total_cost = 0.0
+        self.priced_runs = 0
+        self.failed_runs = 0
+        self.by_engine: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        cost = float(run.cost_usd or 0)
+        self.total_cost += cost
+        self.priced_runs += cost > 0
+        failed = (run.status or "") not in SUCCESS_STATUSES
+        self.failed_runs += failed
+        engine = self.by_engine.setdefault(normalize_engine_name(run.engine), {"runs": 0, "failed_runs": 0, "cost_usd": 0.0})
+        engine["runs"] += 1
+        engine["failed_runs"] += failed
+        engine["cost_usd"] += cost
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "total_cost": round(self.total_cost, 6),
+            "avg_cost_per_query": self.total_cost / self.priced_runs if self.priced_runs else None,
+            "failed_runs": self.failed_runs,
+            "by_engine": {name: {**data, "cost_usd": round(data["cost_usd"], 6)} for name, data in self.by_engine.items()},
+        }
+
+
+class LatencyPanel:
+    """Response time over runs that reported one, in seconds."""
+
+    COLUMNS = ("latency_ms",)
+
+    def __init__(self):
+        self.latencies: List[int] = []
+
+    def add(self, run: Any, citations: List[Mapping[str, Any]] = ()) -> None:
+        if run.latency_ms and run.latency_ms > 0:
+            self.latencies.append(run.latency_ms)
+
+    def result(self) -> Dict[str, Any]:
+        values = sorted(self.latencies)
+        p50, p95 = _percentile(values, 0.5), _percentile(values, 0.95)
+        return {
+            "runs_with_latency": len(values),
+            "avg_response_time": sum(values) / len(values) / 1000.0 if values else None,
+            "p50_response_time": p50 / 1000.0 if p50 is not None else None,
+            "p95_response_time": p95 / 1000.0 if p95 is not None else None,
+        }
+
+
+DASHBOARD_PANELS = {
+    "ai_search_visibility": VisibilityPanel,
+    "coverage_gaps": CoverageGapsPanel,
+    "answer_positioning": BrandIntentPanel,
+    "entity_associations": EntityAssociationsPanel,
+    "visibility_trends": VisibilityTrendsPanel,
+    "citations": CitationsPanel,
+    "cost": CostPanel,
+    "latency": LatencyPanel,
+}
+# Only the columns the panels declare; answer_text is the one large column and coverage gaps / intent need it
+DASHBOARD_COLUMNS = merged_columns(*(panel.COLUMNS for panel in DASHBOARD_PANELS.values()))
+
+
+def dashboard_panels() -> Dict[str, Any]:
+    """Fresh panels keyed by their name in the dashboard response."""
+    return {name: panel() for name, panel in DASHBOARD_PANELS.items()}
+
+
+def scan_runs(
+    db: Session,
+    start: date,
+    end: date,
+    engine: Optional[str] = None,
+    columns: Sequence[str] = DASHBOARD_COLUMNS,
+):
+    """Stream `columns` of automated runs between start and end (inclusive), engine prefix-matched."""
+    stmt = select_rows(AutomatedRun, columns).where(
+        AutomatedRun.ts >= datetime.combine(start, datetime.min.time()),
+        AutomatedRun.ts < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    )
+    if engine:
+        stmt = stmt.where(engine_filter(AutomatedRun.engine, engine, exact=False))
+    return iter_rows(db, stmt, SCAN_BATCH)
+
+
+def fold_runs(runs: Iterable[Any], panels: Iterable[Any]) -> int:
+    """Hand every run to every panel once; returns the number of runs."""
+    panels = list(panels)
+    total_runs = 0
+    for run in runs:
+        # Links are normalized once per run (same rule as run_citations) and shared by the panels
+        citations, _ = child_rows("automated_runs", {"id": run.id, "ts": run.ts, "links": run.links})
+        for panel in panels:
+            panel.add(run, citations)
+        total_runs += 1
+    return total_runs
+
+
+def build_dashboard(db: Session, start: date, end: date, engine: Optional[str] = None) -> Dict[str, Any]:
+    """Every dashboard panel from one scan of the window; each run is visited once."""
+    panels = dashboard_panels()
+    total_runs = fold_runs(scan_runs(db, start, end, engine), panels.values())
+    return {"total_runs_analyzed": total_runs, "panels": {name: panel.result() for name, panel in panels.items()}}
@@ -40,6 +40,14 @@ def init_db() -> None:
     # Local import to avoid circular deps
     from ..models.run import Run  # noqa: F401
     from ..models.metrics import DailyMetrics  # noqa: F401
+    from ..models.response_cache import ResponseCacheEntry  # noqa: F401
+    from ..models.query_job import QueryJob  # noqa: F401
+    from ..models.run_citation import RunCitation  # noqa: F401
+    from ..models.run_entity import RunEntity  # noqa: F401
+    from ..models.metrics_cube import MetricsCube, MetricsCubeFacet  # noqa: F401
+    from ..models.metrics_dirty import DirtyMetricsPartition  # noqa: F401
+    from ..models.data_version import DataVersion  # noqa: F401
+    from ..models.url_metadata import UrlMetadata  # noqa: F401
     Base.metadata.create_all(bind=engine)
 
 
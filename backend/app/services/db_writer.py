@@ -6,43 +6,56 @@ from datetime import datetime
 
 from sqlalchemy.orm import Session
 from .database import SessionLocal
+from .run_children import write_run_children
+from .run_lookup import normalize_query
 from ..models.run import Run
 
+BRANDED_TERMS = ["extreme", "cisco", "juniper", "aruba", "vs", "versus", "compare", "comparison"]
+
+
+def run_values(row: Dict[str, Any], source: str = "manual") -> Dict[str, Any]:
+    """Map a pipeline row (run_id, ts ISO string, ...) to runs column values."""
+    # Heuristic to classify branded vs non-branded
+    q = (row.get("query") or "").lower()
+    intent = (row.get("intent") or "").lower()
+    is_branded = intent in {"brand_focused", "comparison"} or any(t in q for t in BRANDED_TERMS)
+
+    return {
+        "id": str(row.get("run_id")),
+        "ts": datetime.fromisoformat(str(row.get("ts")).replace("Z", "+00:00")),
+        "engine": row.get("engine"),
+        "model": row.get("model"),
+        "prompt_version": row.get("prompt_version"),
+        "intent": row.get("intent"),
+        "query": row.get("query"),
+        # Explicit rather than the column default: context defaults break multi-row INSERT ... VALUES
+        "query_norm": normalize_query(row.get("query")),
+        "status": row.get("status"),
+        "latency_ms": int(row.get("latency_ms", 0) or 0),
+        "input_tokens": int(row.get("input_tokens", 0) or 0),
+        "output_tokens": int(row.get("output_tokens", 0) or 0),
+        "cost_usd": float(row.get("cost_usd", 0.0) or 0.0),
+        "raw_excerpt": row.get("raw_excerpt"),
+        "vendors": row.get("vendors") or [],
+        "links": row.get("links") or [],
+        "domains": row.get("domains") or [],
+        "citations_enriched": row.get("citations_enriched") or [],
+        "entities_normalized": row.get("entities_normalized") or [],
+        "extreme_mentioned": bool(row.get("extreme_mentioned", False)),
+        "extreme_rank": row.get("extreme_rank"),
+        "is_branded": is_branded,
+        "deleted": False,
+        "source": source,
+    }
+
 
 def persist_run_to_db(row: Dict[str, Any]) -> None:
-    """Persist a run to the database. Legacy function name kept for compatibility."""
+    """Persist a run to the database synchronously. Request paths use run_writer.enqueue_run instead."""
+    values = run_values(row)
     db: Session = SessionLocal()
     try:
-        # Heuristic to classify branded vs non-branded
-        q = (row.get("query") or "").lower()
-        intent = (row.get("intent") or "").lower()
-        branded_terms = ["extreme", "cisco", "juniper", "aruba", "vs", "versus", "compare", "comparison"]
-        is_branded = intent in {"brand_focused", "comparison"} or any(t in q for t in branded_terms)
-
-        run = Run(
-            id=str(row.get("run_id")),
-            ts=datetime.fromisoformat(str(row.get("ts").replace("Z", "+00:00"))),
-            engine=row.get("engine"),
-            model=row.get("model"),
-            prompt_version=row.get("prompt_version"),
-            intent=row.get("intent"),
-            query=row.get("query"),
-            status=row.get("status"),
-            latency_ms=int(row.get("latency_ms", 0) or 0),
-            input_tokens=int(row.get("input_tokens", 0) or 0),
-            output_tokens=int(row.get("output_tokens", 0) or 0),
-            cost_usd=float(row.get("cost_usd", 0.0) or 0.0),
-            raw_excerpt=row.get("raw_excerpt"),
-            vendors=row.get("vendors") or [],
-            links=row.get("links") or [],
-            domains=row.get("domains") or [],
-            citations_enriched=row.get("citations_enriched") or [],
-            entities_normalized=row.get("entities_normalized") or [],
-            extreme_mentioned=bool(row.get("extreme_mentioned", False)),
-            extreme_rank=row.get("extreme_rank"),
-            is_branded=is_branded,
-        )
-        db.add(run)
+        db.add(Run(**values))
+        write_run_children(db, "runs", [values])
         db.commit()
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
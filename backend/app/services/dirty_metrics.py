@@ -0,0 +1,132 @@
+#incremental daily_metrics: run writes mark their (source, date, engine) partition dirty, the processor recomputes only those
+
+from __future__ import annotations
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .metrics import MetricsService
+from .metrics_cache import bump_data_version
+from .run_children import naive_utc
+from ..models.automated_run import AutomatedRun
+from ..models.metrics_dirty import DirtyMetricsPartition
+from ..models.run import Run
+
+PARTITION_KEY = ["run_source", "date", "engine"]
+
+
+def _mark(db: Session, partitions: Iterable[tuple]) -> int:
+    rows = [
+        {"run_source": run_source, "date": day, "engine": engine, "marked_at": datetime.utcnow()}
+        for run_source, day, engine in sorted(set(partitions))
+    ]
+    if rows:
+        stmt = insert(DirtyMetricsPartition).values(rows)
+        db.execute(stmt.on_conflict_do_update(index_elements=PARTITION_KEY, set_={"marked_at": stmt.excluded.marked_at}))
+        # Runs changed: cached /metrics responses are outdated once this transaction commits
+        bump_data_version(db)
+    return len(rows)
+
+
+def mark_dirty(db: Session, run_source: str, runs: Iterable[Mapping[str, Any]]) -> int:
+    """Mark the partitions of new, changed or deleted runs (ts + engine) in the caller's transaction.
+
+    Late-arriving runs mark the day they belong to, however old. Returns partitions marked.
+    """
+    return _mark(db, ((run_source, naive_utc(run["ts"]).date(), run["engine"]) for run in runs if run.get("engine")))
+
+
+def mark_day_dirty(db: Session, run_source: str, day: date) -> int:
+    """Mark every engine that has runs on `day` (explicit recompute of a date)."""
+    model = Run if run_source == "runs" else AutomatedRun
+    start = datetime.combine(day, time.min)
+    engines = db.scalars(
+        select(model.engine).where(model.ts >= start, model.ts < start + timedelta(days=1)).distinct()
+    ).all()
+    return _mark(db, ((run_source, day, engine) for engine in engines if engine))
+
+
+def _scoped(stmt, run_source: Optional[str], start: Optional[date], end: Optional[date]):
+    if run_source is not None:
+        stmt = stmt.where(DirtyMetricsPartition.run_source == run_source)
+    if start is not None:
+        stmt = stmt.where(DirtyMetricsPartition.date >= start)
+    if end is not None:
+        stmt = stmt.where(DirtyMetricsPartition.date <= end)
+    return stmt
+
+
+def pending_partitions(
+    db: Session, run_source: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None
+) -> int:
+    """Number of partitions waiting to be recomputed (optionally for one source / date range)."""
+    stmt = _scoped(select(func.count()).select_from(DirtyMetricsPartition), run_source, start, end)
+    return db.scalar(stmt) or 0
+
+
+def _recompute(db: Session, service: MetricsService, run_source: str, day: date, engine: str) -> int:
+    if run_source == "automated_runs":
+        metrics = service.compute_daily_metrics_from_automated(day, engine)
+    else:
+        metrics = service.compute_daily_metrics(day, engine)
+    service.replace_daily_metrics(run_source, day, engine, metrics)
+
+    if run_source == "automated_runs":
+        start = datetime.combine(day, time.min)
+        db.execute(
+            update(AutomatedRun)
+            .where(AutomatedRun.ts >= start, AutomatedRun.ts < start + timedelta(days=1), AutomatedRun.engine == engine)
+            .values(metrics_computed=True, processed_at=datetime.utcnow())
+        )
+    return len(metrics)
+
+
+def process_dirty_partitions(
+    db: Session,
+    limit: Optional[int] = None,
+    run_source: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> Dict[str, int]:
+    """Recompute daily_metrics for dirty partitions, oldest mark first, one transaction per partition.
+
+    run_source / start / end (inclusive) restrict the pass, e.g. to one backfill worker's date range.
+
+    Each partition row is locked with SKIP LOCKED while it is recomputed, so concurrent processors split
+    the work. A run written meanwhile re-marks the partition (later marked_at), so it stays dirty for
+    the next pass instead of being cleared with stale metrics. Returns partitions done, metric rows
+    written and failures.
+    """
+    service = MetricsService(db)
+    counts = {"partitions": 0, "metrics": 0, "failed": 0}
+    stmt = select(DirtyMetricsPartition.run_source, DirtyMetricsPartition.date, DirtyMetricsPartition.engine)
+    stmt = _scoped(stmt, run_source, start, end).order_by(DirtyMetricsPartition.marked_at)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    keys = db.execute(stmt).all()
+    db.commit()
+
+    for run_source, day, engine in keys:
+        where = (
+            DirtyMetricsPartition.run_source == run_source,
+            DirtyMetricsPartition.date == day,
+            DirtyMetricsPartition.engine == engine,
+        )
+        try:
+            marked_at = db.scalar(select(DirtyMetricsPartition.marked_at).where(*where).with_for_update(skip_locked=True))
+            if marked_at is None:
+                db.rollback()  # another processor holds it or already finished it
+                continue
+            written = _recompute(db, service, run_source, day, engine)
+            db.execute(delete(DirtyMetricsPartition).where(*where, DirtyMetricsPartition.marked_at <= marked_at))
+            db.commit()
+            counts["partitions"] += 1
+            counts["metrics"] += written
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️  Recomputing daily metrics for {run_source} {day} {engine} failed: {e}")
+            counts["failed"] += 1
+    return counts
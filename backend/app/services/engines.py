@@ -1,12 +1,15 @@
 #connects to openai and perplexity, and normalizes responses to a common dict
 
 from __future__ import annotations
+import asyncio
 import time
 from typing import Any, Dict
 import os
 
 from .adapters import chatgpt_api as openai_adapter
 from .adapters import perplexity as perplexity_adapter
+from .response_cache import cache_key, get_response_cache
+from .rate_limiter import estimate_tokens, get_rate_limiter
 
 #normalizes openai and perplexity responses to a common dict, and uses system prompt to guide responses
 
@@ -191,43 +194,177 @@ def _normalize_perplexity(resp: Any, started_at: float) -> Dict[str, Any]:
     }
 
 
-def call_engine(engine: str, prompt: str, temperature: float, model: str | None = None) -> Dict[str, Any]:
-    """Call the specified engine and return a normalized dict.
-    { text, model, input_tokens, output_tokens, latency_ms, cost_usd (optional) }
-    """
-    t0 = time.time()
+def _finalize_openai(norm: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace an empty OpenAI answer with a debug summary so it shows up on runs/{id}."""
+    if not (norm.get("text") or "").strip():
+        # Persist a concise debug summary so it shows up on runs/{id}
+        meta = norm.get("debug_meta") or {}
+        usage = f"in {norm.get('input_tokens', 0)}, out {norm.get('output_tokens', 0)}"
+        types = ",".join((meta.get("item_types") or [])[:5])
+        blocks = meta.get("num_blocks")
+        model_name = norm.get("model") or "openai"
+        debug_str = (
+            f"[No text returned by {model_name}. Tokens: {usage}. "
+            f"blocks: {blocks}, types: {types}]"
+        )
+        preview = norm.get("raw_preview") or ""
+        norm["text"] = debug_str + ("\n" + preview if preview else "")
+        try:
+            print("OPENAI WARNING: Empty text from model.", {"model": model_name, "usage": usage, "blocks": blocks, "types": types})
+            if preview:
+                print("OPENAI OUTPUT PREVIEW:", preview[:500])
+        except Exception:
+            pass
+    return norm
+
+
+# Fields kept in the response cache; latency and debug previews describe the original call only
+_CACHED_FIELDS = ("text", "model", "input_tokens", "output_tokens", "cost_usd")
+
+
+def _cache_key_for(engine: str, prompt: str, temperature: float, model: str | None, prompt_version: str | None) -> str | None:
+    """Response cache key using the model id and system prompt the adapter will actually send."""
+    if engine == "openai":
+        return cache_key(engine, openai_adapter.resolve_model(model), prompt, temperature, prompt_version or "", openai_adapter.SYSTEM_PROMPT)
+    if engine == "perplexity":
+        return cache_key(engine, model or 'sonar', prompt, temperature, prompt_version or "", perplexity_adapter.PROMPT_TEMPLATE)
+    return None
 
 
+def _is_cacheable(norm: Dict[str, Any]) -> bool:
+    # Never cache adapter errors or the empty-answer debug summary
+    text = (norm.get("text") or "").strip()
+    return bool(text) and not text.startswith("Error:") and not text.startswith("[No text returned")
+
+
+def _from_cache(hit: Dict[str, Any], started_at: float) -> Dict[str, Any]:
+    norm = dict(hit)
+    norm["latency_ms"] = int((time.time() - started_at) * 1000)
+    # Served without an API call: no spend, and no tokens for callers that price or count usage from them
+    norm["cost_usd"] = 0.0
+    norm["input_tokens"] = 0
+    norm["output_tokens"] = 0
+    norm["cached"] = True
+    return norm
+
+
+def _limiter_for(engine: str, model: str | None):
+    """Shared rate limiter for the provider and the model id the adapter will actually use."""
+    if engine == "openai":
+        return get_rate_limiter(engine, openai_adapter.resolve_model(model))
+    return get_rate_limiter(engine, model or 'sonar')
+
+
+def _tokens_used(norm: Dict[str, Any]) -> int:
+    return int(norm.get("input_tokens", 0) or 0) + int(norm.get("output_tokens", 0) or 0)
+
+
+def _call_engine(engine: str, prompt: str, temperature: float, model: str | None = None) -> Dict[str, Any]:
+    t0 = time.time()
 
     # Legacy engine names for backward compatibility
     if engine == "openai":
         # Pass the raw user query; adapter sets concise instructions and caps output length.
         # Respect requested model if provided; otherwise fall back to env default or adapter default.
-        resp = openai_adapter.run_query(prompt, model=model, max_output_tokens=500, temperature=temperature)
-        norm = _normalize_openai(resp, t0)
-        if not (norm.get("text") or "").strip():
-            # Persist a concise debug summary so it shows up on runs/{id}
-            meta = norm.get("debug_meta") or {}
-            usage = f"in {norm.get('input_tokens', 0)}, out {norm.get('output_tokens', 0)}"
-            types = ",".join((meta.get("item_types") or [])[:5])
-            blocks = meta.get("num_blocks")
-            model_name = norm.get("model") or "openai"
-            debug_str = (
-                f"[No text returned by {model_name}. Tokens: {usage}. "
-                f"blocks: {blocks}, types: {types}]"
-            )
-            preview = norm.get("raw_preview") or ""
-            norm["text"] = debug_str + ("\n" + preview if preview else "")
-            try:
-                print("OPENAI WARNING: Empty text from model.", {"model": model_name, "usage": usage, "blocks": blocks, "types": types})
-                if preview:
-                    print("OPENAI OUTPUT PREVIEW:", preview[:500])
-            except Exception:
-                pass
-        return norm
+        return _limiter_for(engine, model).call(
+            lambda: _finalize_openai(_normalize_openai(
+                openai_adapter.run_query(prompt, model=model, max_output_tokens=500, temperature=temperature), t0
+            )),
+            estimate_tokens(prompt),
+            _tokens_used,
+        )
 
     if engine == "perplexity":
-        resp = perplexity_adapter.run_query(prompt, temperature=temperature, model=model or 'sonar')
-        return _normalize_perplexity(resp, t0)
+        return _limiter_for(engine, model).call(
+            lambda: _normalize_perplexity(
+                perplexity_adapter.run_query(prompt, temperature=temperature, model=model or 'sonar'), t0
+            ),
+            estimate_tokens(prompt),
+            _tokens_used,
+        )
+
+    raise ValueError(f"Unsupported engine: {engine}")
+
+
+def call_engine(
+    engine: str,
+    prompt: str,
+    temperature: float,
+    model: str | None = None,
+    prompt_version: str | None = None,
+    use_cache: bool = False,
+) -> Dict[str, Any]:
+    """Call the specified engine and return a normalized dict.
+    { text, model, input_tokens, output_tokens, latency_ms, cost_usd (optional) }
+
+    With use_cache, an identical earlier call within the cache TTL is returned (marked `cached`) without an API call.
+    """
+    t0 = time.time()
+    cache = get_response_cache() if use_cache else None
+    key = _cache_key_for(engine, prompt, temperature, model, prompt_version) if cache else None
+    if key:
+        hit = cache.get(key)
+        if hit is not None:
+            return _from_cache(hit, t0)
+
+    norm = _call_engine(engine, prompt, temperature, model)
+    if key and _is_cacheable(norm):
+        cache.set(key, {k: norm.get(k) for k in _CACHED_FIELDS}, engine, norm.get("model") or "")
+    return norm
+
+
+# Per-engine wall-clock budget (seconds) for the asyncio path, retries included; each engine times out independently
+ENGINE_TIMEOUTS: Dict[str, float] = {
+    "openai": float(os.getenv("EGT_OPENAI_TIMEOUT_S", "60")),
+    "perplexity": float(os.getenv("EGT_PERPLEXITY_TIMEOUT_S", "60")),
+}
+
+
+async def _call_engine_async(engine: str, prompt: str, temperature: float, model: str | None, budget: float | None) -> Dict[str, Any]:
+    t0 = time.time()
+
+    if engine == "openai":
+        async def attempt():
+            resp = await openai_adapter.run_query_async(prompt, model=model, max_output_tokens=500, temperature=temperature)
+            return _finalize_openai(_normalize_openai(resp, t0))
+    elif engine == "perplexity":
+        async def attempt():
+            resp = await perplexity_adapter.run_query_async(prompt, temperature=temperature, model=model or 'sonar', timeout=budget)
+            return _normalize_perplexity(resp, t0)
+    else:
+        raise ValueError(f"Unsupported engine: {engine}")
+
+    # One budget for the whole call: rate-limiter waits, every retry and the backoff between them
+    return await asyncio.wait_for(
+        _limiter_for(engine, model).call_async(attempt, estimate_tokens(prompt), _tokens_used),
+        timeout=budget,
+    )
+
+
+async def call_engine_async(
+    engine: str,
+    prompt: str,
+    temperature: float,
+    model: str | None = None,
+    timeout: float | None = None,
+    prompt_version: str | None = None,
+    use_cache: bool = False,
+) -> Dict[str, Any]:
+    """Asyncio counterpart of call_engine; returns the same normalized dict.
+
+    Raises asyncio.TimeoutError if the engine exceeds `timeout` (defaults to ENGINE_TIMEOUTS[engine]).
+    """
+    t0 = time.time()
+    budget = timeout if timeout is not None else ENGINE_TIMEOUTS.get(engine)
+    cache = get_response_cache() if use_cache else None
+    key = _cache_key_for(engine, prompt, temperature, model, prompt_version) if cache else None
+    if key:
+        # The Postgres backend blocks, so cache I/O stays off the event loop
+        hit = await asyncio.to_thread(cache.get, key)
+        if hit is not None:
+            return _from_cache(hit, t0)
 
-    raise ValueError(f"Unsupported engine: {engine}")
\ No newline at end of file
+    norm = await _call_engine_async(engine, prompt, temperature, model, budget)
+    if key and _is_cacheable(norm):
+        await asyncio.to_thread(cache.set, key, {k: norm.get(k) for k in _CACHED_FIELDS}, engine, norm.get("model") or "")
+    return norm
@@ -0,0 +1,143 @@
+#background run enrichment: run detail reads return at once and a worker pool fills citation titles/entities on the row
+
+from __future__ import annotations
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from .database import SessionLocal
+from .dirty_metrics import mark_dirty
+from .metrics_cube import cube_values, update_run_in_cube
+from .run_children import as_json_list
+from .url_metadata import enrich_citations
+
+DEFAULT_WORKERS = int(os.getenv("EGT_ENRICHMENT_WORKERS", "4"))
+
+
+def needs_enrichment(row: Any) -> bool:
+    """True when the run has links but no enriched citations yet, i.e. enrichment would touch the network."""
+    return not row.citations_enriched and bool(as_json_list(row.links))
+
+
+def enrich_run(run_id: str, session_factory: Callable = SessionLocal) -> bool:
+    """Fill citations_enriched (with titles) and entities_normalized of one run and persist them.
+
+    Scheduled runs are written with empty citations_enriched, so the run's cube cell and daily_metrics
+    partition are refreshed in the same transaction. Returns False when the run is gone or already enriched.
+    """
+    # Local import to avoid circular deps (routes.runs submits to this queue)
+    from ..models.run import Run
+    from ..routes.runs import _normalize_entities
+
+    db = session_factory()
+    try:
+        row = db.get(Run, run_id)
+        if row is None or not needs_enrichment(row):
+            return False
+        before = cube_values("runs", row)
+        if not row.citations_enriched:
+            row.citations_enriched = enrich_citations(as_json_list(row.links), db=db)
+        if not row.entities_normalized:
+            row.entities_normalized = _normalize_entities(as_json_list(row.vendors))
+        update_run_in_cube(db, "runs", before, cube_values("runs", row))
+        # also bumps the data version, so cached /metrics responses are recomputed
+        mark_dirty(db, "runs", [{"ts": row.ts, "engine": row.engine}])
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+class EnrichmentQueue:
+    """Run ids waiting for enrichment, worked off by a small thread pool.
+
+    An id is queued at most once at a time, so repeated polls of the same run never stack fetches.
+    """
+
+    def __init__(self, worker: Callable[[str], Any] = enrich_run, workers: int = DEFAULT_WORKERS):
+        self.worker = worker
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, run_id: str) -> bool:
+        """Queue run_id unless it is already queued or running; returns immediately."""
+        with self._lock:
+            if self._closed:
+                return False
+            if run_id in self._pending:
+                self.duplicates += 1
+                return False
+            self._pending.add(run_id)
+            self.submitted += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="run-enrichment")
+            executor = self._executor
+        executor.submit(self._run, run_id)
+        return True
+
+    def pending(self, run_id: str) -> bool:
+        """True while run_id is queued or being enriched."""
+        with self._lock:
+            return run_id in self._pending
+
+    def _run(self, run_id: str) -> None:
+        try:
+            self.worker(run_id)
+        except Exception as e:
+            print(f"⚠️  Run enrichment failed for {run_id}: {e}")
+            with self._lock:
+                self.failed += 1
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(run_id)
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting runs; queued ones are dropped (the next read of the run queues it again)."""
+        with self._lock:
+            self._closed = True
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "duplicates": self.duplicates,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+_queue: Optional[EnrichmentQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    """Process-wide enrichment queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = EnrichmentQueue()
+            atexit.register(_queue.close, False)
+        return _queue
+
+
+def close_enrichment_queue() -> None:
+    """Stop the enrichment workers; called on app shutdown."""
+    if _queue is not None:
+        _queue.close(wait=False)
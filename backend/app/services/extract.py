@@ -1,6 +1,8 @@
 from __future__ import annotations
+import os
 import re
-from typing import List
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from ..schemas.query_schemas import VendorItem
 from urllib.parse import urlparse
@@ -123,31 +125,130 @@ ALIASES = {
     "huawei technologies": "Huawei",
 }
 
+#single-pass matcher over every canonical vendor name and alias
+class VendorMatcher:
+    """Finds all COMPETITORS and ALIASES in one scan of the text.
+
+    Terms are folded into a character trie and compiled into one case-insensitive
+    alternation wrapped in a lookahead, so overlapping mentions (e.g. "HPE" inside
+    "HPE Aruba") are still seen. At each hit the greedy trie reports the longest term
+    that ends on a word boundary; shorter terms that are prefixes of it are checked
+    with small anchored patterns built once at construction time.
+    """
+
+    def __init__(self, competitors: List[str], aliases: Dict[str, str]):
+        # lowered term -> [(term_index, canonical)], term_index preserves the old scan order for ties
+        self.terms: Dict[str, List[Tuple[int, str]]] = {}
+        ordered = [(v, v) for v in competitors] + list(aliases.items())
+        for idx, (term, canonical) in enumerate(ordered):
+            if term:
+                self.terms.setdefault(term.lower(), []).append((idx, canonical))
+
+        self.pattern = re.compile(rf"(?=\b({_trie_regex(self.terms.keys())})\b)", re.IGNORECASE)
+
+        # shorter terms that can start at the same offset as a longer match
+        self.prefix_terms: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+        for term in self.terms:
+            prefixes = [
+                (other, re.compile(rf"{re.escape(other)}\b", re.IGNORECASE))
+                for other in self.terms
+                if other != term and term.startswith(other)
+            ]
+            if prefixes:
+                self.prefix_terms[term] = prefixes
+
+        # a match is final once this many characters follow its start (term + boundary char)
+        self.max_term_len = max((len(t) for t in self.terms), default=0)
+
+    def find(self, text: str) -> List[VendorItem]:
+        """Return one VendorItem per canonical vendor at its earliest position."""
+        best: Dict[str, Tuple[int, int, str]] = {}
+        self.scan(text, 0, len(text), best)
+        return self.to_items(best)
+
+    def scan(self, text: str, start: int, stop: int, best: Dict[str, Tuple[int, int, str]]) -> List[str]:
+        """Record matches starting in [start, stop) into `best` (canonical key -> (first_pos, term_index, canonical)).
+
+        Returns canonical keys seen for the first time. The whole string is still visible to the
+        regex, so word boundaries and terms running past `stop` are evaluated correctly.
+        """
+        new_keys: List[str] = []
+
+        def _record(term: str, pos: int) -> None:
+            for idx, canonical in self.terms[term]:
+                key = canonical.lower()
+                cur = best.get(key)
+                if cur is None:
+                    new_keys.append(key)
+                if cur is None or (pos, idx) < cur[:2]:
+                    best[key] = (pos, idx, canonical)
+
+        for m in self.pattern.finditer(text, start):
+            pos = m.start()
+            if pos >= stop:
+                break
+            term = m.group(1).lower()
+            _record(term, pos)
+            for other, anchored in self.prefix_terms.get(term, ()):
+                if anchored.match(text, pos):
+                    _record(other, pos)
+        return new_keys
+
+    @staticmethod
+    def to_items(best: Dict[str, Tuple[int, int, str]]) -> List[VendorItem]:
+        """Order recorded matches by earliest position (ties keep the old scan order)."""
+        return [
+            VendorItem(name=canonical, first_pos=pos)
+            for pos, _, canonical in sorted(best.values())
+        ]
+
+
+def _trie_regex(terms) -> str:
+    """Build a regex alternation from a character trie; greedy optionals prefer the longest term."""
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _render(node: Dict[str, dict]) -> str:
+        is_end = "" in node
+        branches = [re.escape(ch) + _render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            return ("(?:" + body + ")?") if len(branches) == 1 else body + "?"
+        return body
+
+    return _render(trie)
+
+
+_matcher: Optional[VendorMatcher] = None
+_matcher_key: Optional[tuple] = None
+
+
+def get_vendor_matcher() -> VendorMatcher:
+    """Return the shared matcher, rebuilding it only if COMPETITORS or ALIASES changed."""
+    global _matcher, _matcher_key
+    key = (tuple(COMPETITORS), tuple(ALIASES.items()))
+    if _matcher is None or key != _matcher_key:
+        _matcher = VendorMatcher(COMPETITORS, ALIASES)
+        _matcher_key = key
+    return _matcher
+
+
 #extracts competitors using array of competitors
 def extract_competitors(text: str) -> List[VendorItem]:
-    txt = (text or "")
-    found: List[VendorItem] = []
-    # 1) Canonical names
-    for v in COMPETITORS:
-        pattern = re.compile(rf"\b{re.escape(v)}\b", re.IGNORECASE)
-        m = pattern.search(txt)
-        if m:
-            found.append(VendorItem(name=v, first_pos=m.start()))
-    # 2) Aliases → canonical
-    for alias, canonical in ALIASES.items():
-        pattern = re.compile(rf"\b{re.escape(alias)}\b", re.IGNORECASE)
-        m = pattern.search(txt)
-        if m:
-            found.append(VendorItem(name=canonical, first_pos=m.start()))
-    # dedupe by canonical name, keep earliest match
-    seen = set()
-    out: List[VendorItem] = []
-    for item in sorted(found, key=lambda x: x.first_pos or 10**9):
-        key = item.name.lower()
-        if key not in seen:
-            out.append(item)
-            seen.add(key)
-    return out
+    """Return canonical vendors mentioned in text, ordered by earliest mention."""
+    return get_vendor_matcher().find(text or "")
+
+
+_MARKDOWN_LINK_RE = re.compile(r"\[[^\]]+\]\((https?://[^)\s]+)\)")
+# raw URL pattern shared by extract_links and IncrementalExtractor (which uses it to spot settled URLs while streaming)
+_RAW_URL_RE = re.compile(r"https?://[^\s<>\]\)\"]+")
+
 
 #using regex to extract links
 def extract_links(text: str) -> List[str]:
@@ -156,11 +257,11 @@ def extract_links(text: str) -> List[str]:
     links: List[str] = []
 
     # 1) Markdown links: [title](url)
-    for m in re.finditer(r"\[[^\]]+\]\((https?://[^)\s]+)\)", s):
+    for m in _MARKDOWN_LINK_RE.finditer(s):
         links.append(m.group(1))
 
     # 2) Raw URLs
-    for m in re.finditer(r"https?://[^\s<>\]\)\"]+", s):
+    for m in _RAW_URL_RE.finditer(s):
         links.append(m.group(0))
 
     # Cleanup trailing punctuation and brackets
@@ -199,7 +300,118 @@ def to_domains(links: List[str]) -> List[str]:
             pass
     return out
 
+#runs every extractor on one answer
+def extract_all(text: str) -> Dict[str, Any]:
+    """Run vendor, link and domain extraction on one answer.
+
+    Vendors are returned as plain dicts (the shape stored in the JSON columns) so results
+    pickle cheaply across process boundaries.
+    """
+    links = extract_links(text)
+    return {
+        "vendors": [v.model_dump() for v in extract_competitors(text)],
+        "links": links,
+        "domains": to_domains(links),
+    }
+
+
+#batch extraction, fans out to a process pool for large corpora (e.g. re-extraction after alias changes)
+def extract_many(
+    texts: Sequence[str],
+    processes: Optional[int] = None,
+    chunksize: int = 64,
+    executor: Optional[Executor] = None,
+) -> List[Dict[str, Any]]:
+    """Run extract_all over many texts, preserving input order.
+
+    Pass a long-lived `executor` to reuse worker processes across batches; otherwise a
+    temporary pool of `processes` workers is created. Small batches (or processes <= 1)
+    run inline since pool start-up would dominate.
+    """
+    texts = [t or "" for t in texts]
+    if executor is not None:
+        return list(executor.map(extract_all, texts, chunksize=max(1, chunksize)))
+
+    workers = processes if processes is not None else (os.cpu_count() or 1)
+    if workers <= 1 or len(texts) < chunksize * 2:
+        return [extract_all(t) for t in texts]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract_all, texts, chunksize=max(1, chunksize)))
+
+#incremental extraction for streamed answers (SSE), fed one delta at a time
+class IncrementalExtractor:
+    """Extracts vendors and links while an answer streams in.
+
+    Only the settled prefix of the buffer is scanned on each feed: a vendor match is settled
+    once `max_term_len` characters follow its start, and a raw URL once a terminator follows it,
+    so matches straddling chunk boundaries are picked up on a later feed. finish() scans just the
+    remaining tail; final vendors are identical to extract_competitors(full_text) and final links
+    to extract_links(full_text).
+    """
+
+    def __init__(self):
+        self.matcher = get_vendor_matcher()
+        self.text = ""
+        self.vendors: List[VendorItem] = []
+        self.links: List[str] = []
+        self.domains: List[str] = []
+        self._best: Dict[str, Tuple[int, int, str]] = {}
+        self._vendor_pos = 0
+        self._link_pos = 0
+        self._seen_links: set = set()
+
+    def feed(self, delta: str) -> Tuple[List[VendorItem], List[str]]:
+        """Append a delta; return (vendors first seen, links first seen) in the settled region."""
+        if delta:
+            self.text += delta
+        stop = max(self._vendor_pos, len(self.text) - self.matcher.max_term_len)
+        new_vendors = self._scan_vendors(stop)
+        new_links = self._scan_links()
+        return new_vendors, new_links
+
+    def finish(self) -> Tuple[List[VendorItem], List[str]]:
+        """Scan the unsettled tail and compute final vendors, links and domains.
+
+        Returns anything not reported by earlier feeds.
+        """
+        new_vendors = self._scan_vendors(len(self.text))
+        self.vendors = self.matcher.to_items(self._best)
+        self.links = extract_links(self.text)
+        self.domains = to_domains(self.links)
+        new_links = [u for u in self.links if u not in self._seen_links]
+        self._seen_links.update(new_links)
+        return new_vendors, new_links
+
+    def _scan_vendors(self, stop: int) -> List[VendorItem]:
+        if stop <= self._vendor_pos:
+            return []
+        new_keys = self.matcher.scan(self.text, self._vendor_pos, stop, self._best)
+        self._vendor_pos = stop
+        return [VendorItem(name=self._best[k][2], first_pos=self._best[k][0]) for k in new_keys]
+
+    def _scan_links(self) -> List[str]:
+        out: List[str] = []
+        for m in _RAW_URL_RE.finditer(self.text, self._link_pos):
+            if m.end() >= len(self.text):
+                # URL may still be growing; rescan from its start next time
+                self._link_pos = m.start()
+                return out
+            self._link_pos = m.end()
+            url = m.group(0).rstrip('.,);:]')
+            try:
+                p = urlparse(url)
+            except Exception:
+                continue
+            if p.scheme in ("http", "https") and p.netloc and url not in self._seen_links:
+                self._seen_links.add(url)
+                out.append(url)
+        # no URL in progress; a new one can only start within the last few characters
+        self._link_pos = max(self._link_pos, len(self.text) - len("https://"))
+        return out
+
+
 # #placeholder stub for extracting sources using llm, would be a multi agent approach where second follow up agent is used to extract sources
 # def extract_sources_llm(answer_text: str) -> List[str]:
 #     """Placeholder stub. If needed, wire to OpenAI like the original implementation."""
-#     return []
\ No newline at end of file
+#     return []
@@ -0,0 +1,208 @@
+#process-wide registry of pooled, keep-alive HTTP clients for the engine providers
+
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Set, Tuple
+
+import httpx
+
+try:
+    # HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 keep-alive without it
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+
+# provider -> pool settings. Both APIs negotiate HTTP/2 over ALPN.
+PROVIDER_POOLS: Dict[str, Dict[str, Any]] = {
+    "openai": {
+        "max_connections": int(os.getenv("EGT_OPENAI_MAX_CONNECTIONS", "20")),
+        "max_keepalive": int(os.getenv("EGT_OPENAI_MAX_KEEPALIVE", "10")),
+        "http2": True,
+    },
+    "perplexity": {
+        "max_connections": int(os.getenv("EGT_PERPLEXITY_MAX_CONNECTIONS", "10")),
+        "max_keepalive": int(os.getenv("EGT_PERPLEXITY_MAX_KEEPALIVE", "5")),
+        "http2": True,
+    },
+    # Citation page title fetches (services/url_metadata.py); arbitrary hosts, so plain HTTP/1.1 keep-alive
+    "titles": {
+        "max_connections": int(os.getenv("EGT_TITLES_MAX_CONNECTIONS", "32")),
+        "max_keepalive": int(os.getenv("EGT_TITLES_MAX_KEEPALIVE", "16")),
+        "http2": False,
+    },
+}
+
+# Idle connections are kept this long before being closed
+KEEPALIVE_EXPIRY_S = float(os.getenv("EGT_HTTP_KEEPALIVE_S", "60"))
+# Read budget for a single call; engines.call_engine_async applies its own overall timeout on top
+DEFAULT_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+class ConnectionStats:
+    """Counts requests vs. new connections per provider to report pool reuse."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.handshake_s = 0.0
+
+    def on_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def tracer(self):
+        """Per-request httpcore trace callback timing TCP connect + TLS handshake."""
+        started: Dict[str, float] = {}
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            # connection.connect_tcp.* and connection.start_tls.* fire only when a new connection is opened
+            step = "tcp" if ".connect_tcp." in event else "tls" if ".start_tls." in event else None
+            if step is None:
+                return
+            now = time.perf_counter()
+            if event.endswith(".started"):
+                started[step] = now
+                if step == "tcp":
+                    with self._lock:
+                        self.new_connections += 1
+            elif event.endswith(".complete") and step in started:
+                with self._lock:
+                    self.handshake_s += now - started.pop(step)
+
+        return trace
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            avg_handshake_ms = (self.handshake_s / self.new_connections * 1000) if self.new_connections else 0.0
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_requests": reused,
+                "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+                "avg_handshake_ms": round(avg_handshake_ms, 1),
+                # every reused request skipped one TCP+TLS handshake
+                "handshake_ms_saved": round(reused * avg_handshake_ms, 1),
+            }
+
+
+_lock = threading.Lock()
+_stats: Dict[str, ConnectionStats] = {name: ConnectionStats() for name in PROVIDER_POOLS}
+_sync_clients: Dict[str, httpx.Client] = {}
+# async clients are tied to the event loop that created their connections
+_async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+# close tasks of replaced async clients, referenced until they finish
+_closing: Set[asyncio.Task] = set()
+
+
+def _client_kwargs(provider: str) -> Dict[str, Any]:
+    cfg = PROVIDER_POOLS[provider]
+    return {
+        "http2": bool(cfg["http2"] and HTTP2_AVAILABLE),
+        "limits": httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_keepalive"],
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+        "timeout": DEFAULT_TIMEOUT,
+    }
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Return the shared sync client for a provider, creating it on first use."""
+    client = _sync_clients.get(provider)
+    if client is not None and not client.is_closed:
+        return client
+    with _lock:
+        client = _sync_clients.get(provider)
+        if client is None or client.is_closed:
+            stats = _stats[provider]
+
+            def _instrument(request: httpx.Request) -> None:
+                stats.on_request()
+                request.extensions["trace"] = stats.tracer()
+
+            client = httpx.Client(event_hooks={"request": [_instrument]}, **_client_kwargs(provider))
+            _sync_clients[provider] = client
+        return client
+
+
+async def _aclose_stale(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # "Event loop is closed": the sockets are closed already, only the old loop's callbacks fail
+        pass
+
+
+def _retire_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """Close a client bound to another event loop so its connection pool does not leak."""
+    if client.is_closed:
+        return
+    if loop.is_running():
+        # still serving another thread: close it there
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_stale(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """Return the shared async client for a provider on the running event loop.
+
+    A client left over from another loop is closed before it is replaced.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(provider)
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    if entry is not None:
+        _retire_async_client(*entry)
+    stats = _stats[provider]
+
+    async def _instrument(request: httpx.Request) -> None:
+        stats.on_request()
+        trace = stats.tracer()
+
+        async def _atrace(event: str, info: Dict[str, Any]) -> None:
+            trace(event, info)
+
+        request.extensions["trace"] = _atrace
+
+    client = httpx.AsyncClient(event_hooks={"request": [_instrument]}, **_client_kwargs(provider))
+    _async_clients[provider] = (loop, client)
+    return client
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Per-provider connection reuse and handshake time saved since process start."""
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "providers": {name: stats.snapshot() for name, stats in _stats.items()},
+    }
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client; registered as a FastAPI shutdown hook."""
+    with _lock:
+        sync_clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in sync_clients:
+        client.close()
+    async_clients = list(_async_clients.values())
+    _async_clients.clear()
+    for loop, client in async_clients:
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            _retire_async_client(loop, client)
+    pending = [task for task in _closing if task.get_loop() is asyncio.get_running_loop()]
+    if pending:
+        await asyncio.gather(*pending)
@@ -0,0 +1,161 @@
+#durable job queue for scheduled query batches, backed by the query_jobs table
+
+from __future__ import annotations
+import os
+import socket
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models.query_job import QueryJob
+
+# Running jobs whose lease lapses (worker crashed or host restarted) are handed to another worker
+DEFAULT_LEASE_S = int(os.getenv("EGT_JOB_LEASE_S", "600"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("EGT_JOB_MAX_ATTEMPTS", "3"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def make_worker_id() -> str:
+    """Identifier unique to this process, recorded on the jobs it holds."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _insert(db: Session):
+    # ON CONFLICT DO NOTHING lets concurrent workers materialize the same plan safely
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(QueryJob)
+
+
+def materialize_plan(db: Session, batch_date: date, queries: List[Dict[str, Any]], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """Store the day's plan as pending jobs once. Returns the number of jobs now in the batch."""
+    existing = db.scalar(select(func.count(QueryJob.id)).where(QueryJob.batch_date == batch_date))
+    if existing:
+        return existing
+    if queries:
+        now = _now()
+        rows = [
+            {
+                "batch_date": batch_date,
+                "seq": seq,
+                "query": q["query"],
+                "engine": q["engine"],
+                "model": q.get("model"),
+                "intent": q.get("intent"),
+                "status": "pending",
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for seq, q in enumerate(queries)
+        ]
+        db.execute(_insert(db).values(rows).on_conflict_do_nothing(index_elements=["batch_date", "seq"]))
+        db.commit()
+    return db.scalar(select(func.count(QueryJob.id)).where(QueryJob.batch_date == batch_date)) or 0
+
+
+def _claimable(batch_date: date, now: datetime):
+    return and_(
+        QueryJob.batch_date == batch_date,
+        QueryJob.attempts < QueryJob.max_attempts,
+        or_(
+            QueryJob.status == "pending",
+            and_(QueryJob.status == "running", QueryJob.lease_expires_at < now),
+        ),
+    )
+
+
+def claim_jobs(db: Session, batch_date: date, worker_id: str, limit: int, lease_s: int = DEFAULT_LEASE_S) -> List[QueryJob]:
+    """Lease up to `limit` jobs in plan order. SKIP LOCKED lets many workers claim concurrently without overlap."""
+    now = _now()
+    # Expired leases that used up their attempts will never be claimed again
+    db.execute(
+        update(QueryJob)
+        .where(
+            QueryJob.batch_date == batch_date,
+            QueryJob.status == "running",
+            QueryJob.lease_expires_at < now,
+            QueryJob.attempts >= QueryJob.max_attempts,
+        )
+        .values(status="failed", last_error="lease expired on final attempt", updated_at=now)
+    )
+    ids = (
+        select(QueryJob.id)
+        .where(_claimable(batch_date, now))
+        .order_by(QueryJob.seq)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed_ids = list(db.scalars(ids))
+    if not claimed_ids:
+        db.commit()
+        return []
+    db.execute(
+        update(QueryJob)
+        .where(QueryJob.id.in_(claimed_ids))
+        .values(
+            status="running",
+            attempts=QueryJob.attempts + 1,
+            worker_id=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_s),
+            updated_at=now,
+        )
+    )
+    db.commit()
+    jobs = list(db.scalars(select(QueryJob).where(QueryJob.id.in_(claimed_ids)).order_by(QueryJob.seq)))
+    # Detach so worker threads can read job fields without touching the session
+    db.expunge_all()
+    return jobs
+
+
+def _owned(job_id: int, worker_id: str):
+    # Only the current lease holder may settle a job; a worker whose lease lapsed loses the write
+    return and_(QueryJob.id == job_id, QueryJob.worker_id == worker_id, QueryJob.status == "running")
+
+
+def mark_done(db: Session, job_id: int, worker_id: str, run_id: str) -> bool:
+    """Flag the job done in the caller's transaction (alongside the run insert). False if the lease was lost."""
+    result = db.execute(
+        update(QueryJob)
+        .where(_owned(job_id, worker_id))
+        .values(status="done", run_id=run_id, last_error=None, lease_expires_at=None, updated_at=_now())
+    )
+    return result.rowcount == 1
+
+
+def mark_failed(db: Session, job: QueryJob, worker_id: str, error: str) -> str:
+    """Return a failed job to pending, or fail it for good once attempts run out. Commits; returns the new status."""
+    status = "failed" if job.attempts >= job.max_attempts else "pending"
+    db.execute(
+        update(QueryJob)
+        .where(_owned(job.id, worker_id))
+        .values(status=status, last_error=(error or "")[:2000], lease_expires_at=None, updated_at=_now())
+    )
+    db.commit()
+    return status
+
+
+def batch_progress(db: Session, batch_date: date) -> Dict[str, int]:
+    """Job counts per status for one batch."""
+    rows = db.execute(
+        select(QueryJob.status, func.count(QueryJob.id))
+        .where(QueryJob.batch_date == batch_date)
+        .group_by(QueryJob.status)
+    ).all()
+    return {status: int(count) for status, count in rows}
+
+
+def find_unfinished_batch(db: Session) -> Optional[date]:
+    """Most recent batch that still has pending or running jobs (e.g. after a crash or restart)."""
+    return db.scalar(
+        select(func.max(QueryJob.batch_date)).where(QueryJob.status.in_(("pending", "running")))
+    )
@@ -1,14 +1,81 @@
 from __future__ import annotations
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from datetime import date, datetime, timedelta
-from collections import defaultdict, Counter
-from sqlalchemy import select, func, and_, desc
+import heapq
+from itertools import groupby, islice
+from sqlalchemy import select, func, and_, desc, delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from .analytics_rows import iter_rows, select_rows
+from .metrics_cache import bump_data_version
+from ..models.automated_run import AutomatedRun
 from ..models.run import Run
 from ..models.metrics import DailyMetrics
 
 
+def citation_quality(citation: Dict) -> float:
+    """Quality score for a citation (0.0 to 1.0); also used by the metrics cube."""
+    score = 0.0
+    
+    # Domain authority (basic heuristic - could be enhanced with external APIs)
+    domain = citation.get('domain', '').lower()
+    if domain:
+        # Simple scoring based on domain characteristics
+        if domain.endswith('.com') and len(domain.split('.')) == 2:
+            score += 0.3  # Clean commercial domain
+        elif domain.endswith('.org') or domain.endswith('.edu'):
+            score += 0.4  # Educational/organizational domains
+        elif 'news' in domain or 'media' in domain:
+            score += 0.2  # News/media domains
+    
+    # Title quality
+    title = citation.get('title', '')
+    if title and len(title) > 10:
+        score += 0.2  # Has meaningful title
+    
+    # URL structure
+    url = citation.get('url', '')
+    if url and 'utm_' not in url and 'gclid' not in url:
+        score += 0.1  # Clean URL without tracking params
+    
+    # Rank bonus (earlier results get higher scores)
+    rank = citation.get('rank', 999)
+    if rank <= 5:
+        score += 0.2
+    elif rank <= 10:
+        score += 0.1
+    
+    return min(score, 1.0)  # Cap at 1.0
+
+
+DAILY_METRICS_KEY = ["date", "engine", "brand_context", "run_source"]
+# 17 bind parameters per row keeps a batch well under the driver's parameter limit
+UPSERT_BATCH = 500
+# Runs fetched per round trip when computing a day
+STREAM_BATCH = 1000
+# Columns the daily computations read; answer/excerpt text and token counts are never loaded
+DAILY_RUN_COLUMNS = ("ts", "engine", "cost_usd", "extreme_mentioned", "entities_normalized", "citations_enriched")
+DAILY_AUTOMATED_COLUMNS = ("engine", "cost_usd", "citation_count", "links", "domains", "extreme_mentioned")
+
+
+def _daily_metrics_columns() -> List[str]:
+    return [column.name for column in DailyMetrics.__table__.columns]
+
+
+def _daily_metrics_row(metric: DailyMetrics) -> Dict[str, Any]:
+    """Column values of a (transient) DailyMetrics; unset columns take their Python-side default."""
+    row = {}
+    for column in DailyMetrics.__table__.columns:
+        value = getattr(metric, column.name)
+        if value is None and column.default is not None:
+            value = column.default.arg(None) if column.default.is_callable else column.default.arg
+        row[column.name] = value
+    if row["last_updated"] is None:
+        row["last_updated"] = datetime.utcnow().isoformat()
+    return row
+
+
 class MetricsService:
     """Service for computing and managing daily metrics aggregates."""
     
@@ -30,86 +97,213 @@ class MetricsService:
         if engine:
             where_clause = and_(where_clause, Run.engine == engine)
         
-        runs = self.db.execute(
-            select(Run).where(where_clause)
-        ).scalars().all()
-        
-        if not runs:
-            return []
-        
-        # Group runs by engine
-        runs_by_engine = defaultdict(list)
-        for run in runs:
-            runs_by_engine[run.engine].append(run)
-        
         metrics = []
         
-        for run_engine, engine_runs in runs_by_engine.items():
+        for run_engine, engine_runs in self._stream_by_engine(select_rows(Run, DAILY_RUN_COLUMNS).where(where_clause), Run):
+            # Citations are scored once per engine and shared by every brand context
+            aggregate = self._aggregate_citations(engine_runs)
+            
             # Compute overall metrics for this engine
-            overall_metrics = self._compute_engine_metrics(engine_runs, "overall")
+            overall_metrics = self._compute_engine_metrics(engine_runs, "overall", aggregate)
             metrics.append(overall_metrics)
             
             # Compute brand-specific metrics
-            brand_metrics = self._compute_brand_metrics(engine_runs, "extreme_networks")
+            brand_metrics = self._compute_brand_metrics(engine_runs, "extreme_networks", aggregate)
             if brand_metrics:
                 metrics.append(brand_metrics)
             
             # Compute competitor metrics
-            competitor_metrics = self._compute_competitor_metrics(engine_runs, "competitors")
+            competitor_metrics = self._compute_competitor_metrics(engine_runs, "competitors", aggregate)
             if competitor_metrics:
                 metrics.append(competitor_metrics)
         
         return metrics
-    #calculates citations costs, domains, runs
-    def _compute_engine_metrics(self, runs: List[Run], context: str) -> DailyMetrics:
-        """Compute overall metrics for a set of runs."""
-        total_runs = len(runs)
-        total_cost = sum(float(r.cost_usd or 0) for r in runs)
-        
-        # Aggregate citations and domains
-        all_citations = []
-        all_domains = set()
-        domain_counts = Counter()
+    #groups runs by engine without loading the whole day at once
+    def _stream_by_engine(self, stmt, model) -> Iterator[Tuple[str, List[Any]]]:
+        """(engine, runs) groups of `stmt`, streamed in engine order so only one engine's runs are held at a time."""
+        rows = iter_rows(self.db, stmt.order_by(model.engine), STREAM_BATCH)
+        for run_engine, engine_runs in groupby(rows, key=lambda r: r.engine or "unknown"):
+            yield run_engine, list(engine_runs)
+    
+    #automated_runs counterpart of compute_daily_metrics, used by post-processing and the dirty-partition processor
+    def compute_daily_metrics_from_automated(self, target_date: date, engine: Optional[str] = None) -> List[DailyMetrics]:
+        """Compute daily metrics for a specific date (optionally one engine) using automated_runs."""
+        start_ts = datetime.combine(target_date, datetime.min.time())
+        end_ts = datetime.combine(target_date, datetime.max.time())
+
+        stmt = select_rows(AutomatedRun, DAILY_AUTOMATED_COLUMNS).where(AutomatedRun.ts >= start_ts, AutomatedRun.ts <= end_ts)
+        if engine:
+            stmt = stmt.where(AutomatedRun.engine == engine)
+
+        out: List[DailyMetrics] = []
+        for engine, engine_runs in self._stream_by_engine(stmt, AutomatedRun):
+            # Overall context
+            total_runs = len(engine_runs)
+            total_cost = sum(float(r.cost_usd or 0) for r in engine_runs)
+
+            # Citations/domains
+            total_citations = 0
+            domain_counts: dict[str, int] = {}
+            unique_domains_set = set()
+            for r in engine_runs:
+                # Use citation_count if available, otherwise len(links)
+                ccount = r.citation_count if getattr(r, 'citation_count', None) is not None else len(r.links or [])
+                total_citations += int(ccount or 0)
+                for d in (r.domains or []):
+                    if not isinstance(d, str):
+                        continue
+                    d_lower = d.lower().lstrip('www.')
+                    if not d_lower:
+                        continue
+                    unique_domains_set.add(d_lower)
+                    domain_counts[d_lower] = domain_counts.get(d_lower, 0) + 1
+
+            # Build top_domains with simple quality placeholder
+            top_domains = [
+                {"domain": dom, "count": cnt, "quality_score": 0.0}
+                for dom, cnt in sorted(domain_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            ]
+
+            # Brand vs competitors
+            brand_mentions = sum(1 for r in engine_runs if bool(getattr(r, 'extreme_mentioned', False)))
+            competitor_mentions = total_runs - brand_mentions
+            sov = round((brand_mentions / (brand_mentions + competitor_mentions) * 100), 2) if (brand_mentions + competitor_mentions) > 0 else 0.0
+
+            # Average visibility score placeholder (0); can be enhanced later
+            avg_visibility = 0.0
+            high_quality_citations = 0
+
+            out.append(
+                DailyMetrics(
+                    date=target_date,
+                    engine=engine,
+                    brand_context="overall",
+                    run_source="automated_runs",
+                    total_runs=total_runs,
+                    total_cost_usd=total_cost,
+                    total_citations=total_citations,
+                    unique_domains=len(unique_domains_set),
+                    top_domains=top_domains,
+                    brand_mentions=0,
+                    competitor_mentions=0,
+                    share_of_voice_pct=0,
+                    avg_visibility_score=avg_visibility,
+                    high_quality_citations=high_quality_citations,
+                    last_updated=datetime.utcnow().isoformat(),
+                    data_version="1.0",
+                )
+            )
+
+            # Brand context
+            if brand_mentions > 0:
+                out.append(
+                    DailyMetrics(
+                        date=target_date,
+                        engine=engine,
+                        brand_context="extreme_networks",
+                        run_source="automated_runs",
+                        total_runs=total_runs,
+                        total_cost_usd=total_cost,
+                        total_citations=total_citations,
+                        unique_domains=len(unique_domains_set),
+                        top_domains=top_domains,
+                        brand_mentions=brand_mentions,
+                        competitor_mentions=competitor_mentions,
+                        share_of_voice_pct=sov,
+                        avg_visibility_score=avg_visibility,
+                        high_quality_citations=high_quality_citations,
+                        last_updated=datetime.utcnow().isoformat(),
+                        data_version="1.0",
+                    )
+                )
+
+            # Competitors context
+            if competitor_mentions > 0:
+                out.append(
+                    DailyMetrics(
+                        date=target_date,
+                        engine=engine,
+                        brand_context="competitors",
+                        run_source="automated_runs",
+                        total_runs=total_runs,
+                        total_cost_usd=total_cost,
+                        total_citations=total_citations,
+                        unique_domains=len(unique_domains_set),
+                        top_domains=top_domains,
+                        brand_mentions=brand_mentions,
+                        competitor_mentions=competitor_mentions,
+                        share_of_voice_pct=100 - sov if sov else 0,
+                        avg_visibility_score=avg_visibility,
+                        high_quality_citations=high_quality_citations,
+                        last_updated=datetime.utcnow().isoformat(),
+                        data_version="1.0",
+                    )
+                )
+
+        return out
+    
+    #single pass over citations, shared by every brand context of an engine
+    def _aggregate_citations(self, runs: List[Run]) -> Dict[str, Any]:
+        """One pass over the runs' citations: each is scored once and counted into its domain.
+        
+        The result is shared by the overall, brand and competitor rows of a (date, engine).
+        """
+        total_citations = 0
+        quality_total = 0.0
+        high_quality_count = 0
+        # domain -> [count, quality sum]; insertion order breaks count ties like Counter.most_common
+        domains: Dict[str, List[float]] = {}
         
         for run in runs:
-            citations = run.citations_enriched or []
-            all_citations.extend(citations)
-            
-            for citation in citations:
+            for citation in run.citations_enriched or []:
+                score = self._calculate_citation_quality(citation)
+                total_citations += 1
+                quality_total += score
+                if score > 0.7:
+                    high_quality_count += 1
                 domain = citation.get('domain', '')
                 if domain:
-                    all_domains.add(domain)
-                    domain_counts[domain] += 1
-        
-        # Calculate top domains with quality scores
-        top_domains = self._calculate_top_domains(domain_counts, all_citations)
-        
-        # Calculate average visibility score
-        visibility_scores = [self._calculate_citation_quality(c) for c in all_citations]
-        avg_visibility = sum(visibility_scores) / len(visibility_scores) if visibility_scores else 0
-        
-        # Count high quality citations
-        high_quality_count = sum(1 for score in visibility_scores if score > 0.7)
+                    stats = domains.get(domain)
+                    if stats is None:
+                        domains[domain] = [1, score]
+                    else:
+                        stats[0] += 1
+                        stats[1] += score
+        
+        return {
+            "total_runs": len(runs),
+            "total_cost_usd": sum(float(r.cost_usd or 0) for r in runs),
+            "total_citations": total_citations,
+            "unique_domains": len(domains),
+            "top_domains": self._calculate_top_domains(domains),
+            "avg_visibility_score": round(quality_total / total_citations, 2) if total_citations else 0,
+            "high_quality_citations": high_quality_count,
+        }
+    #calculates citations costs, domains, runs
+    def _compute_engine_metrics(self, runs: List[Run], context: str, aggregate: Optional[Dict[str, Any]] = None) -> DailyMetrics:
+        """Compute overall metrics for a set of runs (from their citation aggregate when already computed)."""
+        if aggregate is None:
+            aggregate = self._aggregate_citations(runs)
         
         return DailyMetrics(
             date=runs[0].ts.date(),
             engine=runs[0].engine,
             brand_context=context,
-            total_runs=total_runs,
-            total_cost_usd=total_cost,
-            total_citations=len(all_citations),
-            unique_domains=len(all_domains),
-            top_domains=top_domains,
+            total_runs=aggregate["total_runs"],
+            total_cost_usd=aggregate["total_cost_usd"],
+            total_citations=aggregate["total_citations"],
+            unique_domains=aggregate["unique_domains"],
+            top_domains=aggregate["top_domains"],
             brand_mentions=0,  # Will be computed in brand-specific metrics
             competitor_mentions=0,  # Will be computed in brand-specific metrics
             share_of_voice_pct=0,  # Will be computed in brand-specific metrics
-            avg_visibility_score=round(avg_visibility, 2),
-            high_quality_citations=high_quality_count,
+            avg_visibility_score=aggregate["avg_visibility_score"],
+            high_quality_citations=aggregate["high_quality_citations"],
             last_updated=datetime.utcnow().isoformat(),
             data_version="1.0"
         )
     #brand visibility metrics calculated here
-    def _compute_brand_metrics(self, runs: List[Run], context: str) -> Optional[DailyMetrics]:
+    def _compute_brand_metrics(self, runs: List[Run], context: str, aggregate: Optional[Dict[str, Any]] = None) -> Optional[DailyMetrics]:
         """Compute metrics specifically for Extreme Networks brand mentions."""
         brand_runs = [r for r in runs if r.extreme_mentioned]
         
@@ -117,7 +311,7 @@ class MetricsService:
             return None
         
         # Get base metrics from overall computation
-        base_metrics = self._compute_engine_metrics(runs, context)
+        base_metrics = self._compute_engine_metrics(runs, context, aggregate)
         
         # Override with brand-specific data
         base_metrics.brand_mentions = len(brand_runs)
@@ -132,7 +326,7 @@ class MetricsService:
         
         return base_metrics
     #competitor metrics calculated here, like rank
-    def _compute_competitor_metrics(self, runs: List[Run], context: str) -> Optional[DailyMetrics]:
+    def _compute_competitor_metrics(self, runs: List[Run], context: str, aggregate: Optional[Dict[str, Any]] = None) -> Optional[DailyMetrics]:
         """Compute metrics for competitor mentions."""
         competitor_runs = [r for r in runs if not r.extreme_mentioned and r.entities_normalized]
         
@@ -140,7 +334,7 @@ class MetricsService:
             return None
         
         # Get base metrics from overall computation
-        base_metrics = self._compute_engine_metrics(runs, context)
+        base_metrics = self._compute_engine_metrics(runs, context, aggregate)
         
         # Override with competitor-specific data
         base_metrics.brand_mentions = len([r for r in runs if r.extreme_mentioned])
@@ -155,85 +349,68 @@ class MetricsService:
         
         return base_metrics
     
-    def _calculate_top_domains(self, domain_counts: Counter, citations: List[Dict]) -> List[Dict]:
-        """Calculate top domains with quality scores."""
-        top_domains = []
-        
-        for domain, count in domain_counts.most_common(10):  # Top 10 domains
-            # Find citations for this domain to calculate quality
-            domain_citations = [c for c in citations if c.get('domain') == domain]
-            quality_scores = [self._calculate_citation_quality(c) for c in domain_citations]
-            avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
-            
-            top_domains.append({
-                "domain": domain,
-                "count": count,
-                "quality_score": round(avg_quality, 2)
-            })
-        
-        return top_domains
+    def _calculate_top_domains(self, domains: Dict[str, List[float]]) -> List[Dict]:
+        """Top 10 domains by count with their average citation quality, from [count, quality sum] per domain."""
+        top = heapq.nlargest(10, domains.items(), key=lambda item: item[1][0])
+        return [
+            {"domain": domain, "count": count, "quality_score": round(quality_sum / count, 2)}
+            for domain, (count, quality_sum) in top
+        ]
     #currently not using this because it doesn't work that well, could use Ahrefs API to get domain authority
     def _calculate_citation_quality(self, citation: Dict) -> float:
         """Calculate quality score for a citation (0.0 to 1.0)."""
-        score = 0.0
-        
-        # Domain authority (basic heuristic - could be enhanced with external APIs)
-        domain = citation.get('domain', '').lower()
-        if domain:
-            # Simple scoring based on domain characteristics
-            if domain.endswith('.com') and len(domain.split('.')) == 2:
-                score += 0.3  # Clean commercial domain
-            elif domain.endswith('.org') or domain.endswith('.edu'):
-                score += 0.4  # Educational/organizational domains
-            elif 'news' in domain or 'media' in domain:
-                score += 0.2  # News/media domains
-        
-        # Title quality
-        title = citation.get('title', '')
-        if title and len(title) > 10:
-            score += 0.2  # Has meaningful title
-        
-        # URL structure
-        url = citation.get('url', '')
-        if url and 'utm_' not in url and 'gclid' not in url:
-            score += 0.1  # Clean URL without tracking params
-        
-        # Rank bonus (earlier results get higher scores)
-        rank = citation.get('rank', 999)
-        if rank <= 5:
-            score += 0.2
-        elif rank <= 10:
-            score += 0.1
-        
-        return min(score, 1.0)  # Cap at 1.0
+        return citation_quality(citation)
     
-    def upsert_daily_metrics(self, metrics: List[DailyMetrics]) -> None:
-        """Upsert daily metrics to the database."""
-        for metric in metrics:
-            # Check if metric already exists
-            existing = self.db.get(DailyMetrics, (
-                metric.date, 
-                metric.engine, 
-                metric.brand_context
-            ))
-            
-            if existing:
-                # Update existing
-                for key, value in metric.__dict__.items():
-                    if not key.startswith('_'):
-                        setattr(existing, key, value)
-                existing.last_updated = datetime.utcnow().isoformat()
-            else:
-                # Insert new
-                self.db.add(metric)
+    def upsert_daily_metrics(self, metrics: Iterable[DailyMetrics], batch_size: int = UPSERT_BATCH, commit: bool = True) -> int:
+        """Upsert daily metrics with batched INSERT ... ON CONFLICT (date, engine, brand_context, run_source) DO UPDATE.
+        
+        `metrics` may be a generator (e.g. a multi-year backfill computed day by day); only one batch is
+        held at a time and rows are written through Core, so nothing accumulates in the session.
+        Returns the number of rows inserted or updated.
+        """
+        affected = 0
+        metrics = iter(metrics)
+        while True:
+            batch = {}
+            for metric in islice(metrics, batch_size):
+                row = _daily_metrics_row(metric)
+                # A statement may touch each key only once; the last computed row wins
+                batch[tuple(row[c] for c in DAILY_METRICS_KEY)] = row
+            if not batch:
+                break
+            # A fixed key order keeps concurrent upserts from deadlocking on each other's rows
+            stmt = insert(DailyMetrics).values([batch[key] for key in sorted(batch)])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=DAILY_METRICS_KEY,
+                set_={name: stmt.excluded[name] for name in _daily_metrics_columns() if name not in DAILY_METRICS_KEY},
+            )
+            affected += self.db.execute(stmt).rowcount
         
-        self.db.commit()
+        if affected:
+            bump_data_version(self.db)
+        if commit:
+            self.db.commit()
+        return affected
+    
+    def replace_daily_metrics(self, run_source: str, target_date: date, engine: str, metrics: List[DailyMetrics]) -> int:
+        """Swap the rows of one (source, date, engine) partition for `metrics` without committing.
+        
+        Contexts the recomputation no longer produces (e.g. every run of the day was deleted) are dropped;
+        the other source's rows for the same day and engine are left alone.
+        """
+        self.db.execute(
+            delete(DailyMetrics).where(
+                DailyMetrics.run_source == run_source, DailyMetrics.date == target_date, DailyMetrics.engine == engine
+            )
+        )
+        return self.upsert_daily_metrics(metrics, commit=False)
     
     def get_daily_metrics(self, 
                          start_date: date, 
                          end_date: date, 
                          engine: Optional[str] = None,
-                         brand_context: Optional[str] = None) -> List[DailyMetrics]:
+                         brand_context: Optional[str] = None,
+                         run_source: Optional[str] = None) -> List[DailyMetrics]:
         """Retrieve daily metrics for a date range."""
         where_clause = and_(
             DailyMetrics.date >= start_date,
@@ -246,68 +423,43 @@ class MetricsService:
         if brand_context:
             where_clause = and_(where_clause, DailyMetrics.brand_context == brand_context)
         
+        if run_source:
+            where_clause = and_(where_clause, DailyMetrics.run_source == run_source)
+        
         return self.db.execute(
             select(DailyMetrics)
             .where(where_clause)
-            .order_by(DailyMetrics.date, DailyMetrics.engine, DailyMetrics.brand_context)
+            .order_by(DailyMetrics.date, DailyMetrics.engine, DailyMetrics.brand_context, DailyMetrics.run_source)
         ).scalars().all()
     
     def get_metrics_summary(self, days: int = 30) -> Dict[str, Any]:
-        """Get summary metrics for the last N days."""
+        """Get summary metrics for the last N days from the metrics cube (O(days) rows, no run scan)."""
+        # Local import: metrics_cube uses citation_quality from this module
+        from .metrics_cube import cube_rollup, facet_rollup
+        
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
+        scope = {"run_source": "runs", "start_day": start_date, "end_day": end_date}
         
-        metrics = self.get_daily_metrics(start_date, end_date)
-        
-        if not metrics:
+        totals = cube_rollup(self.db, **scope)[0]
+        if not totals["runs"]:
             return {}
         
-        # Aggregate across the period
-        summary = {
+        by_engine = {
+            row["engine"]: {"runs": row["runs"], "cost": row["cost_usd"], "citations": row["citations"]}
+            for row in cube_rollup(self.db, group_by=("engine",), **scope)
+        }
+        top_domains = facet_rollup(self.db, "domain", limit=10, **scope)["items"]
+        
+        return {
             "period_days": days,
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
-            "total_runs": sum(m.total_runs for m in metrics),
-            "total_cost_usd": float(sum(m.total_cost_usd for m in metrics)),
-            "total_citations": sum(m.total_citations for m in metrics),
-            "avg_visibility_score": 0,
-            "brand_share_of_voice": 0,
-            "top_domains": [],
-            "by_engine": defaultdict(lambda: {
-                "runs": 0, "cost": 0, "citations": 0
-            })
+            "total_runs": totals["runs"],
+            "total_cost_usd": totals["cost_usd"],
+            "total_citations": totals["citations"],
+            "avg_visibility_score": round(totals["quality_sum"] / totals["scored_citations"], 2) if totals["scored_citations"] else 0,
+            "brand_share_of_voice": round(totals["brand_mentions"] / totals["runs"] * 100, 2),
+            "top_domains": [{"domain": d["value"], "count": d["hits"]} for d in top_domains],
+            "by_engine": by_engine,
         }
-        
-        # Calculate averages and engine breakdowns
-        visibility_scores = [m.avg_visibility_score for m in metrics if m.avg_visibility_score > 0]
-        if visibility_scores:
-            summary["avg_visibility_score"] = round(sum(visibility_scores) / len(visibility_scores), 2)
-        
-        # Brand share of voice (from brand context metrics)
-        brand_metrics = [m for m in metrics if m.brand_context == "extreme_networks"]
-        if brand_metrics:
-            total_share = sum(m.share_of_voice_pct for m in brand_metrics)
-            summary["brand_share_of_voice"] = round(total_share / len(brand_metrics), 2)
-        
-        # Top domains across the period
-        domain_totals = defaultdict(int)
-        for metric in metrics:
-            for domain_info in metric.top_domains:
-                domain_totals[domain_info["domain"]] += domain_info["count"]
-        
-        summary["top_domains"] = [
-            {"domain": domain, "count": count}
-            for domain, count in sorted(domain_totals.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
-        
-        # Engine breakdowns
-        for metric in metrics:
-            engine = metric.engine
-            summary["by_engine"][engine]["runs"] += metric.total_runs
-            summary["by_engine"][engine]["cost"] += float(metric.total_cost_usd)
-            summary["by_engine"][engine]["citations"] += metric.total_citations
-        
-        # Convert defaultdict to regular dict
-        summary["by_engine"] = dict(summary["by_engine"])
-        
-        return summary
@@ -0,0 +1,116 @@
+#historical daily_metrics backfill: the date range is queued as dirty partitions (the checkpoint) and split across a process pool
+
+from __future__ import annotations
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .database import SessionLocal
+from .dirty_metrics import mark_day_dirty, pending_partitions, process_dirty_partitions
+
+SOURCES = ("runs", "automated_runs")
+DEFAULT_PARTITION_DAYS = 7
+
+
+def split_range(start: date, end: date, partition_days: int = DEFAULT_PARTITION_DAYS) -> List[Tuple[date, date]]:
+    """Inclusive (first, last) day ranges of at most partition_days covering start..end."""
+    ranges = []
+    while start <= end:
+        last = min(start + timedelta(days=partition_days - 1), end)
+        ranges.append((start, last))
+        start = last + timedelta(days=1)
+    return ranges
+
+
+def queue_backfill(db: Session, run_source: str, start: date, end: date) -> int:
+    """Mark every (day, engine) with runs between start and end dirty and commit. Returns partitions queued."""
+    queued = 0
+    day = start
+    while day <= end:
+        queued += mark_day_dirty(db, run_source, day)
+        day += timedelta(days=1)
+    db.commit()
+    return queued
+
+
+def backfill_range(run_source: str, start: date, end: date, session_factory: sessionmaker = SessionLocal) -> Dict[str, int]:
+    """Recompute the queued partitions of one day range in a session of its own (process pool entry point)."""
+    db = session_factory()
+    try:
+        return process_dirty_partitions(db, run_source=run_source, start=start, end=end)
+    finally:
+        db.close()
+
+
+def backfill_daily_metrics(
+    run_source: str,
+    start: date,
+    end: date,
+    workers: Optional[int] = None,
+    partition_days: int = DEFAULT_PARTITION_DAYS,
+    resume: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    session_factory: sessionmaker = SessionLocal,
+) -> Dict[str, Any]:
+    """Rebuild daily_metrics of one source for start..end, partition ranges computed in parallel.
+
+    The range is first queued in dirty_metrics_partitions; each worker clears a partition only after
+    committing its metrics, so an interrupted backfill resumes (resume=True) with what is still queued
+    instead of starting over. workers=1 runs in this process with session_factory. `progress` receives
+    the running report after every finished range. Returns the final report.
+    """
+    db = session_factory()
+    try:
+        queued = 0 if resume else queue_backfill(db, run_source, start, end)
+        pending = pending_partitions(db, run_source, start, end)
+    finally:
+        db.close()
+
+    ranges = split_range(start, end, partition_days)
+    report: Dict[str, Any] = {
+        "run_source": run_source,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "queued": queued,
+        "pending": pending,
+        "ranges": len(ranges),
+        "ranges_done": 0,
+        "partitions": 0,
+        "metrics": 0,
+        "failed": 0,
+    }
+
+    def finished(counts: Dict[str, int]) -> None:
+        report["ranges_done"] += 1
+        for key in ("partitions", "metrics", "failed"):
+            report[key] += counts[key]
+        if progress:
+            progress(dict(report))
+
+    if workers == 1:
+        for first, last in ranges:
+            finished(backfill_range(run_source, first, last, session_factory))
+    else:
+        # spawn: workers open their own engine and pool instead of inheriting the parent's connections
+        # (and the API process's threads)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(backfill_range, run_source, first, last): (first, last) for first, last in ranges}
+            for future in as_completed(futures):
+                try:
+                    finished(future.result())
+                except Exception as e:
+                    # The range stays queued; a resumed backfill picks it up
+                    first, last = futures[future]
+                    print(f"⚠️  Backfill of {run_source} {first}..{last} failed: {e}")
+                    finished({"partitions": 0, "metrics": 0, "failed": 1})
+
+    db = session_factory()
+    try:
+        report["remaining"] = pending_partitions(db, run_source, start, end)
+    finally:
+        db.close()
+    return report
@@ -0,0 +1,220 @@
+#cache of rendered /metrics responses keyed by endpoint + normalized params, invalidated by the metrics data version
+
+from __future__ import annotations
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import typing
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from ..models.data_version import DataVersion
+
+METRICS_VERSION = "metrics"
+# Window endpoints are relative to now, so even unchanged data is recomputed after the TTL
+DEFAULT_TTL_S = int(os.getenv("EGT_METRICS_CACHE_TTL_S", "600"))
+# Outdated entries younger than this are served while a background refresh runs; older ones are recomputed inline
+DEFAULT_MAX_STALE_S = int(os.getenv("EGT_METRICS_CACHE_MAX_STALE_S", "3600"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("EGT_METRICS_CACHE_MAX_ENTRIES", "512"))
+
+
+def bump_data_version(db: Session, name: str = METRICS_VERSION) -> None:
+    """Invalidate cached responses when the caller's transaction commits (run writes, metric recomputes)."""
+    stmt = insert(DataVersion).values(name=name, version=1, updated_at=datetime.utcnow())
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DataVersion.name],
+        set_={"version": DataVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def data_version(db: Session, name: str = METRICS_VERSION) -> int:
+    return db.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    computed_at: float
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Endpoint plus its query parameters in a canonical order; string values are trimmed."""
+    normalized = {k: v.strip() if isinstance(v, str) else v for k, v in params.items()}
+    return endpoint + ":" + json.dumps(normalized, sort_keys=True, default=str)
+
+
+def render(value: Any, version: int) -> CachedResponse:
+    body = json.dumps(jsonable_encoder(value), separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return CachedResponse(version, etag, body, time.time())
+
+
+class MetricsResponseCache:
+    """Process-local LRU of rendered responses with hit/stale/miss counters."""
+
+    def __init__(self, ttl_s: int = DEFAULT_TTL_S, max_stale_s: int = DEFAULT_MAX_STALE_S, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_stale_s = max_stale_s
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.refresh_errors = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            current = self._data.get(key)
+            # A slower computation must not replace a result computed at a newer version
+            if current is not None and current.version > entry.version:
+                return
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def claim_refresh(self, key: str) -> bool:
+        """True for the first caller asking to refresh `key`; later callers keep serving the stale entry."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale + self.misses
+            return {
+                "entries": len(self._data),
+                "ttl_s": self.ttl_s,
+                "max_stale_s": self.max_stale_s,
+                "hits": self.hits,
+                "stale": self.stale,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "refresh_errors": self.refresh_errors,
+                "hit_rate": round((self.hits + self.stale) / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache: Optional[MetricsResponseCache] = None
+
+
+def get_metrics_cache() -> Optional[MetricsResponseCache]:
+    """Shared cache; EGT_METRICS_CACHE=off disables it."""
+    global _cache
+    if _cache is None:
+        if os.getenv("EGT_METRICS_CACHE", "on").lower() == "off":
+            return None
+        _cache = MetricsResponseCache()
+    return _cache
+
+
+def _refresh(cache: MetricsResponseCache, key: str, fn: Callable[..., Any], params: Dict[str, Any]) -> None:
+    db = SessionLocal()
+    try:
+        # Read the version before computing: a write landing meanwhile leaves the new entry outdated
+        version = data_version(db)
+        cache.set(key, render(fn(db=db, **params), version))
+    except Exception as e:
+        print(f"⚠️  Metrics cache refresh of {key} failed: {e}")
+        cache.count("refresh_errors")
+    finally:
+        db.close()
+        cache.release_refresh(key)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison): any listed validator, W/ or not, or "*" matches."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag.removeprefix("W/") for value in candidates)
+
+
+def _respond(cache: MetricsResponseCache, request: Request, entry: CachedResponse, outcome: str) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": outcome}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        cache.count("not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def cached_metrics(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Serve a sync `db`-taking GET endpoint from the metrics response cache, with ETag / 304 support.
+
+    Entries computed at the current data version and younger than the TTL are served as is. Other
+    entries are served while one background task recomputes them, unless they are older than the
+    max-stale window, in which case the request recomputes. Errors (HTTPException) are never cached.
+    """
+    hints = typing.get_type_hints(fn)
+    signature = inspect.signature(fn)
+    parameters = [param.replace(annotation=hints.get(name, param.annotation)) for name, param in signature.parameters.items()]
+    parameters += [
+        inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        inspect.Parameter("background_tasks", inspect.Parameter.KEYWORD_ONLY, annotation=BackgroundTasks),
+    ]
+
+    @functools.wraps(fn)
+    def wrapper(*, request: Request, background_tasks: BackgroundTasks, **kwargs: Any) -> Any:
+        cache = get_metrics_cache()
+        if cache is None:
+            return fn(**kwargs)
+        db = kwargs.pop("db")
+        key = cache_key(fn.__name__, kwargs)
+        version = data_version(db)
+        entry = cache.get(key)
+
+        if entry is not None:
+            age = time.time() - entry.computed_at
+            if entry.version == version and age < cache.ttl_s:
+                cache.count("hits")
+                return _respond(cache, request, entry, "hit")
+            if age < cache.max_stale_s:
+                cache.count("stale")
+                if cache.claim_refresh(key):
+                    background_tasks.add_task(_refresh, cache, key, fn, kwargs)
+                return _respond(cache, request, entry, "stale")
+
+        cache.count("misses")
+        entry = render(fn(db=db, **kwargs), version)
+        cache.set(key, entry)
+        return _respond(cache, request, entry, "miss")
+
+    wrapper.__signature__ = signature.replace(parameters=parameters, return_annotation=Response)
+    return wrapper
@@ -0,0 +1,304 @@
+#metrics cube: additive per-day rollups of runs, folded in as runs are written and summed over any window at read time
+
+from __future__ import annotations
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, desc, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .metrics import citation_quality
+from .metrics_cache import bump_data_version
+from .run_children import as_json_list, child_rows, naive_utc
+from ..models.automated_run import AutomatedRun
+from ..models.metrics_cube import MetricsCube, MetricsCubeFacet
+from ..models.run import Run
+
+MEASURES = (
+    "runs", "failures", "brand_mentions", "runs_with_links", "runs_with_entities",
+    "citations", "brand_citations", "entity_mentions", "mention_citations", "mention_domains",
+    "input_tokens", "output_tokens", "cost_usd", "priced_runs", "latency_ms_sum", "latency_runs",
+    "scored_citations", "quality_sum",
+)
+FACET_MEASURES = ("hits", "runs", "rank_sum")
+FLOAT_MEASURES = {"cost_usd", "quality_sum"}
+
+SUCCESS_STATUSES = {"ok", "completed"}
+
+# Latency histogram bucket upper bounds; buckets merge by addition, so percentiles work over any window
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+# Rows per multi-row upsert statement
+UPSERT_CHUNK = 500
+
+
+def latency_bucket(latency_ms: int) -> str:
+    """Histogram bucket (upper bound in ms, or "inf") holding latency_ms."""
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+def cube_key(run_source: str, run: Mapping[str, Any]) -> Dict[str, Any]:
+    """Cube cell of a run given its column values; runs store the intent as `intent`."""
+    intent = run.get("intent_category") if "intent_category" in run else run.get("intent")
+    return {
+        "run_source": run_source,
+        "day": naive_utc(run["ts"]).date(),
+        "engine": run.get("engine") or "",
+        "model": run.get("model") or "",
+        "intent_category": intent or "",
+        "is_branded": bool(run.get("is_branded")),
+    }
+
+
+def cube_deltas(
+    run_source: str,
+    runs: Iterable[Mapping[str, Any]],
+    citations: Sequence[Mapping[str, Any]],
+    entities: Sequence[Mapping[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Cell and facet increments for a batch of runs and their child rows, one row per distinct key.
+
+    Soft-deleted runs contribute nothing, like in daily_metrics.
+    """
+    citations_by_run = defaultdict(list)
+    for row in citations:
+        citations_by_run[row["run_id"]].append(row)
+    entities_by_run = defaultdict(list)
+    for row in entities:
+        entities_by_run[row["run_id"]].append(row)
+
+    cells: Dict[tuple, Dict[str, Any]] = {}
+    facets: Dict[tuple, Dict[str, Any]] = {}
+
+    def bump_facet(key: Dict[str, Any], facet: str, value: str, hits: int, rank_sum: int = 0) -> None:
+        fkey = tuple(key.values()) + (facet, value)
+        row = facets.get(fkey)
+        if row is None:
+            row = facets[fkey] = {**key, "facet": facet, "value": value, "hits": 0, "runs": 0, "rank_sum": 0}
+        row["hits"] += hits
+        row["runs"] += 1
+        row["rank_sum"] += rank_sum
+
+    for run in runs:
+        if run.get("deleted"):
+            continue
+        key = cube_key(run_source, run)
+        cell = cells.get(tuple(key.values()))
+        if cell is None:
+            cell = cells[tuple(key.values())] = {**key, **{m: 0 for m in MEASURES}}
+
+        run_citations = citations_by_run.get(run["id"], [])
+        run_entities = entities_by_run.get(run["id"], [])
+        domains = Counter(c["domain"] for c in run_citations if c["domain"])
+        mentioned = bool(run.get("extreme_mentioned"))
+        cost = float(run.get("cost_usd") or 0)
+        latency = int(run.get("latency_ms") or 0)
+
+        cell["runs"] += 1
+        cell["failures"] += (run.get("status") or "") not in SUCCESS_STATUSES
+        cell["brand_mentions"] += mentioned
+        cell["runs_with_links"] += bool(run_citations)
+        cell["runs_with_entities"] += bool(run_entities)
+        cell["citations"] += len(run_citations)
+        cell["brand_citations"] += sum(1 for c in run_citations if c["is_brand_domain"])
+        cell["entity_mentions"] += len(run_entities)
+        if mentioned:
+            cell["mention_citations"] += len(run_citations)
+            cell["mention_domains"] += len(domains)
+        cell["input_tokens"] += int(run.get("input_tokens") or 0)
+        cell["output_tokens"] += int(run.get("output_tokens") or 0)
+        cell["cost_usd"] += cost
+        cell["priced_runs"] += cost > 0
+        if latency > 0:
+            cell["latency_ms_sum"] += latency
+            cell["latency_runs"] += 1
+            bump_facet(key, "latency", latency_bucket(latency), 1)
+        for citation in as_json_list(run.get("citations_enriched")):
+            if isinstance(citation, dict):
+                cell["scored_citations"] += 1
+                cell["quality_sum"] += citation_quality(citation)
+
+        for domain, hits in domains.items():
+            bump_facet(key, "domain", domain, hits)
+        ranks_by_name = defaultdict(list)
+        for entity in run_entities:
+            ranks_by_name[entity["name"]].append(entity["rank"])
+        for name, ranks in ranks_by_name.items():
+            bump_facet(key, "entity", name, len(ranks), sum(ranks))
+
+    return list(cells.values()), list(facets.values())
+
+
+def _upsert(db: Session, model, rows: List[Dict[str, Any]], measures: Sequence[str], **overwrite: Any) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE adding `measures` onto existing cells."""
+    if not rows:
+        return
+    pk = [column.name for column in model.__table__.primary_key]
+    # A fixed key order keeps concurrent writers from deadlocking on each other's cells
+    rows = sorted(rows, key=lambda row: tuple(row[c] for c in pk))
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        chunk = [{**row, **overwrite} for row in rows[i:i + UPSERT_CHUNK]]
+        stmt = insert(model).values(chunk)
+        set_ = {m: getattr(model, m) + stmt.excluded[m] for m in measures}
+        set_.update({name: stmt.excluded[name] for name in overwrite})
+        db.execute(stmt.on_conflict_do_update(index_elements=pk, set_=set_))
+
+
+def add_runs_to_cube(
+    db: Session,
+    run_source: str,
+    runs: Iterable[Mapping[str, Any]],
+    citations: Optional[Sequence[Mapping[str, Any]]] = None,
+    entities: Optional[Sequence[Mapping[str, Any]]] = None,
+) -> None:
+    """Fold newly written runs into the cube in the caller's transaction; child rows are derived when not given."""
+    runs = list(runs)
+    if citations is None or entities is None:
+        citations, entities = [], []
+        for run in runs:
+            c, e = child_rows(run_source, run)
+            citations.extend(c)
+            entities.extend(e)
+    cells, facets = cube_deltas(run_source, runs, citations, entities)
+    _upsert(db, MetricsCube, cells, MEASURES, updated_at=datetime.utcnow())
+    _upsert(db, MetricsCubeFacet, facets, FACET_MEASURES)
+
+
+def update_run_in_cube(db: Session, run_source: str, before: Mapping[str, Any], after: Mapping[str, Any]) -> None:
+    """Swap one run's cube contribution for its edited column values (e.g. enrichment) in the caller's transaction."""
+    cells, facets = cube_deltas(run_source, [before], *child_rows(run_source, before))
+    now = datetime.utcnow()
+    _upsert(db, MetricsCube, [{**row, **{m: -row[m] for m in MEASURES}} for row in cells], MEASURES, updated_at=now)
+    _upsert(db, MetricsCubeFacet, [{**row, **{m: -row[m] for m in FACET_MEASURES}} for row in facets], FACET_MEASURES)
+    add_runs_to_cube(db, run_source, [after])
+
+
+def cube_values(run_source: str, row: Any) -> Dict[str, Any]:
+    """Column values of a loaded run row, as cube_deltas reads them."""
+    return {column.key: getattr(row, column.key) for column in _parent_columns(run_source)}
+
+
+def _parent_columns(run_source: str) -> list:
+    shared = ("id", "ts", "engine", "model", "status", "is_branded", "extreme_mentioned",
+              "latency_ms", "input_tokens", "output_tokens", "cost_usd", "links", "entities_normalized")
+    if run_source == "runs":
+        return [getattr(Run, c) for c in shared] + [Run.intent, Run.vendors, Run.citations_enriched, Run.deleted]
+    return [getattr(AutomatedRun, c) for c in shared] + [AutomatedRun.intent_category]
+
+
+def rebuild_cube(db: Session, run_source: str, days: Iterable[date]) -> int:
+    """Recompute the cube cells of `days` from the parent table (backfill, re-extraction, deletes).
+
+    Returns runs folded; soft-deleted runs are left out.
+    """
+    parent = Run if run_source == "runs" else AutomatedRun
+    folded = 0
+    for day in sorted(set(days)):
+        for model in (MetricsCube, MetricsCubeFacet):
+            db.execute(delete(model).where(model.run_source == run_source, model.day == day))
+        start = datetime.combine(day, time.min)
+        if run_source == "runs":
+            start = start.replace(tzinfo=timezone.utc)  # runs.ts is timestamptz
+        stmt = select(*_parent_columns(run_source)).where(parent.ts >= start, parent.ts < start + timedelta(days=1))
+        if run_source == "runs":
+            stmt = stmt.where(Run.deleted.is_(False))
+        rows = db.execute(stmt).mappings().all()
+        add_runs_to_cube(db, run_source, rows)
+        folded += len(rows)
+    bump_data_version(db)
+    return folded
+
+
+def engine_filter(column, engine: str, exact: bool):
+    """Engine match as the metrics routes apply it: prefix match unless exact, openai also matching gpt-*."""
+    if exact:
+        return column == engine
+    if engine == "openai":
+        # Older rows store the model name (gpt-*) as the engine
+        return or_(column.like("gpt%"), column.like("openai%"), column == "openai")
+    return or_(column.like(f"{engine}%"), column == engine)
+
+
+def _scope(
+    model,
+    run_source: str,
+    start_day: date,
+    end_day: date,
+    engine: Optional[str] = None,
+    exact_engine: bool = False,
+    is_branded: Optional[bool] = None,
+) -> list:
+    """WHERE conditions for cube rows of run_source in [start_day, end_day]."""
+    conditions = [model.run_source == run_source, model.day >= start_day, model.day <= end_day]
+    if engine:
+        conditions.append(engine_filter(model.engine, engine, exact_engine))
+    if is_branded is not None:
+        conditions.append(model.is_branded == is_branded)
+    return conditions
+
+
+def _measure_values(row: Mapping[str, Any]) -> Dict[str, Any]:
+    return {m: float(row[m] or 0) if m in FLOAT_MEASURES else int(row[m] or 0) for m in MEASURES}
+
+
+def cube_rollup(db: Session, group_by: Sequence[str] = (), **scope: Any) -> List[Dict[str, Any]]:
+    """Measures summed over the scoped window, one row per distinct value of the `group_by` dimensions.
+
+    Without group_by the result is a single totals row (all zeros when the window is empty).
+    """
+    dims = [getattr(MetricsCube, d) for d in group_by]
+    sums = [func.coalesce(func.sum(getattr(MetricsCube, m)), 0).label(m) for m in MEASURES]
+    stmt = select(*dims, *sums).where(*_scope(MetricsCube, **scope))
+    if dims:
+        stmt = stmt.group_by(*dims).order_by(*dims)
+    rows = db.execute(stmt).mappings().all()
+    return [{**{d: row[d] for d in group_by}, **_measure_values(row)} for row in rows]
+
+
+def facet_rollup(db: Session, facet: str, limit: Optional[int] = None, **scope: Any) -> Dict[str, Any]:
+    """Facet values summed over the window, most hits first, plus the number of distinct values."""
+    hits = func.sum(MetricsCubeFacet.hits).label("hits")
+    stmt = (
+        select(
+            MetricsCubeFacet.value,
+            hits,
+            func.sum(MetricsCubeFacet.runs).label("runs"),
+            func.sum(MetricsCubeFacet.rank_sum).label("rank_sum"),
+            func.count().over().label("total_values"),
+        )
+        .where(MetricsCubeFacet.facet == facet, *_scope(MetricsCubeFacet, **scope))
+        .group_by(MetricsCubeFacet.value)
+        .order_by(desc(hits), MetricsCubeFacet.value)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).mappings().all()
+    return {
+        "total": int(rows[0]["total_values"]) if rows else 0,
+        "items": [
+            {"value": row["value"], "hits": int(row["hits"]), "runs": int(row["runs"]), "rank_sum": int(row["rank_sum"])}
+            for row in rows
+        ],
+    }
+
+
+def latency_percentiles(db: Session, quantiles: Sequence[float] = (0.5, 0.95), **scope: Any) -> Dict[float, Optional[int]]:
+    """Upper bound (ms) of the histogram bucket holding each quantile; None when no latencies or past the last bucket."""
+    buckets = facet_rollup(db, "latency", **scope)["items"]
+    buckets.sort(key=lambda b: float(b["value"]))
+    total = sum(b["hits"] for b in buckets)
+    result: Dict[float, Optional[int]] = {}
+    for q in quantiles:
+        result[q] = None
+        seen = 0
+        for bucket in buckets:
+            seen += bucket["hits"]
+            if total and seen >= q * total:
+                result[q] = None if bucket["value"] == "inf" else int(bucket["value"])
+                break
+    return result
@@ -2,14 +2,23 @@ from __future__ import annotations
 import json
 import random
 from datetime import date, datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+import os
 import uuid
 
 from .engines import call_engine
 from .extract import extract_competitors, extract_links, to_domains
 from ..models.run import Run
 from ..services.database import get_db
+from .run_children import write_run_children
+from .job_queue import DEFAULT_LEASE_S, claim_jobs, make_worker_id, mark_done, mark_failed
+
+# Default concurrent engine calls per engine; the shared rate limiter still paces each provider
+DEFAULT_PARALLELISM = {"openai": 8, "perplexity": 4}
+# Completed runs written per transaction
+DEFAULT_BATCH_SIZE = 25
 
 
 class QueryScheduler:
@@ -103,128 +112,278 @@ class QueryScheduler:
         else:
             return "generic_intent"
     
-    def execute_daily_queries(self, target_date: date, dry_run: bool = False) -> List[Dict[str, Any]]:
-        """Execute all daily queries for a specific date."""
-        queries = self.get_daily_queries(target_date)
-        results = []
+    def get_parallelism(self) -> Dict[str, int]:
+        """Concurrent calls allowed per engine (config `execution.parallelism`, env EGT_SCHEDULER_<ENGINE>_PARALLELISM)."""
+        configured = self.queries_config.get("execution", {}).get("parallelism", {})
+        parallelism = {}
+        for engine, default in DEFAULT_PARALLELISM.items():
+            value = os.getenv(f"EGT_SCHEDULER_{engine.upper()}_PARALLELISM") or configured.get(engine, default)
+            parallelism[engine] = max(int(value), 1)
+        return parallelism
+
+    def _execute_query(self, query_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the engine for one planned query and build its run row (no database access)."""
+        model = query_info.get("model")
+
+        # Execute query
+        result = call_engine(
+            engine=query_info["engine"],
+            prompt=query_info["query"],
+            temperature=0.2,
+            model=model
+        )
         
-        print(f"Executing {len(queries)} queries for {target_date}")
+        # Extract entities and citations
+        entities = extract_competitors(result.get("text", ""))
+        links = extract_links(result.get("text", ""))
+        domains = to_domains(links)
         
-        # Get database session
-        db = next(get_db())
+        # Check if Extreme Networks is mentioned
+        extreme_mentioned = any(
+            entity.name.lower() == "extreme networks" 
+            for entity in entities
+        )
         
-        for i, query_info in enumerate(queries):
-            model = query_info.get("model")
-            display_engine = f"{query_info['engine']} ({model})" if model else query_info["engine"]
-            print(f"Query {i+1}/{len(queries)}: {query_info['query'][:50]}... [{display_engine}]")
-            
-            if dry_run:
-                results.append({
-                    "query": query_info["query"],
-                    "engine": query_info["engine"],
-                    "model": model,
-                    "intent": query_info["intent"],
-                    "status": "dry_run",
-                    "result": None
-                })
-                continue
-            
-            try:
-                # Execute query
-                result = call_engine(
-                    engine=query_info["engine"],
-                    prompt=query_info["query"],
-                    temperature=0.2,
-                    model=model
-                )
-                
-                # Extract entities and citations
-                entities = extract_competitors(result.get("text", ""))
-                links = extract_links(result.get("text", ""))
-                domains = to_domains(links)
-                
-                # Check if Extreme Networks is mentioned
-                extreme_mentioned = any(
-                    entity.name.lower() == "extreme networks" 
-                    for entity in entities
-                )
-                
-                # Create run record
-                run_id = str(uuid.uuid4())
-                # Heuristic for branded queries: brand names or comparison terms
-                q_lower = (query_info["query"] or "").lower()
-                branded_terms = [
-                    "extreme", "cisco", "juniper", "aruba", "meraki", "fortinet", "palo alto",
-                    "ruckus", "ubiquiti", "netgear", "tp-link", "d-link", "huawei", "arista",
-                    "vs", "versus", "compare", "comparison"
-                ]
-                is_branded = (query_info.get("intent") in ("brand_focused", "comparison")) or any(t in q_lower for t in branded_terms)
-                run_data = {
-                    "id": run_id,
-                    "ts": datetime.utcnow(),
-                    "query": query_info["query"],
-                    "engine": query_info["engine"],
-                    "model": model or result.get("model"),
-                    "intent": query_info["intent"],
-                    "is_branded": is_branded,
-                    "status": "completed",
-                    "latency_ms": result.get("latency_ms", 0),
-                    "input_tokens": result.get("input_tokens", 0),
-                    "output_tokens": result.get("output_tokens", 0),
-                    "cost_usd": result.get("cost_usd", 0),
-                    "raw_excerpt": result.get("text", "")[:1000],  # Truncate for storage
-                    "links": links,
-                    "domains": domains,
-                    "extreme_mentioned": extreme_mentioned,
-                    "entities_normalized": [
-                        {
-                            "name": entity.name,
-                            "first_pos": entity.first_pos,
-                            "type": "competitor"
-                        }
-                        for entity in entities
-                    ],
-                    "citations_enriched": [],  # Will be populated later
-                    "vendors": [],  # Will be populated later
-                    "deleted": False,
-                    "source": "automated"  # Mark as automated query
+        # Create run record
+        run_id = str(uuid.uuid4())
+        # Heuristic for branded queries: brand names or comparison terms
+        q_lower = (query_info["query"] or "").lower()
+        branded_terms = [
+            "extreme", "cisco", "juniper", "aruba", "meraki", "fortinet", "palo alto",
+            "ruckus", "ubiquiti", "netgear", "tp-link", "d-link", "huawei", "arista",
+            "vs", "versus", "compare", "comparison"
+        ]
+        is_branded = (query_info.get("intent") in ("brand_focused", "comparison")) or any(t in q_lower for t in branded_terms)
+        return {
+            "id": run_id,
+            "ts": datetime.utcnow(),
+            "query": query_info["query"],
+            "engine": query_info["engine"],
+            "model": model or result.get("model"),
+            "intent": query_info["intent"],
+            "is_branded": is_branded,
+            "status": "completed",
+            "latency_ms": result.get("latency_ms", 0),
+            "input_tokens": result.get("input_tokens", 0),
+            "output_tokens": result.get("output_tokens", 0),
+            "cost_usd": result.get("cost_usd", 0),
+            "raw_excerpt": result.get("text", "")[:1000],  # Truncate for storage
+            "links": links,
+            "domains": domains,
+            "extreme_mentioned": extreme_mentioned,
+            "entities_normalized": [
+                {
+                    "name": entity.name,
+                    "first_pos": entity.first_pos,
+                    "type": "competitor"
                 }
-                
-                # Save to database
-                db_run = Run(**run_data)
-                db.add(db_run)
+                for entity in entities
+            ],
+            "citations_enriched": [],  # Will be populated later
+            "vendors": [],  # Will be populated later
+            "deleted": False,
+            "source": "automated"  # Mark as automated query
+        }
+
+    def _persist_batch(self, db, pending: List[tuple], results: List[Optional[Dict[str, Any]]]) -> None:
+        """Write completed runs in one transaction; on failure retry row by row so only bad rows become errors."""
+        if not pending:
+            return
+        try:
+            db.add_all([Run(**run_data) for _, run_data in pending])
+            write_run_children(db, "runs", [run_data for _, run_data in pending])
+            db.commit()
+            print(f"✅ Saved {len(pending)} runs to database")
+            return
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️  Batch save failed ({e}); retrying rows individually")
+
+        for index, run_data in pending:
+            try:
+                db.add(Run(**run_data))
+                write_run_children(db, "runs", [run_data])
                 db.commit()
-                
-                print(f"✅ Saved run {run_id} to database")
-                
-                results.append({
-                    "run_id": run_id,
-                    "query": query_info["query"],
-                    "engine": query_info["engine"],
-                    "model": model,
-                    "intent": query_info["intent"],
-                    "status": "completed",
-                    "result": run_data
-                })
-                
-                # Add small delay between queries
-                import time
-                time.sleep(1)
-                
             except Exception as e:
-                print(f"Error executing query: {e}")
-                results.append({
+                db.rollback()
+                print(f"Error saving run {run_data['id']}: {e}")
+                results[index] = {**results[index], "status": "error", "error": str(e), "result": None}
+                results[index].pop("run_id", None)
+
+    def execute_daily_queries(
+        self,
+        target_date: date,
+        dry_run: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[Callable[[int, int, Dict[str, int]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Execute all daily queries for a specific date.
+
+        Engines are called concurrently (bounded per engine by get_parallelism), completed runs are
+        committed in batches of `batch_size`, and results are returned in plan order.
+        """
+        queries = self.get_daily_queries(target_date)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        
+        print(f"Executing {len(queries)} queries for {target_date}")
+
+        if dry_run:
+            for i, query_info in enumerate(queries):
+                results[i] = {
                     "query": query_info["query"],
                     "engine": query_info["engine"],
-                    "model": model,
+                    "model": query_info.get("model"),
                     "intent": query_info["intent"],
-                    "status": "error",
-                    "error": str(e),
+                    "status": "dry_run",
                     "result": None
-                })
+                }
+            return results
+
+        parallelism = self.get_parallelism()
+        print(f"Parallelism per engine: {parallelism}")
+        # One bounded pool per engine so a slow provider cannot starve the other
+        pools = {
+            engine: ThreadPoolExecutor(max_workers=parallelism.get(engine, 1), thread_name_prefix=f"sched-{engine}")
+            for engine in {q["engine"] for q in queries}
+        }
+        
+        # Get database session
+        db = next(get_db())
+        counts = {"completed": 0, "error": 0}
+        pending: List[tuple] = []
+        try:
+            futures = {
+                pools[query_info["engine"]].submit(self._execute_query, query_info): i
+                for i, query_info in enumerate(queries)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                query_info = queries[i]
+                model = query_info.get("model")
+                try:
+                    run_data = future.result()
+                    results[i] = {
+                        "run_id": run_data["id"],
+                        "query": query_info["query"],
+                        "engine": query_info["engine"],
+                        "model": model,
+                        "intent": query_info["intent"],
+                        "status": "completed",
+                        "result": run_data
+                    }
+                    pending.append((i, run_data))
+                    counts["completed"] += 1
+                except Exception as e:
+                    print(f"Error executing query: {e}")
+                    results[i] = {
+                        "query": query_info["query"],
+                        "engine": query_info["engine"],
+                        "model": model,
+                        "intent": query_info["intent"],
+                        "status": "error",
+                        "error": str(e),
+                        "result": None
+                    }
+                    counts["error"] += 1
+
+                if len(pending) >= batch_size:
+                    self._persist_batch(db, pending, results)
+                    pending = []
+
+                done = counts["completed"] + counts["error"]
+                display_engine = f"{query_info['engine']} ({model})" if model else query_info["engine"]
+                print(f"Query {done}/{len(queries)} done: {query_info['query'][:50]}... [{display_engine}] "
+                      f"({counts['completed']} completed, {counts['error']} errors)")
+                if progress:
+                    progress(done, len(queries), dict(counts))
+
+            self._persist_batch(db, pending, results)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            db.close()
         
         return results
     
+    def drain_job_queue(
+        self,
+        batch_date: date,
+        worker_id: Optional[str] = None,
+        lease_s: int = DEFAULT_LEASE_S,
+        progress: Optional[Callable[[int, Dict[str, int]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Claim and execute jobs of a materialized batch until none are left for this worker.
+
+        Any number of workers (processes or hosts) can drain the same batch; each completed run is
+        committed together with its job so a crash never loses or duplicates finished work.
+        Returns this worker's results in completion order.
+        """
+        worker_id = worker_id or make_worker_id()
+        parallelism = self.get_parallelism()
+        capacity = sum(parallelism.values())
+        pools: Dict[str, ThreadPoolExecutor] = {}
+
+        def pool_for(engine: str) -> ThreadPoolExecutor:
+            if engine not in pools:
+                pools[engine] = ThreadPoolExecutor(max_workers=parallelism.get(engine, 1), thread_name_prefix=f"jobs-{engine}")
+            return pools[engine]
+
+        print(f"Worker {worker_id} draining batch {batch_date} (parallelism {parallelism})")
+        db = next(get_db())
+        results: List[Dict[str, Any]] = []
+        counts = {"completed": 0, "error": 0, "lost_lease": 0}
+        inflight: Dict[Any, Any] = {}
+        exhausted = False
+        try:
+            while True:
+                # Keep every slot busy; claim only as many jobs as there are free slots so leases stay short
+                free = capacity - len(inflight)
+                if free > 0 and not exhausted:
+                    jobs = claim_jobs(db, batch_date, worker_id, free, lease_s)
+                    exhausted = not jobs
+                    for job in jobs:
+                        query_info = {"query": job.query, "engine": job.engine, "model": job.model, "intent": job.intent}
+                        inflight[pool_for(job.engine).submit(self._execute_query, query_info)] = job
+                if not inflight:
+                    break
+
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = inflight.pop(future)
+                    entry = {"job_id": job.id, "query": job.query, "engine": job.engine, "model": job.model, "intent": job.intent}
+                    try:
+                        run_data = future.result()
+                        db.add(Run(**run_data))
+                        write_run_children(db, "runs", [run_data])
+                        if mark_done(db, job.id, worker_id, run_data["id"]):
+                            db.commit()
+                            entry.update(run_id=run_data["id"], status="completed", result=run_data)
+                            counts["completed"] += 1
+                        else:
+                            # Lease expired and another worker took the job over; drop this copy
+                            db.rollback()
+                            entry.update(status="lost_lease", result=None)
+                            counts["lost_lease"] += 1
+                    except Exception as e:
+                        db.rollback()
+                        print(f"Error executing query: {e}")
+                        job_status = mark_failed(db, job, worker_id, str(e))
+                        # A job handed back for retry makes the batch claimable again
+                        exhausted = exhausted and job_status != "pending"
+                        entry.update(status="error", error=str(e), job_status=job_status, result=None)
+                        counts["error"] += 1
+                    results.append(entry)
+
+                print(f"Worker {worker_id}: {counts['completed']} completed, {counts['error']} errors, {len(inflight)} in flight")
+                if progress:
+                    progress(len(results), dict(counts))
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            db.close()
+
+        return results
+
     def get_schedule_info(self) -> Dict[str, Any]:
         """Get information about the current schedule."""
         if not self.queries_config:
@@ -0,0 +1,290 @@
+#per-provider/model rate limiting: token buckets for RPM/TPM plus AIMD concurrency, shared by every engine call path
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Defaults per provider; "provider:model" keys override them for a single model.
+# EGT_RATE_LIMITS (JSON, same shape) and EGT_<PROVIDER>_RPM / _TPM / _MAX_CONCURRENCY override these at startup.
+RATE_LIMITS: Dict[str, Dict[str, float]] = {
+    "openai": {"rpm": 500, "tpm": 200_000, "max_concurrency": 16},
+    "perplexity": {"rpm": 50, "tpm": 100_000, "max_concurrency": 8},
+}
+
+# Retries for throttled (429/5xx) or transient connection failures
+MAX_RETRIES = int(os.getenv("EGT_RATE_LIMIT_MAX_RETRIES", "4"))
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 30.0
+# Share of a minute's budget that may be spent in one burst
+BURST_FRACTION = 1 / 6
+# Concurrency is halved at most once per this window, so one burst of 429s counts as one signal
+DECREASE_COOLDOWN_S = 2.0
+POLL_S = 0.05
+
+
+def _load_overrides() -> None:
+    raw = os.getenv("EGT_RATE_LIMITS")
+    if raw:
+        try:
+            for key, cfg in json.loads(raw).items():
+                RATE_LIMITS.setdefault(key, {}).update(cfg)
+        except Exception as e:
+            print(f"⚠️  Ignoring invalid EGT_RATE_LIMITS: {e}")
+    for provider in ("openai", "perplexity"):
+        for field in ("rpm", "tpm", "max_concurrency"):
+            value = os.getenv(f"EGT_{provider.upper()}_{field.upper()}")
+            if value:
+                RATE_LIMITS[provider][field] = float(value)
+
+
+_load_overrides()
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 500) -> int:
+    """Rough pre-call token estimate (~4 chars per token plus the output cap) for TPM pacing."""
+    return len(prompt or "") // 4 + max_output_tokens
+
+
+def classify_error(exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+    """Return ("throttle" | "transient" | None, retry_after seconds) for a provider call failure."""
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return "throttle", retry_after
+    if status is None:
+        # Connection resets and timeouts from httpx or the OpenAI SDK are worth one more try
+        names = {cls.__name__ for cls in type(exc).__mro__}
+        if names & {"TransportError", "TimeoutException", "APIConnectionError", "APITimeoutError"}:
+            return "transient", None
+    return None, None
+
+
+class _TokenBucket:
+    """Continuous-refill bucket; `rate_per_min` units per minute with a burst capacity."""
+
+    def __init__(self, rate_per_min: float):
+        self.rate_s = max(float(rate_per_min), 1.0) / 60.0
+        self.capacity = max(float(rate_per_min) * BURST_FRACTION, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_s)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        # Requests larger than the burst capacity go through once the bucket is full
+        need = min(amount, self.capacity)
+        return 0.0 if self.level >= need else (need - self.level) / self.rate_s
+
+
+class Lease:
+    """One admitted call. Report the outcome before the lease is released."""
+
+    def __init__(self, limiter: "RateLimiter", estimated_tokens: int):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.tokens_used: Optional[int] = None
+        self.failure: Optional[str] = None
+        self.retry_after: Optional[float] = None
+        self._released = False
+
+    def observe_error(self, exc: BaseException) -> Optional[str]:
+        """Record a failed call; returns its kind ("throttle" / "transient") when it is worth retrying."""
+        kind, retry_after = classify_error(exc)
+        if kind:
+            self.failure = kind
+            self.retry_after = retry_after
+        return kind
+
+    def set_tokens(self, tokens_used: int) -> None:
+        self.tokens_used = int(tokens_used or 0)
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.limiter._release(self)
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None and self.failure is None:
+            # Non-retryable errors (bad request, auth, cancellation) neither grow nor shrink the window
+            self.failure = (isinstance(exc, Exception) and self.observe_error(exc)) or "error"
+        self.release()
+
+
+class RateLimiter:
+    """RPM/TPM token buckets plus an AIMD concurrency window for one provider/model."""
+
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: float):
+        self.name = name
+        self.requests = _TokenBucket(rpm)
+        self.tokens = _TokenBucket(tpm)
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.concurrency = float(min(4, self.max_concurrency))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "succeeded": 0, "throttled": 0, "transient": 0, "failed": 0, "wait_s": 0.0}
+
+    def _try_admit(self, estimated_tokens: int) -> float:
+        """Admit now (returns 0) or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                return POLL_S
+            wait = max(self.requests.wait_for(1), self.tokens.wait_for(estimated_tokens))
+            if wait > 0:
+                return wait
+            self.requests.level -= 1
+            self.tokens.level -= estimated_tokens
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return 0.0
+
+    def acquire(self, estimated_tokens: int) -> Lease:
+        """Block until the call fits the budgets and concurrency window."""
+        started = time.monotonic()
+        while True:
+            wait = self._try_admit(estimated_tokens)
+            if wait <= 0:
+                break
+            time.sleep(min(wait, 1.0))
+        self._add_wait(time.monotonic() - started)
+        return Lease(self, estimated_tokens)
+
+    async def acquire_async(self, estimated_tokens: int) -> Lease:
+        """Asyncio counterpart of acquire."""
+        started = time.monotonic()
+        while True:
+            wait = self._try_admit(estimated_tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, 1.0))
+        self._add_wait(time.monotonic() - started)
+        return Lease(self, estimated_tokens)
+
+    def _add_wait(self, waited: float) -> None:
+        with self._lock:
+            self.stats["wait_s"] += waited
+
+    def _release(self, lease: Lease) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight = max(self.in_flight - 1, 0)
+            if lease.tokens_used is not None:
+                # Settle the estimate against real usage (may go negative, which delays later calls)
+                self.tokens.refill(now)
+                self.tokens.level -= lease.tokens_used - lease.estimated_tokens
+
+            if lease.failure == "throttle":
+                self.stats["throttled"] += 1
+                # Multiplicative decrease, plus a pause honoring Retry-After
+                if now - self.last_decrease >= DECREASE_COOLDOWN_S:
+                    self.concurrency = max(1.0, self.concurrency / 2)
+                    self.last_decrease = now
+                if lease.retry_after:
+                    self.blocked_until = max(self.blocked_until, now + lease.retry_after)
+            elif lease.failure == "transient":
+                self.stats["transient"] += 1
+            elif lease.failure == "error":
+                self.stats["failed"] += 1
+            else:
+                self.stats["succeeded"] += 1
+                # Additive increase: about +1 slot per window of successful calls
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+
+    def backoff_s(self, attempt: int, lease: Lease) -> float:
+        if lease.retry_after:
+            return lease.retry_after
+        return min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int, usage: Callable[[Any], int] | None = None) -> Any:
+        """Run fn under the limiter, retrying throttled or transient failures with backoff."""
+        for attempt in range(MAX_RETRIES + 1):
+            with self.acquire(estimated_tokens) as lease:
+                try:
+                    result = fn()
+                except Exception as e:
+                    if not lease.observe_error(e) or attempt == MAX_RETRIES:
+                        raise
+                else:
+                    if usage is not None:
+                        lease.set_tokens(usage(result))
+                    return result
+            time.sleep(self.backoff_s(attempt, lease))
+
+    async def call_async(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        estimated_tokens: int,
+        usage: Callable[[Any], int] | None = None,
+    ) -> Any:
+        """Asyncio counterpart of call; fn returns a fresh awaitable per attempt."""
+        for attempt in range(MAX_RETRIES + 1):
+            with await self.acquire_async(estimated_tokens) as lease:
+                try:
+                    result = await fn()
+                except Exception as e:
+                    if not lease.observe_error(e) or attempt == MAX_RETRIES:
+                        raise
+                else:
+                    if usage is not None:
+                        lease.set_tokens(usage(result))
+                    return result
+            await asyncio.sleep(self.backoff_s(attempt, lease))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self.concurrency, 2),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                **{k: (round(v, 2) if isinstance(v, float) else v) for k, v in self.stats.items()},
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str | None = None) -> RateLimiter:
+    """Shared limiter for a provider/model pair, created from RATE_LIMITS on first use."""
+    name = f"{provider}:{model}" if model else provider
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                cfg = {**RATE_LIMITS.get(provider, {"rpm": 60, "tpm": 100_000, "max_concurrency": 4}), **RATE_LIMITS.get(name, {})}
+                limiter = RateLimiter(name, cfg["rpm"], cfg["tpm"], cfg["max_concurrency"])
+                _limiters[name] = limiter
+    return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    """Current window and counters for every limiter in use."""
+    return {name: limiter.snapshot() for name, limiter in _limiters.items()}
@@ -0,0 +1,203 @@
+#content-addressed cache of normalized engine responses, consulted in front of call_engine
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+SCHEDULE_PATH = Path(__file__).resolve().parents[3] / "data" / "queries" / "system_queries.json"
+CADENCE_DAYS = {"daily": 1, "every_3_days": 3}
+
+
+def cadence_ttl_s(path: Path = SCHEDULE_PATH) -> int:
+    """Length of one scheduled cycle in seconds, from schedule.cadence (a day when missing or unknown)."""
+    try:
+        cadence = json.loads(Path(path).read_text()).get("schedule", {}).get("cadence")
+    except Exception:
+        cadence = None
+    return CADENCE_DAYS.get(cadence, 1) * 24 * 3600
+
+
+# Default TTL is one cycle of the configured scheduler cadence, so a cached answer never outlives a scheduled cycle
+DEFAULT_TTL_S = int(os.getenv("EGT_RESPONSE_CACHE_TTL_S") or cadence_ttl_s())
+DEFAULT_MAX_ENTRIES = int(os.getenv("EGT_RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+
+def _normalize_prompt(prompt: str) -> str:
+    # Case and whitespace differences should not produce a different answer key
+    return " ".join((prompt or "").split()).casefold()
+
+
+def cache_key(
+    engine: str,
+    model: str,
+    prompt: str,
+    temperature: float,
+    prompt_version: str,
+    system_prompt: str,
+) -> str:
+    """Stable sha256 over everything that determines an engine's answer."""
+    parts = {
+        "engine": engine,
+        "model": model or "",
+        "prompt": _normalize_prompt(prompt),
+        "temperature": round(float(temperature or 0.0), 3),
+        "prompt_version": prompt_version or "",
+        "system": hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """Process-local LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl_s: int, engine: str, model: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl_s, dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class PostgresCacheBackend:
+    """Shared cache in the engine_response_cache table, visible to every worker and the scheduler."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        from .database import SessionLocal
+        from ..models.response_cache import ResponseCacheEntry
+
+        db = SessionLocal()
+        try:
+            entry = db.get(ResponseCacheEntry, key)
+            if entry is None or entry.expires_at <= datetime.now(timezone.utc):
+                return None
+            return dict(entry.response)
+        finally:
+            db.close()
+
+    def set(self, key: str, value: Dict[str, Any], ttl_s: int, engine: str, model: str) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+        from .database import SessionLocal
+        from ..models.response_cache import ResponseCacheEntry
+
+        now = datetime.now(timezone.utc)
+        row = {
+            "key": key,
+            "engine": engine,
+            "model": model,
+            "response": value,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_s),
+        }
+        stmt = insert(ResponseCacheEntry).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ResponseCacheEntry.key],
+            set_={k: stmt.excluded[k] for k in ("response", "created_at", "expires_at")},
+        )
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        from .database import SessionLocal
+        from ..models.response_cache import ResponseCacheEntry
+
+        db = SessionLocal()
+        try:
+            db.query(ResponseCacheEntry).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class ResponseCache:
+    """Backend-agnostic cache front with hit/miss counters."""
+
+    def __init__(self, backend, ttl_s: int = DEFAULT_TTL_S):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never fail the query; treat it as a miss
+            print(f"⚠️  Response cache read failed: {e}")
+            value = None
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], engine: str, model: str) -> None:
+        try:
+            self.backend.set(key, value, self.ttl_s, engine, model)
+        except Exception as e:
+            print(f"⚠️  Response cache write failed: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Shared cache selected by EGT_RESPONSE_CACHE_BACKEND (memory | postgres | off)."""
+    global _cache
+    if _cache is None:
+        kind = os.getenv("EGT_RESPONSE_CACHE_BACKEND", "memory").lower()
+        if kind == "off":
+            return None
+        backend = PostgresCacheBackend() if kind == "postgres" else MemoryCacheBackend()
+        _cache = ResponseCache(backend)
+    return _cache
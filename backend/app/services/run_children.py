@@ -0,0 +1,106 @@
+#write-time normalization of run links and entities into run_citations / run_entities
+
+from __future__ import annotations
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from ..models.run_citation import RunCitation
+from ..models.run_entity import RunEntity
+
+BRAND_DOMAIN = "extremenetworks.com"
+BRAND_NAMES = {"extreme networks", "extremenetworks"}
+
+
+def citation_domain(url: str) -> str:
+    """Lowercased netloc without www. (same rule as extract.to_domains)."""
+    try:
+        dom = (urlparse(url).netloc or "").lower()
+    except Exception:
+        return ""
+    return dom[4:] if dom.startswith("www.") else dom
+
+
+def as_json_list(value: Any) -> List[Any]:
+    """A JSON array column value as a list; older rows hold the array serialized as a string."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            return []
+    return value if isinstance(value, list) else []
+
+
+def naive_utc(ts: datetime) -> datetime:
+    """runs.ts is timezone-aware, automated_runs.ts is naive UTC; child rows and cube days use naive UTC."""
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def child_rows(run_source: str, run: Mapping[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Citation and entity rows for one run given its column values (id, ts, links, vendors/entities_normalized)."""
+    base = {"run_source": run_source, "run_id": run["id"], "ts": naive_utc(run["ts"])}
+
+    citations = []
+    for rank, link in enumerate(as_json_list(run.get("links")), start=1):
+        url = link.get("url") if isinstance(link, dict) else link
+        if not isinstance(url, str) or not url:
+            continue
+        domain = citation_domain(url)
+        citations.append({**base, "rank": rank, "url": url, "domain": domain, "is_brand_domain": BRAND_DOMAIN in domain})
+
+    # Manual runs keep extractor output in vendors; scheduled and automated runs only fill entities_normalized
+    entities = []
+    for rank, entity in enumerate(as_json_list(run.get("vendors")) or as_json_list(run.get("entities_normalized")), start=1):
+        if isinstance(entity, dict):
+            name = entity.get("name") or entity.get("entity")
+            first_pos = entity.get("first_pos")
+        else:
+            name, first_pos = entity, None
+        if not isinstance(name, str) or not name:
+            continue
+        entities.append({
+            **base,
+            "rank": rank,
+            "name": name,
+            "first_pos": first_pos if isinstance(first_pos, int) else None,
+            "is_brand": name.lower() in BRAND_NAMES,
+        })
+    return citations, entities
+
+
+def write_run_children(db: Session, run_source: str, runs: Iterable[Mapping[str, Any]], replace: bool = False) -> None:
+    """Add the child rows of `runs` in the caller's transaction, fold the runs into the metrics cube and
+    mark their daily_metrics partitions dirty.
+
+    replace=True first drops existing child rows (re-extraction); the caller then rebuilds the affected
+    cube days with metrics_cube.rebuild_cube, since a run's old contribution cannot be subtracted.
+    """
+    # Local imports: metrics_cube and dirty_metrics build on this module
+    from .dirty_metrics import mark_dirty
+    from .metrics_cube import add_runs_to_cube
+
+    runs = list(runs)
+    if not runs:
+        return
+    ids = [run["id"] for run in runs]
+    citations: List[Dict[str, Any]] = []
+    entities: List[Dict[str, Any]] = []
+    for run in runs:
+        c, e = child_rows(run_source, run)
+        citations.extend(c)
+        entities.extend(e)
+
+    if replace:
+        for model in (RunCitation, RunEntity):
+            db.execute(delete(model).where(model.run_source == run_source, model.run_id.in_(ids)))
+    if citations:
+        db.execute(insert(RunCitation), citations)
+    if entities:
+        db.execute(insert(RunEntity), entities)
+    if not replace:
+        add_runs_to_cube(db, run_source, runs, citations, entities)
+    mark_dirty(db, run_source, runs)
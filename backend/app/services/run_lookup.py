@@ -0,0 +1,102 @@
+#same-query run lookup: exact matches on the stored normalized query, near-duplicates by trigram similarity
+
+from __future__ import annotations
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+
+from ..models.run import Run
+
+# Near-duplicate threshold on trigram similarity (pg_trgm's similarity(), 0-1)
+FUZZY_THRESHOLD = float(os.getenv("EGT_RUN_LOOKUP_SIMILARITY", "0.8"))
+# Unset: same UTC day, as the lookup always behaved; otherwise a rolling window of this many hours
+DEFAULT_LOOKBACK_HOURS = os.getenv("EGT_RUN_LOOKUP_LOOKBACK_HOURS")
+MAX_LOOKBACK_HOURS = 30 * 24
+
+_NOT_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(text: Optional[str]) -> str:
+    """Lowercased query with punctuation and whitespace runs collapsed to single spaces.
+
+    Same rule as the SQL backfill in migration 0014 (regexp_replace(lower(query), '[^a-z0-9]+', ' ', 'g')).
+    """
+    return _NOT_ALNUM_RE.sub(" ", (text or "").lower()).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    # pg_trgm: each word padded with two leading spaces and one trailing space
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(a, b) for normalized text: shared trigrams over all distinct trigrams."""
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def window_start(lookback_hours: Optional[float] = None, now: Optional[datetime] = None) -> datetime:
+    """Oldest run ts considered: midnight UTC today, or now minus lookback_hours (capped at 30 days)."""
+    now = now or datetime.now(timezone.utc)
+    if lookback_hours is None and DEFAULT_LOOKBACK_HOURS:
+        lookback_hours = float(DEFAULT_LOOKBACK_HOURS)
+    if lookback_hours is None:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now - timedelta(hours=min(max(float(lookback_hours), 0.0), MAX_LOOKBACK_HOURS))
+
+
+def _latest_per_engine(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """First (most recent) row per engine of rows ordered by ts descending."""
+    matches: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if row.engine not in matches:
+            matches[row.engine] = {"id": row.id, "engine": row.engine, "ts": row.ts.isoformat()}
+    return list(matches.values())
+
+
+def lookup_runs(
+    db: Session,
+    query_text: str,
+    engines: Optional[List[str]] = None,
+    lookback_hours: Optional[float] = None,
+    threshold: float = FUZZY_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """Latest run per engine for the query within the window, most recent first.
+
+    Exact normalized matches win; near-duplicates (trigram similarity >= threshold) are the fallback.
+    """
+    q_norm = normalize_query(query_text)
+    if not q_norm:
+        return []
+
+    scope = [Run.ts >= window_start(lookback_hours)]
+    if engines:
+        scope.append(Run.engine.in_(engines))
+    columns = (Run.id, Run.engine, Run.ts)
+
+    # 1) Exact normalized match per engine (latest), served by ix_runs_query_norm_ts
+    exact = db.execute(select(*columns).where(Run.query_norm == q_norm, *scope).order_by(desc(Run.ts)))
+    matches = _latest_per_engine(exact)
+    if matches:
+        return matches
+
+    # 2) Near-duplicate fallback
+    if db.get_bind().dialect.name == "postgresql":
+        # `%` is answered from the GIN trigram index using the transaction-local threshold
+        db.execute(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+        stmt = select(*columns).where(Run.query_norm.op("%")(q_norm), *scope).order_by(desc(Run.ts))
+        return _latest_per_engine(db.execute(stmt))
+
+    # Other databases (tests, local SQLite): same similarity computed over the window's normalized queries
+    candidates = db.execute(select(*columns, Run.query_norm).where(*scope).order_by(desc(Run.ts)))
+    return _latest_per_engine(row for row in candidates if trigram_similarity(row.query_norm or "", q_norm) >= threshold)
@@ -1,32 +1,72 @@
 from __future__ import annotations
-import json
+import asyncio
 import time
+import uuid
 from typing import List
-from datetime import datetime
 
 from ..schemas.query_schemas import QueryRequest, RunResponse
-from .engines import call_engine
+from .engines import call_engine, call_engine_async
 from .extract import extract_competitors, extract_links, to_domains
 from .pricing import estimate_cost
-from .db_writer import persist_run_to_db
-from ..routes.runs import _enrich_citations, _normalize_entities
-from ..models.run import Run
-from ..services.database import get_db
+from .run_writer import enqueue_run
+from ..routes.runs import _normalize_entities
+from .url_metadata import enrich_citations
 
 #script to run engine objects, extract competitors, links, and domains, and append to csv
 
 def make_run_id(engine: str) -> str:
-    return f"run_{engine}_{int(time.time() * 1000)}"
+    # Random suffix: two runs on one engine in the same millisecond must not share an id (the writer skips repeats)
+    return f"run_{engine}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
 
 
-def run_single_engine(req: QueryRequest, eng: str, ts_iso: str) -> RunResponse:
+def _select_model(req: QueryRequest, eng: str) -> str | None:
     # Choose model per engine with sensible fallbacks
     selected_model = None
     if eng == 'openai':
         selected_model = getattr(req, 'openai_model', None) or getattr(req, 'model', None)
     elif eng == 'perplexity':
         selected_model = getattr(req, 'perplexity_model', None) or getattr(req, 'model', None)
-    norm = call_engine(eng, req.query, req.temperature, selected_model)
+    return selected_model
+
+
+def run_single_engine(req: QueryRequest, eng: str, ts_iso: str) -> RunResponse:
+    norm = call_engine(
+        eng, req.query, req.temperature, _select_model(req, eng),
+        prompt_version=req.prompt_version, use_cache=not req.force,
+    )
+    return _finish_run(req, eng, ts_iso, norm)
+
+
+async def run_single_engine_async(req: QueryRequest, eng: str, ts_iso: str) -> RunResponse:
+    """Await the engine on the event loop, then extract and persist in a worker thread."""
+    norm = await call_engine_async(
+        eng, req.query, req.temperature, _select_model(req, eng),
+        prompt_version=req.prompt_version, use_cache=not req.force,
+    )
+    return await asyncio.to_thread(_finish_run, req, eng, ts_iso, norm)
+
+
+async def run_engines(req: QueryRequest, ts_iso: str) -> List[RunResponse]:
+    """Fan out to all requested engines concurrently; wall time is roughly the slowest engine.
+
+    Each engine is isolated: a failure or timeout becomes that engine's error row, results keep request order.
+    """
+    results = await asyncio.gather(
+        *(run_single_engine_async(req, eng, ts_iso) for eng in req.engines),
+        return_exceptions=True,
+    )
+    out: List[RunResponse] = []
+    for eng, res in zip(req.engines, results):
+        if isinstance(res, BaseException):
+            if not isinstance(res, Exception):
+                raise res
+            res = await asyncio.to_thread(run_single_engine_error, req, eng, ts_iso, res)
+        out.append(res)
+    return out
+
+
+def _finish_run(req: QueryRequest, eng: str, ts_iso: str, norm: dict) -> RunResponse:
+    # Extraction + persistence for one normalized engine response
     text = norm.get("text", "") or ""
     model = norm.get("model", "") or eng
     input_tokens = int(norm.get("input_tokens", 0) or 0)
@@ -41,7 +81,7 @@ def run_single_engine(req: QueryRequest, eng: str, ts_iso: str) -> RunResponse:
 
     # Enrichment at write-time to avoid extra work on first view
     # Speed path: compute normalized citations without fetching titles; titles can be filled on first view
-    citations_enriched = _enrich_citations(links, max_titles=0)
+    citations_enriched = enrich_citations(links, max_titles=0)
     entities_normalized = _normalize_entities([v.model_dump() for v in vendors])
 
     extreme_rank = None
@@ -77,47 +117,8 @@ def run_single_engine(req: QueryRequest, eng: str, ts_iso: str) -> RunResponse:
         "extreme_rank": extreme_rank,
     }
     
-    # Save to database (legacy fallback)
-    persist_run_to_db(csv_row)
-    
-    # Save to database
-    try:
-        db = next(get_db())
-        # Heuristic for branded flag
-        q_lower = (req.query or "").lower()
-        branded_terms = ["extreme", "cisco", "juniper", "aruba", "vs", "versus", "compare", "comparison"]
-        is_branded = (req.intent in ("brand_focused", "comparison")) or any(t in q_lower for t in branded_terms)
-        db_run = Run(
-            id=run_id,
-            ts=datetime.fromisoformat(ts_iso.replace('Z', '+00:00')),
-            query=req.query,
-            engine=eng,
-            model=model,
-            prompt_version=req.prompt_version,
-            intent=req.intent,
-            status="ok",
-            latency_ms=latency_ms,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            cost_usd=cost_usd,
-            raw_excerpt=text[:1000],
-            vendors=[v.model_dump() for v in vendors],
-            links=links,
-            domains=domains,
-            citations_enriched=citations_enriched,
-            entities_normalized=entities_normalized,
-            extreme_mentioned=extreme_mentioned,
-            extreme_rank=extreme_rank,
-            is_branded=is_branded,
-            deleted=False,
-            source="manual"  # Mark as manual query
-        )
-        db.add(db_run)
-        db.commit()
-        print(f"✅ Saved manual run {run_id} to database")
-    except Exception as e:
-        print(f"⚠️  Failed to save to database: {e}")
-        # Continue with CSV fallback
+    # Write-behind: the row is flushed in a batch after the response, exactly once per run id
+    enqueue_run(csv_row)
 
     return RunResponse(
         id=run_id,
@@ -158,13 +159,13 @@ def run_single_engine_error(req: QueryRequest, eng: str, ts_iso: str, exc: Excep
         "output_tokens": 0,
         "cost_usd": 0.0,
         "raw_excerpt": str(exc),
-        "vendors": json.dumps([]),
-        "links": json.dumps([]),
-        "domains": json.dumps([]),
+        "vendors": [],
+        "links": [],
+        "domains": [],
         "extreme_mentioned": False,
         "extreme_rank": None,
     }
-    persist_run_to_db(csv_row)
+    enqueue_run(csv_row)
 
     return RunResponse(
         id=run_id,
@@ -0,0 +1,267 @@
+#write-behind persistence for runs: request paths enqueue finished runs, a background thread flushes them in batches
+
+from __future__ import annotations
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .db_writer import run_values
+
+# Flush when this many runs are buffered, or when the oldest buffered run has waited this long
+DEFAULT_BATCH_SIZE = int(os.getenv("EGT_RUN_WRITER_BATCH_SIZE", "100"))
+DEFAULT_FLUSH_MS = int(os.getenv("EGT_RUN_WRITER_FLUSH_MS", "200"))
+# Writes of one run before it is logged and dropped; retries back off from flush_ms up to RETRY_MAX_S
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("EGT_RUN_WRITER_MAX_ATTEMPTS", "5"))
+RETRY_MAX_S = float(os.getenv("EGT_RUN_WRITER_RETRY_MAX_S", "30"))
+
+
+def insert_runs(rows: List[Dict[str, Any]], session_factory: Optional[Callable] = None) -> int:
+    """Multi-row INSERT of run values plus their citation/entity rows; ids already in the table are skipped.
+
+    Returns rows inserted.
+    """
+    from sqlalchemy.dialects.postgresql import insert
+    from .database import SessionLocal
+    from .run_children import write_run_children
+    from ..models.run import Run
+
+    db = (session_factory or SessionLocal)()
+    try:
+        stmt = insert(Run).values(rows).on_conflict_do_nothing(index_elements=[Run.id]).returning(Run.id)
+        inserted = set(db.scalars(stmt))
+        write_run_children(db, "runs", [row for row in rows if row["id"] in inserted])
+        db.commit()
+        return len(inserted)
+    finally:
+        db.close()
+
+
+class RunWriteBehind:
+    """Buffers run rows keyed by id and writes them in batches from one background thread.
+
+    A run id is written at most once: re-submitting a buffered id replaces the buffered row, and the
+    insert skips ids already in the table, so a retried flush never duplicates rows. Both cases are
+    logged and counted as duplicates; run_query.make_run_id keeps ids of distinct runs unique.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[Dict[str, Any]]], int] = insert_runs,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_ms: int = DEFAULT_FLUSH_MS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_s = max(0, flush_ms) / 1000.0
+        self.max_attempts = max(1, max_attempts)
+        # Failed write attempts per buffered run id
+        self._attempts: Dict[str, int] = {}
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        # Serializes flushes so a caller waiting on flush() sees the in-flight batch committed
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.submitted = 0
+        self.written = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def submit(self, values: Dict[str, Any]) -> None:
+        """Queue one row of runs column values; returns without touching the database."""
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                if values["id"] in self._pending:
+                    print(f"⚠️  Run write-behind: run {values['id']} submitted again; the buffered row is replaced")
+                    self.duplicates += 1
+                self._pending[values["id"]] = values
+                self._pending.move_to_end(values["id"])
+                self.submitted += 1
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="run-writer", daemon=True)
+                    self._thread.start()
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify()
+        if closed:
+            # Late submissions after shutdown are written inline rather than dropped
+            try:
+                self._write([values])
+            except Exception as e:
+                print(f"⚠️  Run write-behind inline write failed for {values['id']}: {e}")
+                raise
+
+    def pending(self, run_id: str) -> bool:
+        """True while run_id is buffered or being written."""
+        with self._cond:
+            return run_id in self._pending or run_id in self._inflight
+
+    def flush(self) -> int:
+        """Write everything buffered now. Returns rows inserted.
+
+        A failed batch is retried row by row, so one bad row never holds back the rest; rows that keep
+        failing go back into the buffer with backoff and are dropped (logged) after max_attempts writes.
+        """
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                self._inflight = dict(self._pending)
+                self._pending.clear()
+                self._oldest = None
+            rows = list(self._inflight.values())
+            inserted = 0
+            failed: List[Tuple[Dict[str, Any], Exception]] = []
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    chunk = rows[i:i + self.batch_size]
+                    try:
+                        inserted += self._write(chunk)
+                    except Exception as e:
+                        if len(chunk) == 1:
+                            failed.append((chunk[0], e))
+                        else:
+                            print(f"⚠️  Run write-behind batch failed ({len(chunk)} runs): {e}; retrying rows individually")
+                            for row in chunk:
+                                try:
+                                    inserted += self._write([row])
+                                except Exception as row_error:
+                                    failed.append((row, row_error))
+                    for row in chunk:
+                        self._inflight.pop(row["id"], None)
+            finally:
+                with self._cond:
+                    retry_attempts = 0
+                    for row, error in failed:
+                        attempts = self._attempts.get(row["id"], 0) + 1
+                        if attempts >= self.max_attempts:
+                            self._attempts.pop(row["id"], None)
+                            self._drop(row["id"], f"{attempts} failed writes: {error}")
+                        elif row["id"] not in self._pending:
+                            print(f"⚠️  Run write-behind write failed for {row['id']} (attempt {attempts}/{self.max_attempts}): {error}")
+                            self._attempts[row["id"]] = attempts
+                            self._pending[row["id"]] = row
+                            retry_attempts = max(retry_attempts, attempts)
+                    for run_id, row in self._inflight.items():
+                        self._pending.setdefault(run_id, row)
+                    self._inflight = {}
+                    for row in rows:
+                        if row["id"] not in self._pending:
+                            self._attempts.pop(row["id"], None)
+                    if retry_attempts:
+                        # Failed rows wait flush_ms doubled per attempt (capped) before the timer flushes again
+                        self._oldest = time.monotonic() + min(RETRY_MAX_S, self.flush_s * (2 ** retry_attempts - 1))
+                    elif self._pending and self._oldest is None:
+                        self._oldest = time.monotonic()
+            return inserted
+
+    def _drop(self, run_id: str, reason: str) -> None:
+        # Caller holds self._cond
+        print(f"❌ Run write-behind dropped run {run_id} after {reason}")
+        self.dropped += 1
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        try:
+            inserted = self.sink(rows)
+        except Exception:
+            with self._cond:
+                self.errors += 1
+            raise
+        if inserted < len(rows):
+            print(f"⚠️  Run write-behind skipped {len(rows) - inserted} of {len(rows)} runs whose id is already stored")
+        with self._cond:
+            self.flushes += 1
+            self.written += inserted
+            self.duplicates += len(rows) - inserted
+        return inserted
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        remaining = self._oldest + self.flush_s - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                closing = self._closed
+            try:
+                self.flush()
+            except Exception:
+                pass
+            if closing:
+                return
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting buffered writes and drain what is queued."""
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:
+            pass
+        with self._cond:
+            # Rows that failed their last write have no later flush to retry them
+            for run_id in list(self._pending):
+                self._drop(run_id, "shutdown with failed writes pending")
+            self._pending.clear()
+            self._attempts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "batch_size": self.batch_size,
+                "flush_ms": int(self.flush_s * 1000),
+                "pending": len(self._pending) + len(self._inflight),
+                "submitted": self.submitted,
+                "written": self.written,
+                "duplicates": self.duplicates,
+                "flushes": self.flushes,
+                "errors": self.errors,
+                "dropped": self.dropped,
+            }
+
+
+_writer: Optional[RunWriteBehind] = None
+_writer_lock = threading.Lock()
+
+
+def get_run_writer() -> RunWriteBehind:
+    """Process-wide writer; drained at interpreter exit for scripts that never call close_run_writer."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = RunWriteBehind()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def enqueue_run(row: Dict[str, Any], source: str = "manual") -> None:
+    """Queue a pipeline row (same shape persist_run_to_db takes) for batched insertion."""
+    get_run_writer().submit(run_values(row, source))
+
+
+def close_run_writer() -> None:
+    """Drain pending runs; called on app shutdown."""
+    if _writer is not None:
+        _writer.close()
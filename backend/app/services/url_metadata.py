@@ -0,0 +1,236 @@
+#citation page titles: fetched concurrently on a pooled async client and cached per normalized URL in url_metadata
+
+from __future__ import annotations
+import asyncio
+import codecs
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .http_clients import get_async_http_client
+from ..models.url_metadata import UrlMetadata
+
+TITLE_POOL = "titles"
+FETCH_TIMEOUT_S = float(os.getenv("EGT_TITLE_FETCH_TIMEOUT_S", "2.0"))
+# Titles rarely change; failures are retried much sooner
+TITLE_TTL_S = int(os.getenv("EGT_TITLE_TTL_S", str(30 * 24 * 3600)))
+NEGATIVE_TTL_S = int(os.getenv("EGT_TITLE_NEGATIVE_TTL_S", str(24 * 3600)))
+# Concurrent fetches per host, so one run citing a site ten times does not hammer it
+PER_HOST_LIMIT = int(os.getenv("EGT_TITLE_PER_HOST", "2"))
+# Body bytes (after gzip/deflate decoding) read before giving up on </title>; the rest is never downloaded
+MAX_TITLE_BYTES = int(os.getenv("EGT_TITLE_MAX_BYTES", str(256 * 1024)))
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+USER_AGENT = "Mozilla/5.0 (compatible; EGTBot/1.0)"
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+
+class TitleResult(NamedTuple):
+    url: str
+    title: Optional[str]
+    status_code: Optional[int]
+    error: Optional[str]
+
+
+#normalize url to remove tracking params and www.
+def normalize_url(url: str) -> str:
+    try:
+        p = urlparse(url)
+        # drop tracking params
+        q = [(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not k.lower().startswith(("utm_", "gclid", "fbclid"))]
+        new = p._replace(query=urlencode(q), fragment="")
+        # normalize scheme/netloc casing and strip www.
+        netloc = (new.netloc or "").lower()
+        if netloc.startswith("www."):
+            netloc = netloc[4:]
+        new = new._replace(netloc=netloc)
+        return urlunparse(new)
+    except Exception:
+        return url
+
+
+#get domain from url using urlparse
+def domain_from_url(url: str) -> str:
+    try:
+        netloc = urlparse(url).netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+    except Exception:
+        return ""
+
+
+def extract_title(html: str) -> Optional[str]:
+    """Whitespace-collapsed <title> of an HTML document, at most 300 characters."""
+    m = _TITLE_RE.search(html)
+    if not m:
+        return None
+    title = re.sub(r"\s+", " ", m.group(1)).strip()
+    return title[:300] or None
+
+
+def _client() -> httpx.AsyncClient:
+    return get_async_http_client(TITLE_POOL)
+
+
+def _is_html(content_type: str) -> bool:
+    # No Content-Type at all is sniffed like HTML; anything else declared (PDF, video, JSON...) is skipped
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return not media_type or media_type in HTML_TYPES
+
+
+def _charset(declared: Optional[str], head: bytes) -> str:
+    """Charset from the Content-Type header, else a <meta charset>/http-equiv in the body, else UTF-8."""
+    m = _META_CHARSET_RE.search(head)
+    for candidate in (declared, m.group(1).decode("ascii") if m else None):
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+async def read_title(resp: httpx.Response, max_bytes: int = MAX_TITLE_BYTES) -> Optional[str]:
+    """Title of a streamed HTML response, reading only until </title> or max_bytes, whichever comes first."""
+    body = bytearray()
+    async for chunk in resp.aiter_bytes():
+        # Resume the search just before the new chunk, so a tag split across chunks is still found
+        start = max(0, len(body) - len(b"</title"))
+        body += chunk
+        if b"</title" in body[start:].lower() or len(body) >= max_bytes:
+            break
+    head = bytes(body[:max_bytes])
+    return extract_title(head.decode(_charset(resp.charset_encoding, head), errors="replace"))
+
+
+async def _fetch_one(client: httpx.AsyncClient, url: str, host_limits: Dict[str, asyncio.Semaphore]) -> TitleResult:
+    host = domain_from_url(url)
+    limit = host_limits.setdefault(host, asyncio.Semaphore(PER_HOST_LIMIT))
+    async with limit:
+        try:
+            # Streamed: the status line and headers decide whether any of the body is read at all
+            async with client.stream("GET", url, timeout=FETCH_TIMEOUT_S, follow_redirects=True, headers={"User-Agent": USER_AGENT}) as resp:
+                if resp.status_code >= 400:
+                    return TitleResult(url, None, resp.status_code, "http_error")
+                if not _is_html(resp.headers.get("content-type", "")):
+                    return TitleResult(url, None, resp.status_code, "not_html")
+                title = await read_title(resp)
+        except httpx.TimeoutException:
+            return TitleResult(url, None, None, "timeout")
+        except Exception:
+            return TitleResult(url, None, None, "fetch_error")
+    return TitleResult(url, title, resp.status_code, None if title else "no_title")
+
+
+async def fetch_titles(urls: Iterable[str]) -> List[TitleResult]:
+    """Fetch every URL's title concurrently; the pool bounds total connections, PER_HOST_LIMIT each host."""
+    client = _client()
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    return list(await asyncio.gather(*(_fetch_one(client, url, host_limits) for url in urls)))
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _run(coro):
+    """Run coro on the fetcher's own event loop, so the pooled client and its keep-alive connections outlive one request."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="title-fetcher", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+def cached_metadata(db: Session, urls: Iterable[str], now: Optional[datetime] = None) -> Dict[str, UrlMetadata]:
+    """Unexpired url_metadata rows (titles and cached failures) for the given normalized URLs."""
+    urls = list(urls)
+    if not urls:
+        return {}
+    now = now or datetime.utcnow()
+    rows = db.scalars(select(UrlMetadata).where(UrlMetadata.url.in_(urls), UrlMetadata.expires_at > now))
+    return {row.url: row for row in rows}
+
+
+def store_results(db: Session, results: Iterable[TitleResult], now: Optional[datetime] = None) -> int:
+    """Upsert fetch results into url_metadata; failures get the shorter negative TTL."""
+    now = now or datetime.utcnow()
+    rows = [
+        {
+            "url": result.url,
+            "domain": domain_from_url(result.url),
+            "title": result.title,
+            "status_code": result.status_code,
+            "error": result.error,
+            "fetched_at": now,
+            "expires_at": now + timedelta(seconds=TITLE_TTL_S if result.title else NEGATIVE_TTL_S),
+        }
+        for result in results
+    ]
+    if not rows:
+        return 0
+    stmt = insert(UrlMetadata).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UrlMetadata.url],
+        set_={name: stmt.excluded[name] for name in ("domain", "title", "status_code", "error", "fetched_at", "expires_at")},
+    ))
+    return len(rows)
+
+
+def resolve_titles(db: Session, urls: Iterable[str], commit: bool = True) -> Dict[str, Optional[str]]:
+    """Title (or None) per normalized URL: served from url_metadata, fetching only URLs with no fresh entry."""
+    urls = list(dict.fromkeys(urls))
+    cached = cached_metadata(db, urls)
+    missing = [url for url in urls if url not in cached]
+    results = _run(fetch_titles(missing)) if missing else []
+    if results:
+        store_results(db, results)
+        if commit:
+            db.commit()
+
+    titles = {url: entry.title for url, entry in cached.items()}
+    titles.update((result.url, result.title) for result in results)
+    return titles
+
+
+#enriching citations by fetching titles from urls
+def enrich_citations(links: List[str], max_titles: int = 10, db: Optional[Session] = None) -> List[Dict[str, Any]]:
+    """Deduplicated, normalized citations of links; the first max_titles get page titles (0 skips fetching)."""
+    out: List[Dict[str, Any]] = []
+    seen = set()
+    for rank, raw in enumerate(links or [], start=1):
+        if not isinstance(raw, str) or not raw:
+            continue
+        url_n = normalize_url(raw)
+        if url_n in seen:
+            continue
+        seen.add(url_n)
+        out.append({
+            "url": url_n,
+            "domain": domain_from_url(url_n),
+            "rank": rank,
+            "title": None,
+        })
+    if max_titles <= 0 or not out:
+        return out
+
+    from .database import SessionLocal
+    session = db or SessionLocal()
+    try:
+        titles = resolve_titles(session, [item["url"] for item in out[:max_titles]])
+    finally:
+        if db is None:
+            session.close()
+    for item in out[:max_titles]:
+        item["title"] = titles.get(item["url"])
+    return out
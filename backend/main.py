@@ -8,6 +8,12 @@ from backend.app.routes.metrics import router as metrics_router
 from backend.app.routes.scheduler import router as scheduler_router
 from backend.app.routes.entity_associations import router as entity_associations_router
 from backend.app.services.database import init_db
+from backend.app.services.http_clients import close_http_clients, get_pool_stats
+from backend.app.services.response_cache import get_response_cache
+from backend.app.services.metrics_cache import get_metrics_cache
+from backend.app.services.rate_limiter import get_rate_limit_stats
+from backend.app.services.run_writer import close_run_writer, get_run_writer
+from backend.app.services.enrichment_queue import close_enrichment_queue, get_enrichment_queue
 
 #app configuration and endpoint registration
 app = FastAPI()
@@ -45,8 +51,50 @@ def health():
 def healthz():
     return {"ok": True}
 
+# Provider connection pool reuse (requests vs. new TCP+TLS handshakes)
+@app.get("/health/clients")
+def health_clients():
+    return get_pool_stats()
+
+# Engine response cache hit/miss counters
+@app.get("/health/cache")
+def health_cache():
+    cache = get_response_cache()
+    return cache.stats() if cache else {"backend": "off"}
+
+# Dashboard /metrics response cache hit/stale/miss counters
+@app.get("/health/metrics-cache")
+def health_metrics_cache():
+    cache = get_metrics_cache()
+    return cache.stats() if cache else {"backend": "off"}
+
+# Per provider/model rate limiter windows and 429/5xx counters
+@app.get("/health/rate-limits")
+def health_rate_limits():
+    return get_rate_limit_stats()
+
+# Write-behind run persistence: buffered rows, batch flushes and failures
+@app.get("/health/run-writer")
+def health_run_writer():
+    return get_run_writer().stats()
+
+# Background run enrichment (citation titles/entities) queue and worker outcomes
+@app.get("/health/enrichment")
+def health_enrichment():
+    return get_enrichment_queue().stats()
+
 
 @app.on_event("startup")
 def on_startup():
     # Ensure tables exist (simple create_all; for bigger projects use Alembic migrations)
     init_db()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Drain buffered runs before the process exits
+    close_run_writer()
+    # Stop enrichment workers; unfinished runs are queued again on their next read
+    close_enrichment_queue()
+    # Close pooled provider connections cleanly
+    await close_http_clients()
@@ -0,0 +1,31 @@
+#in-memory SQLite databases for the script tests; JSONB columns are rendered as SQLite JSON
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+def sqlite_engine(*models, shared: bool = False):
+    """Fresh in-memory database with the tables of the given models.
+
+    shared=True keeps a single connection (StaticPool) so worker threads and TestClient requests see the same data.
+    """
+    if shared:
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine("sqlite://")
+    for model in models:
+        model.__table__.create(engine)
+    return engine
+
+
+def sqlite_sessionmaker(*models, shared: bool = False, **kwargs):
+    """Session factory bound to sqlite_engine(*models); extra kwargs go to sessionmaker (e.g. autoflush=False)."""
+    return sessionmaker(bind=sqlite_engine(*models, shared=shared), future=True, **kwargs)
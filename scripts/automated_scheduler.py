@@ -2,11 +2,12 @@
 """
 Automated Query Scheduler
 This script is designed to be run by cron to automatically execute daily queries.
-It handles logging, error reporting, and ensures only one instance runs at a time.
+It handles logging and error reporting. The day's plan is materialized into the query_jobs
+table and drained by claiming jobs, so a crashed or restarted run resumes where it stopped and
+several instances (processes or hosts) can drain the same batch in parallel.
 """
 
 import sys
-import os
 import logging
 import json
 import time
@@ -20,6 +21,7 @@ sys.path.insert(0, str(backend_dir))
 
 from app.services.query_scheduler import QueryScheduler
 from app.services.database import get_db
+from app.services.job_queue import batch_progress, find_unfinished_batch, make_worker_id, materialize_plan
 from app.models.run import Run
 
 
@@ -29,7 +31,7 @@ class AutomatedScheduler:
     def __init__(self):
         self.setup_logging()
         self.scheduler = QueryScheduler()
-        self.lock_file = Path("/tmp/extreme_geo_scheduler.lock")
+        self.worker_id = make_worker_id()
         
     def setup_logging(self):
         """Setup logging to both file and console."""
@@ -49,39 +51,6 @@ class AutomatedScheduler:
         
         self.logger = logging.getLogger(__name__)
     
-    def acquire_lock(self) -> bool:
-        """Acquire a lock to prevent multiple instances from running."""
-        try:
-            if self.lock_file.exists():
-                # Check if the lock is stale (older than 1 hour)
-                lock_age = time.time() - self.lock_file.stat().st_mtime
-                if lock_age > 3600:  # 1 hour
-                    self.logger.warning(f"Removing stale lock file (age: {lock_age:.0f}s)")
-                    self.lock_file.unlink()
-                else:
-                    self.logger.error("Another scheduler instance is already running")
-                    return False
-            
-            # Create lock file with current PID
-            with open(self.lock_file, 'w') as f:
-                f.write(str(os.getpid()))
-            
-            self.logger.info(f"Lock acquired (PID: {os.getpid()})")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Failed to acquire lock: {e}")
-            return False
-    
-    def release_lock(self):
-        """Release the lock file."""
-        try:
-            if self.lock_file.exists():
-                self.lock_file.unlink()
-                self.logger.info("Lock released")
-        except Exception as e:
-            self.logger.error(f"Failed to release lock: {e}")
-    
     def should_run_queries(self, force_run: bool = False) -> bool:
         """Determine if we should run queries based on current time and schedule."""
         # If force_run is True, bypass time checks (for testing)
@@ -184,38 +153,71 @@ class AutomatedScheduler:
             # If we can't check, assume we should run
             return False
     
-    def execute_daily_queries(self) -> bool:
-        """Execute the daily queries."""
+    def find_resumable_batch(self) -> Optional[date]:
+        """Return the date of a batch left unfinished by a crash or still being drained by other workers."""
+        db = next(get_db())
+        try:
+            return find_unfinished_batch(db)
+        except Exception as e:
+            self.logger.error(f"Error checking the job queue: {e}")
+            return None
+        finally:
+            db.close()
+
+    def materialize_daily_plan(self, batch_date: date) -> int:
+        """Store the plan for batch_date as pending jobs (no-op if it already exists)."""
+        queries = self.scheduler.get_daily_queries(batch_date)
+        if not queries:
+            return 0
+        db = next(get_db())
         try:
-            today = date.today()
-            self.logger.info(f"Starting daily query execution for {today}")
+            return materialize_plan(db, batch_date, queries)
+        finally:
+            db.close()
+
+    def execute_daily_queries(self, batch_date: Optional[date] = None) -> bool:
+        """Drain the batch's jobs; post-process once the whole batch is settled."""
+        try:
+            batch_date = batch_date or date.today()
+            self.logger.info(f"Starting query execution for batch {batch_date} as worker {self.worker_id}")
             
-            # Get today's queries
-            queries = self.scheduler.get_daily_queries(today)
-            if not queries:
+            total = self.materialize_daily_plan(batch_date)
+            if not total:
                 self.logger.error("No queries found for today")
                 return False
             
-            self.logger.info(f"Executing {len(queries)} queries")
+            self.logger.info(f"Batch has {total} jobs")
             
             # Execute queries (not dry run)
             start_time = time.time()
-            results = self.scheduler.execute_daily_queries(today, dry_run=False)
+            results = self.scheduler.drain_job_queue(batch_date, worker_id=self.worker_id)
             execution_time = time.time() - start_time
             
-            # Log results
+            # Log results for this worker and for the whole batch
             status_counts = {}
             for result in results:
                 status = result['status']
                 status_counts[status] = status_counts.get(status, 0) + 1
             
+            db = next(get_db())
+            try:
+                batch_counts = batch_progress(db, batch_date)
+            finally:
+                db.close()
+            
             self.logger.info(f"Execution completed in {execution_time:.2f}s")
-            self.logger.info(f"Status distribution: {status_counts}")
+            self.logger.info(f"Status distribution (this worker): {status_counts}")
+            self.logger.info(f"Batch status: {batch_counts}")
+            
+            if batch_counts.get("pending") or batch_counts.get("running"):
+                # Other workers still hold jobs; whichever finishes last post-processes
+                self.logger.info("Batch still in progress on other workers")
+                return status_counts.get('error', 0) == 0
             
             # Check for errors
-            error_count = status_counts.get('error', 0)
-            if error_count > 0:
-                self.logger.warning(f"Completed with {error_count} errors")
+            failed_count = batch_counts.get('failed', 0)
+            if failed_count > 0:
+                self.logger.warning(f"Completed with {failed_count} failed jobs")
                 return False
             
             # Trigger post-processing pipeline
@@ -263,11 +265,15 @@ class AutomatedScheduler:
     
     def run(self, force_run: bool = False) -> int:
         """Main execution method."""
-        if not self.acquire_lock():
-            return 1
-        
         try:
-            self.logger.info("Automated scheduler started")
+            self.logger.info(f"Automated scheduler started (worker {self.worker_id})")
+            
+            # Resume (or help drain) an unfinished batch before considering a new one
+            batch_date = self.find_resumable_batch()
+            if batch_date:
+                self.logger.info(f"Resuming unfinished batch {batch_date}")
+                success = self.execute_daily_queries(batch_date)
+                return 0 if success else 1
             
             # Check if we should run queries
             if not self.should_run_queries(force_run=force_run):
@@ -280,14 +286,12 @@ class AutomatedScheduler:
                 return 0
             
             # Execute queries
-            success = self.execute_daily_queries()
+            success = self.execute_daily_queries(date.today())
             return 0 if success else 1
             
         except Exception as e:
             self.logger.error(f"Unexpected error: {e}")
             return 1
-        finally:
-            self.release_lock()
 
 
 def main():
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Daily Metrics Backfill
+Rebuilds daily_metrics for a date range from runs and/or automated_runs.
+
+The range is queued as dirty partitions, split into day ranges and computed on a process pool
+(one DB session per worker, runs streamed per day, results bulk-upserted). Partitions are cleared
+as they are committed, so an interrupted backfill continues where it stopped with --resume.
+"""
+
+import sys
+import time
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services.metrics_backfill import DEFAULT_PARTITION_DAYS, SOURCES, backfill_daily_metrics
+
+
+def setup_logging() -> logging.Logger:
+    """Setup console logging."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    return logging.getLogger(__name__)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Rebuild daily_metrics for a date range")
+    parser.add_argument("--start", type=str, required=True, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=str, default=None, help="Last day to rebuild (YYYY-MM-DD); defaults to yesterday")
+    parser.add_argument("--source", choices=list(SOURCES) + ["all"], default="automated_runs", help="Run table to rebuild from")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to CPU count; 1 runs inline)")
+    parser.add_argument("--partition-days", type=int, default=DEFAULT_PARTITION_DAYS, help="Days per worker task")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted backfill without re-queuing the range")
+
+    args = parser.parse_args()
+    logger = setup_logging()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else date.today() - timedelta(days=1)
+    if start > end:
+        parser.error("--start must not be after --end")
+
+    def log_progress(report):
+        logger.info(
+            f"{report['run_source']}: {report['ranges_done']}/{report['ranges']} ranges, "
+            f"{report['partitions']}/{report['pending']} partitions, {report['metrics']} metric rows, {report['failed']} failed"
+        )
+
+    sources = list(SOURCES) if args.source == "all" else [args.source]
+    remaining = 0
+    for source in sources:
+        started = time.time()
+        logger.info(f"Backfilling {source} {start}..{end}{' (resume)' if args.resume else ''}")
+        report = backfill_daily_metrics(
+            source, start, end,
+            workers=args.workers,
+            partition_days=args.partition_days,
+            resume=args.resume,
+            progress=log_progress,
+        )
+        remaining += report["remaining"]
+        logger.info(f"Finished {source} in {time.time() - started:.1f}s; {report['remaining']} partitions left")
+    if remaining:
+        logger.warning("Some partitions are still queued; re-run with --resume to finish them")
+    return 1 if remaining else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark for column-projected analytics reads.
+Loads a synthetic 365-day automated_runs window (multi-KB answers, JSON links/entities) from SQLite
+the previous way (full ORM objects via db.query(AutomatedRun).all()) and through the analytics row
+layer (only ts, engine, cost_usd, extreme_mentioned), reporting peak Python memory and latency.
+"""
+
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.automated_run import AutomatedRun
+from app.services.analytics_rows import iter_rows, select_rows
+
+COLUMNS = ("ts", "engine", "cost_usd", "extreme_mentioned")
+
+
+def seed(engine, runs: int, answer_kb: int, seed: int = 7) -> None:
+    """Insert `runs` automated runs spread over the last 365 days."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    answer = ("Extreme Networks and Cisco both ship campus switching. " * (answer_kb * 1024 // 56 + 1))[:answer_kb * 1024]
+    rows = [
+        {
+            "id": f"run-{i}",
+            "ts": start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            "query": f"best enterprise wifi vendor {i % 200}",
+            "engine": rng.choice(["openai", "perplexity"]),
+            "model": "gpt-4o-search-preview",
+            "status": "completed",
+            "answer_text": answer,
+            "entities_normalized": [{"name": "Cisco", "type": "vendor"}, {"name": "Extreme Networks", "type": "vendor"}],
+            "links": [f"https://site{rng.randrange(300)}.com/p{j}" for j in range(8)],
+            "domains": [f"site{rng.randrange(300)}.com" for _ in range(8)],
+            "competitor_mentions": ["Cisco", "Aruba"],
+            "extreme_mentioned": rng.random() < 0.3,
+            "citation_count": 8,
+            "cost_usd": 0.01,
+            "latency_ms": rng.randrange(500, 4000),
+        }
+        for i in range(runs)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(AutomatedRun), rows)
+
+
+def summarize(runs) -> tuple:
+    """What a typical panel does with the window: spend and mention count."""
+    cost = mentions = 0
+    for run in runs:
+        cost += run.cost_usd or 0
+        mentions += bool(run.extreme_mentioned)
+    return round(cost, 6), mentions
+
+
+def orm_read(Session):
+    db = Session()
+    try:
+        return summarize(db.query(AutomatedRun).filter(AutomatedRun.ts >= datetime(2025, 1, 1)).all())
+    finally:
+        db.close()
+
+
+def row_read(Session):
+    db = Session()
+    try:
+        return summarize(iter_rows(db, select_rows(AutomatedRun, COLUMNS).where(AutomatedRun.ts >= datetime(2025, 1, 1))))
+    finally:
+        db.close()
+
+
+def measure(fn, Session, repeat: int):
+    """(result, average seconds, peak traced bytes) of fn."""
+    tracemalloc.start()
+    result = fn(Session)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(Session)
+    return result, (time.perf_counter() - start) / repeat, peak
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark column-projected analytics reads")
+    parser.add_argument("--runs", type=int, default=20000, help="Runs in the 365-day window")
+    parser.add_argument("--answer-kb", type=int, default=4, help="answer_text size per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        AutomatedRun.__table__.create(engine)
+        seed(engine, args.runs, args.answer_kb)
+        Session = sessionmaker(bind=engine, future=True)
+
+        orm_result, orm_s, orm_peak = measure(orm_read, Session, args.repeat)
+        row_result, row_s, row_peak = measure(row_read, Session, args.repeat)
+
+    # Outputs must match before numbers mean anything
+    print(f"Window: {args.runs} runs, {args.answer_kb} KB answers; results match: {orm_result == row_result}")
+    print(f"ORM objects   : {orm_s * 1e3:8.1f} ms   peak {orm_peak / 2**20:8.1f} MiB")
+    print(f"projected rows: {row_s * 1e3:8.1f} ms   peak {row_peak / 2**20:8.1f} MiB")
+    print(f"speedup {orm_s / row_s:.1f}x, peak memory {orm_peak / row_peak:.1f}x lower")
+    return 0 if orm_result == row_result else 1
+
+
+if __name__ == "__main__":
+    exit(main())
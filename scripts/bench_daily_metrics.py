@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark for daily metrics computation.
+Compares the single-pass citation aggregate behind MetricsService.compute_daily_metrics against
+the previous computation (top-domain rescans, citations rescored for every brand context) on a
+synthetic (date, engine) with 10k citations. No database is needed.
+"""
+
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services.metrics import MetricsService, citation_quality
+
+
+def synthetic_day(citations: int, per_run: int, domains: int, seed: int = 7) -> List[SimpleNamespace]:
+    """Runs of one engine and day carrying `citations` enriched citations spread over `domains` domains."""
+    rng = random.Random(seed)
+    pool = [f"site{i}.{rng.choice(['com', 'org', 'io', 'news.net'])}" for i in range(domains)]
+    runs = []
+    for i in range(citations // per_run):
+        cites = []
+        for rank in range(1, per_run + 1):
+            domain = pool[min(int(rng.paretovariate(1.2)) - 1, domains - 1)]
+            cites.append({
+                "domain": domain,
+                "url": f"https://{domain}/p{rng.randrange(1000)}" + ("?utm_source=x" if rng.random() < 0.2 else ""),
+                "title": "A reasonably long page title" if rng.random() < 0.7 else "",
+                "rank": rank,
+            })
+        runs.append(SimpleNamespace(
+            ts=datetime(2025, 9, 1, 12),
+            engine="openai",
+            cost_usd=0.01,
+            extreme_mentioned=i % 3 == 0,
+            entities_normalized=[{"name": "Cisco"}],
+            citations_enriched=cites,
+        ))
+    return runs
+
+
+def legacy_engine_metrics(runs) -> Dict:
+    """Previous _compute_engine_metrics / _calculate_top_domains: rescans citations per top domain."""
+    all_citations = []
+    domain_counts = Counter()
+    for run in runs:
+        all_citations.extend(run.citations_enriched or [])
+        for citation in run.citations_enriched or []:
+            if citation.get("domain", ""):
+                domain_counts[citation["domain"]] += 1
+    top_domains = []
+    for domain, count in domain_counts.most_common(10):
+        scores = [citation_quality(c) for c in all_citations if c.get("domain") == domain]
+        top_domains.append({"domain": domain, "count": count, "quality_score": round(sum(scores) / len(scores), 2)})
+    scores = [citation_quality(c) for c in all_citations]
+    return {
+        "total_citations": len(all_citations),
+        "unique_domains": len(domain_counts),
+        "top_domains": top_domains,
+        "avg_visibility_score": round(sum(scores) / len(scores), 2) if scores else 0,
+        "high_quality_citations": sum(1 for s in scores if s > 0.7),
+    }
+
+
+def legacy_day(runs) -> List[Dict]:
+    """The three brand contexts each recomputed the same engine metrics."""
+    return [legacy_engine_metrics(runs) for _ in ("overall", "extreme_networks", "competitors")]
+
+
+def current_day(service: MetricsService, runs) -> List[Dict]:
+    aggregate = service._aggregate_citations(runs)
+    return [
+        service._compute_engine_metrics(runs, context, aggregate)
+        for context in ("overall", "extreme_networks", "competitors")
+    ]
+
+
+def time_it(fn, repeat: int) -> float:
+    """Return average seconds per call of fn."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark daily metrics computation")
+    parser.add_argument("--citations", type=int, default=10000, help="Citations in the synthetic day")
+    parser.add_argument("--per-run", type=int, default=10, help="Citations per run")
+    parser.add_argument("--domains", type=int, default=500, help="Distinct domains")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes")
+    args = parser.parse_args()
+
+    runs = synthetic_day(args.citations, args.per_run, args.domains)
+    service = MetricsService(db=None)
+
+    # Outputs must match before timings mean anything
+    legacy = legacy_engine_metrics(runs)
+    current = current_day(service, runs)[0]
+    mismatches = [key for key, value in legacy.items() if getattr(current, key) != value]
+    print(f"Synthetic day: {len(runs)} runs, {legacy['total_citations']} citations, {legacy['unique_domains']} domains")
+    print(f"Output mismatches vs legacy: {mismatches or 'none'}")
+
+    legacy_s = time_it(lambda: legacy_day(runs), args.repeat)
+    current_s = time_it(lambda: current_day(service, runs), args.repeat)
+
+    print(f"legacy rescans         : {legacy_s * 1e3:8.1f} ms/day-engine")
+    print(f"single-pass aggregate  : {current_s * 1e3:8.1f} ms/day-engine")
+    print(f"speedup                : {legacy_s / current_s:8.1f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    exit(main())
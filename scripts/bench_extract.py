@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark for vendor extraction.
+Compares the single-pass VendorMatcher behind extract_competitors against the
+previous one-regex-per-vendor scan on a corpus of real engine answers.
+
+By default the corpus is the answers stored in data/entity_associations.json.
+Use --from-db to pull answer_text from the automated_runs table instead.
+"""
+
+import sys
+import re
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services.extract import COMPETITORS, ALIASES, extract_competitors
+from app.schemas.query_schemas import VendorItem
+
+
+def legacy_extract_competitors(text: str) -> List[VendorItem]:
+    """Previous implementation: one regex compile + search per vendor name and alias."""
+    txt = (text or "")
+    found: List[VendorItem] = []
+    for v in COMPETITORS:
+        m = re.compile(rf"\b{re.escape(v)}\b", re.IGNORECASE).search(txt)
+        if m:
+            found.append(VendorItem(name=v, first_pos=m.start()))
+    for alias, canonical in ALIASES.items():
+        m = re.compile(rf"\b{re.escape(alias)}\b", re.IGNORECASE).search(txt)
+        if m:
+            found.append(VendorItem(name=canonical, first_pos=m.start()))
+    seen = set()
+    out: List[VendorItem] = []
+    for item in sorted(found, key=lambda x: x.first_pos):
+        key = item.name.lower()
+        if key not in seen:
+            out.append(item)
+            seen.add(key)
+    return out
+
+
+def load_corpus(from_db: bool, limit: int) -> List[str]:
+    """Load answer texts from the database or the bundled entity associations file."""
+    if from_db:
+        from app.services.database import get_db
+        from app.models.automated_run import AutomatedRun
+
+        db = next(get_db())
+        rows = (
+            db.query(AutomatedRun.answer_text)
+            .filter(AutomatedRun.answer_text.isnot(None))
+            .order_by(AutomatedRun.ts.desc())
+            .limit(limit)
+            .all()
+        )
+        return [r[0] for r in rows if r[0]]
+
+    data_file = Path(__file__).parent.parent / "data" / "entity_associations.json"
+    with open(data_file, "r") as f:
+        data = json.load(f)
+    return [a.get("response") or "" for a in data.get("associations", []) if a.get("response")]
+
+
+def time_it(fn, corpus: List[str], repeat: int) -> float:
+    """Return total seconds to run fn over the corpus `repeat` times."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            fn(text)
+    return time.perf_counter() - start
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark extract_competitors")
+    parser.add_argument("--from-db", action="store_true", help="Use automated_runs.answer_text as the corpus")
+    parser.add_argument("--limit", type=int, default=1000, help="Max answers to load with --from-db")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.from_db, args.limit)
+    if not corpus:
+        print("No answers found for the benchmark corpus")
+        return 1
+
+    # Outputs must match before timings mean anything
+    mismatches = 0
+    for text in corpus:
+        legacy = [(v.name, v.first_pos) for v in legacy_extract_competitors(text)]
+        current = [(v.name, v.first_pos) for v in extract_competitors(text)]
+        if legacy != current:
+            mismatches += 1
+    print(f"Corpus: {len(corpus)} answers, avg {sum(len(t) for t in corpus) // len(corpus)} chars")
+    print(f"Output mismatches vs legacy: {mismatches}")
+
+    # Warm up the shared matcher so its one-time build is not counted
+    extract_competitors("")
+
+    legacy_s = time_it(legacy_extract_competitors, corpus, args.repeat)
+    current_s = time_it(extract_competitors, corpus, args.repeat)
+    calls = len(corpus) * args.repeat
+
+    print(f"legacy per-vendor scan : {legacy_s / calls * 1e6:8.1f} us/answer")
+    print(f"single-pass matcher    : {current_s / calls * 1e6:8.1f} us/answer")
+    print(f"speedup                : {legacy_s / current_s:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
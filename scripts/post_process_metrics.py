@@ -2,8 +2,8 @@
 """
 Post-Processing Pipeline for Automated Queries
 This script runs after automated queries complete to:
-1. Compute daily metrics
-2. Update dashboard data
+1. Recompute daily metrics for the (date, engine) partitions new runs marked dirty
+2. Update dashboard data (summed from the metrics cube, so cost does not grow with the runs in the window)
 3. Generate insights and reports
 """
 
@@ -18,18 +18,24 @@ from typing import List, Dict, Any, Optional
 backend_dir = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_dir))
 
+from sqlalchemy.orm import Session
+
 from app.services.metrics import MetricsService
+from app.services.metrics_cube import cube_rollup, facet_rollup
+from app.services.dirty_metrics import mark_day_dirty, process_dirty_partitions
 from app.services.database import get_db
-from app.models.automated_run import AutomatedRun
 from app.models.metrics import DailyMetrics
 
+# Look-back window of the dashboard summary
+SUMMARY_DAYS = 7
+
 
 class PostProcessPipeline:
     """Post-processing pipeline for automated query results."""
     
-    def __init__(self):
+    def __init__(self, db: Optional[Session] = None):
         self.setup_logging()
-        self.db = next(get_db())
+        self.db = db if db is not None else next(get_db())
         self.metrics_service = MetricsService(self.db)
         
     def setup_logging(self):
@@ -50,172 +56,37 @@ class PostProcessPipeline:
         
         self.logger = logging.getLogger(__name__)
     
-    def get_recent_automated_runs(self, days_back: int = 3) -> List[AutomatedRun]:
-        """Get recent automated runs for processing."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
-        
-        # Read directly from automated_runs table
-        runs = (
-            self.db.query(AutomatedRun)
-            .filter(AutomatedRun.ts >= cutoff_date)
-            .order_by(AutomatedRun.ts.desc())
-            .all()
-        )
-        
-        self.logger.info(f"Found {len(runs)} automated runs in the last {days_back} days")
-        
-        return runs
+    def summary_scope(self, days_back: int = SUMMARY_DAYS) -> Dict[str, Any]:
+        """Metrics cube scope of the automated runs summarized on the dashboard."""
+        # AutomatedRun.ts is timezone-naive UTC, and so are the cube days
+        end_date = datetime.utcnow()
+        return {
+            "run_source": "automated_runs",
+            "start_day": (end_date - timedelta(days=days_back)).date(),
+            "end_day": end_date.date(),
+        }
     
     def compute_daily_metrics_from_automated(self, target_date: date) -> List[DailyMetrics]:
         """Compute daily metrics for a specific date using automated_runs."""
         self.logger.info(f"Computing daily metrics (automated_runs) for {target_date}")
-        start_ts = datetime.combine(target_date, datetime.min.time())
-        end_ts = datetime.combine(target_date, datetime.max.time())
-
-        runs: List[AutomatedRun] = (
-            self.db.query(AutomatedRun)
-            .filter(AutomatedRun.ts >= start_ts, AutomatedRun.ts <= end_ts)
-            .all()
-        )
-
-        if not runs:
-            return []
-
-        # Group by engine
-        by_engine: dict[str, list[AutomatedRun]] = {}
-        for r in runs:
-            by_engine.setdefault(r.engine or "unknown", []).append(r)
-
-        out: List[DailyMetrics] = []
-        for engine, engine_runs in by_engine.items():
-            # Overall context
-            total_runs = len(engine_runs)
-            total_cost = sum(float(r.cost_usd or 0) for r in engine_runs)
-
-            # Citations/domains
-            total_citations = 0
-            domain_counts: dict[str, int] = {}
-            unique_domains_set = set()
-            for r in engine_runs:
-                # Use citation_count if available, otherwise len(links)
-                ccount = r.citation_count if getattr(r, 'citation_count', None) is not None else len(r.links or [])
-                total_citations += int(ccount or 0)
-                for d in (r.domains or []):
-                    if not isinstance(d, str):
-                        continue
-                    d_lower = d.lower().lstrip('www.')
-                    if not d_lower:
-                        continue
-                    unique_domains_set.add(d_lower)
-                    domain_counts[d_lower] = domain_counts.get(d_lower, 0) + 1
-
-            # Build top_domains with simple quality placeholder
-            top_domains = [
-                {"domain": dom, "count": cnt, "quality_score": 0.0}
-                for dom, cnt in sorted(domain_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-            ]
-
-            # Brand vs competitors
-            brand_mentions = sum(1 for r in engine_runs if bool(getattr(r, 'extreme_mentioned', False)))
-            competitor_mentions = total_runs - brand_mentions
-            sov = round((brand_mentions / (brand_mentions + competitor_mentions) * 100), 2) if (brand_mentions + competitor_mentions) > 0 else 0.0
-
-            # Average visibility score placeholder (0); can be enhanced later
-            avg_visibility = 0.0
-            high_quality_citations = 0
-
-            out.append(
-                DailyMetrics(
-                    date=target_date,
-                    engine=engine,
-                    brand_context="overall",
-                    total_runs=total_runs,
-                    total_cost_usd=total_cost,
-                    total_citations=total_citations,
-                    unique_domains=len(unique_domains_set),
-                    top_domains=top_domains,
-                    brand_mentions=0,
-                    competitor_mentions=0,
-                    share_of_voice_pct=0,
-                    avg_visibility_score=avg_visibility,
-                    high_quality_citations=high_quality_citations,
-                    last_updated=datetime.utcnow().isoformat(),
-                    data_version="1.0",
-                )
-            )
-
-            # Brand context
-            if brand_mentions > 0:
-                out.append(
-                    DailyMetrics(
-                        date=target_date,
-                        engine=engine,
-                        brand_context="extreme_networks",
-                        total_runs=total_runs,
-                        total_cost_usd=total_cost,
-                        total_citations=total_citations,
-                        unique_domains=len(unique_domains_set),
-                        top_domains=top_domains,
-                        brand_mentions=brand_mentions,
-                        competitor_mentions=competitor_mentions,
-                        share_of_voice_pct=sov,
-                        avg_visibility_score=avg_visibility,
-                        high_quality_citations=high_quality_citations,
-                        last_updated=datetime.utcnow().isoformat(),
-                        data_version="1.0",
-                    )
-                )
-
-            # Competitors context
-            if competitor_mentions > 0:
-                out.append(
-                    DailyMetrics(
-                        date=target_date,
-                        engine=engine,
-                        brand_context="competitors",
-                        total_runs=total_runs,
-                        total_cost_usd=total_cost,
-                        total_citations=total_citations,
-                        unique_domains=len(unique_domains_set),
-                        top_domains=top_domains,
-                        brand_mentions=brand_mentions,
-                        competitor_mentions=competitor_mentions,
-                        share_of_voice_pct=100 - sov if sov else 0,
-                        avg_visibility_score=avg_visibility,
-                        high_quality_citations=high_quality_citations,
-                        last_updated=datetime.utcnow().isoformat(),
-                        data_version="1.0",
-                    )
-                )
-
+        out = self.metrics_service.compute_daily_metrics_from_automated(target_date)
         self.logger.info(f"Generated {len(out)} metric records from automated_runs")
         return out
     
-    def compute_share_of_voice_metrics(self, runs: List[AutomatedRun]) -> Dict[str, Any]:
-        """Compute share of voice metrics from recent runs."""
-        if not runs:
-            return {}
-        
-        # Group runs by date
-        runs_by_date = {}
-        for run in runs:
-            run_date = run.ts.date()
-            if run_date not in runs_by_date:
-                runs_by_date[run_date] = []
-            runs_by_date[run_date].append(run)
-        
+    def compute_share_of_voice_metrics(self, scope: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute share of voice metrics per day from the metrics cube."""
         share_of_voice_data = {}
         
-        for run_date, date_runs in runs_by_date.items():
+        for day in cube_rollup(self.db, group_by=("day",), **scope):
             # Count brand mentions
-            extreme_mentions = sum(1 for run in date_runs if run.extreme_mentioned)
-            total_runs = len(date_runs)
+            extreme_mentions = day["brand_mentions"]
+            total_runs = day["runs"]
             
             # Calculate share of voice
             share_of_voice = (extreme_mentions / total_runs * 100) if total_runs > 0 else 0
             
-            share_of_voice_data[run_date.isoformat()] = {
-                "date": run_date.isoformat(),
+            share_of_voice_data[day["day"].isoformat()] = {
+                "date": day["day"].isoformat(),
                 "total_runs": total_runs,
                 "extreme_mentions": extreme_mentions,
                 "share_of_voice_pct": round(share_of_voice, 2),
@@ -224,359 +95,77 @@ class PostProcessPipeline:
         
         return share_of_voice_data
     
-    def compute_cost_metrics(self, runs: List[AutomatedRun]) -> Dict[str, Any]:
-        """Compute cost metrics from recent runs."""
-        if not runs:
+    def compute_cost_metrics(self, scope: Dict[str, Any], totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute cost metrics from the metrics cube; `totals` is the cube rollup of the whole scope."""
+        if not totals["runs"]:
             return {}
         
-        total_cost = sum(float(run.cost_usd or 0) for run in runs)
-        total_tokens = sum(run.input_tokens + run.output_tokens for run in runs)
+        total_cost = totals["cost_usd"]
         
         # Cost by engine
-        cost_by_engine = {}
-        for run in runs:
-            engine = run.engine
-            if engine not in cost_by_engine:
-                cost_by_engine[engine] = {"cost": 0, "runs": 0}
-            cost_by_engine[engine]["cost"] += float(run.cost_usd or 0)
-            cost_by_engine[engine]["runs"] += 1
+        cost_by_engine = {
+            row["engine"]: {"cost": row["cost_usd"], "runs": row["runs"]}
+            for row in cube_rollup(self.db, group_by=("engine",), **scope)
+        }
         
         return {
             "total_cost_usd": round(total_cost, 6),
-            "total_tokens": total_tokens,
-            "avg_cost_per_run": round(total_cost / len(runs), 6) if runs else 0,
+            "total_tokens": totals["input_tokens"] + totals["output_tokens"],
+            "avg_cost_per_run": round(total_cost / totals["runs"], 6),
             "cost_by_engine": cost_by_engine
         }
     
-    def compute_competitor_insights(self, runs: List[AutomatedRun]) -> Dict[str, Any]:
-        """Compute competitor insights from recent runs."""
-        if not runs:
-            return {}
-        
+    def compute_competitor_insights(self, scope: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute competitor insights over non-branded runs from the metrics cube."""
         # Apply new heuristic: ONLY analyze NON-BRANDED queries
-        non_branded_runs = [r for r in runs if not bool(getattr(r, 'is_branded', False))]
-        if not non_branded_runs:
+        neutral = {**scope, "is_branded": False}
+        totals = cube_rollup(self.db, **neutral)[0]
+        if not totals["runs"]:
             return {}
         
-        # Extract all entities mentioned
-        all_entities = []
-        competitor_detection_analysis = {
-            "total_runs_analyzed": len(non_branded_runs),
-            "runs_with_entities": 0,
-            "runs_without_entities": 0,
-            "entity_extraction_issues": [],
-            "competitor_mentions_by_run": {},
-            "extreme_networks_analysis": {
-                "total_mentions": 0,
-                "runs_mentioned": 0,
-                "ranking_analysis": [],
-                "context_analysis": []
-            }
-        }
-        
-        for run in non_branded_runs:
-            try:
-                entities = run.entities_normalized
-                if entities is None:
-                    competitor_detection_analysis["runs_without_entities"] += 1
-                    competitor_detection_analysis["entity_extraction_issues"].append({
-                        "run_id": run.id,
-                        "issue": "entities_normalized is None",
-                        "query": run.query
-                    })
-                    continue
-                
-                # Handle different data types
-                if isinstance(entities, str):
-                    # If it's a string, try to parse as JSON
-                    try:
-                        import json
-                        entities = json.loads(entities)
-                    except:
-                        competitor_detection_analysis["entity_extraction_issues"].append({
-                            "run_id": run.id,
-                            "issue": f"Could not parse entities as JSON: {entities[:100]}",
-                            "query": run.query
-                        })
-                        continue
-                
-                if isinstance(entities, list):
-                    competitor_detection_analysis["runs_with_entities"] += 1
-                    
-                    # Track what was found in each run
-                    entities_found = []
-                    extreme_networks_rank = None
-                    
-                    for i, entity in enumerate(entities):
-                        if isinstance(entity, dict):
-                            name = entity.get("name", "Unknown")
-                            first_pos = entity.get("first_pos", 0)
-                        else:
-                            name = str(entity)
-                            first_pos = i
-                        
-                        # Create processed entity with rank information
-                        processed_entity = {
-                            "name": name,
-                            "rank": i + 1,
-                            "first_pos": first_pos
-                        }
-                        
-                        entities_found.append(processed_entity)
-                        all_entities.append(processed_entity)  # Add processed entity to all_entities
-                        
-                        # Check for Extreme Networks mentions
-                        if name.lower() in ["extreme networks", "extremenetworks"]:
-                            extreme_networks_rank = i + 1
-                            competitor_detection_analysis["extreme_networks_analysis"]["total_mentions"] += 1
-                            
-                            # Track ranking analysis
-                            competitor_detection_analysis["extreme_networks_analysis"]["ranking_analysis"].append({
-                                "run_id": run.id,
-                                "query": run.query,
-                                "rank": i + 1,
-                                "total_entities_in_run": len(entities),
-                                "engine": run.engine,
-                                "date": run.ts.date().isoformat()
-                            })
-                    
-                    # Track if Extreme Networks was mentioned in this run
-                    if extreme_networks_rank:
-                        competitor_detection_analysis["extreme_networks_analysis"]["runs_mentioned"] += 1
-                    
-                    competitor_detection_analysis["competitor_mentions_by_run"][run.id] = {
-                        "query": run.query,
-                        "entities_found": entities_found,
-                        "extreme_mentioned": run.extreme_mentioned,
-                        "extreme_networks_rank": extreme_networks_rank,
-                        "engine": run.engine,
-                        "total_entities": len(entities)
-                    }
-                else:
-                    competitor_detection_analysis["entity_extraction_issues"].append({
-                        "run_id": run.id,
-                        "issue": f"Unexpected entities type: {type(entities)}",
-                        "query": run.query
-                    })
-                    
-            except Exception as e:
-                competitor_detection_analysis["entity_extraction_issues"].append({
-                    "run_id": run.id,
-                    "issue": f"Error processing entities: {str(e)}",
-                    "query": run.query
-                })
-                continue
+        # Top competitors with average list position
+        entities = facet_rollup(self.db, "entity", limit=10, **neutral)
+        top_competitors = [
+            {"name": e["value"], "mentions": e["hits"], "avg_rank": round(e["rank_sum"] / e["hits"], 2) if e["hits"] else "N/A"}
+            for e in entities["items"]
+        ]
         
-        # Count entity mentions
-        entity_counts = {}
-        entity_ranking_analysis = {}
-        
-        # Debug: Log what we're processing
-        self.logger.info(f"Processing {len(all_entities)} entities for ranking analysis")
-        
-        for entity in all_entities:
-            try:
-                if isinstance(entity, dict):
-                    name = entity.get("name", "Unknown")
-                    # Since entities from database don't have rank, we'll use the order they appear
-                    # This gives us a simple ranking based on entity extraction order
-                    rank = None  # We'll calculate this differently
-                elif isinstance(entity, str):
-                    name = entity
-                    rank = None
-                else:
-                    name = str(entity)
-                    rank = None
-                
-                if name not in entity_counts:
-                    entity_counts[name] = 0
-                    entity_ranking_analysis[name] = []
-                
-                entity_counts[name] += 1
-                
-            except Exception as e:
-                self.logger.warning(f"Error processing entity {entity}: {e}")
-                continue
-        
-        # Now calculate rankings based on entity order in the original extraction
-        # We'll go through each run and assign rankings based on entity order
-        for run in non_branded_runs:
-            try:
-                entities = run.entities_normalized
-                if not entities or not isinstance(entities, list):
-                    continue
-                
-                # Assign rankings based on order in the entity list
-                for i, entity in enumerate(entities):
-                    if isinstance(entity, dict):
-                        name = entity.get("name", "Unknown")
-                    else:
-                        name = str(entity)
-                    
-                    if name in entity_ranking_analysis:
-                        # Add the ranking position (1-based) for this entity in this run
-                        entity_ranking_analysis[name].append(i + 1)
-                        self.logger.debug(f"Added rank {i + 1} for {name} in run {run.id}")
-                
-            except Exception as e:
-                self.logger.warning(f"Error processing run {run.id} for ranking: {e}")
-                continue
-        
-        # Debug: Log ranking analysis results
-        self.logger.info(f"Ranking analysis results: {entity_ranking_analysis}")
-        
-        # Top competitors with ranking analysis
-        top_competitors = []
-        for name, count in sorted(entity_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-            ranking_data = entity_ranking_analysis.get(name, [])
-            avg_rank = sum(ranking_data) / len(ranking_data) if ranking_data else 0
-            
-            self.logger.info(f"Competitor {name}: {count} mentions, ranking_data: {ranking_data}, avg_rank: {avg_rank}")
-            
-            top_competitors.append({
-                "name": name,
-                "mentions": count,
-                "avg_rank": round(avg_rank, 2) if avg_rank > 0 else "N/A",
-                "ranking_positions": sorted(ranking_data) if ranking_data else []
-            })
-        
-        # Analyze competitor detection effectiveness
+        runs_with_entities = totals["runs_with_entities"]
         detection_effectiveness = {
-            "entity_extraction_rate": round(
-                competitor_detection_analysis["runs_with_entities"] / 
-                competitor_detection_analysis["total_runs_analyzed"] * 100, 2
-            ) if competitor_detection_analysis["total_runs_analyzed"] > 0 else 0,
-            "avg_entities_per_run": round(
-                len(all_entities) / competitor_detection_analysis["runs_with_entities"], 2
-            ) if competitor_detection_analysis["runs_with_entities"] > 0 else 0,
-            "extreme_networks_detection_rate": round(
-                competitor_detection_analysis["extreme_networks_analysis"]["runs_mentioned"] / 
-                len(non_branded_runs) * 100, 2
-            ) if non_branded_runs else 0,
-            "extreme_networks_mention_rate": round(
-                competitor_detection_analysis["extreme_networks_analysis"]["total_mentions"] / 
-                len(all_entities) * 100, 2
-            ) if all_entities else 0
+            "entity_extraction_rate": round(runs_with_entities / totals["runs"] * 100, 2),
+            "avg_entities_per_run": round(totals["entity_mentions"] / runs_with_entities, 2) if runs_with_entities else 0,
+            "extreme_networks_detection_rate": round(totals["brand_mentions"] / totals["runs"] * 100, 2),
         }
         
         return {
-            "total_entity_mentions": len(all_entities),
-            "unique_entities": len(entity_counts),
+            "total_runs_analyzed": totals["runs"],
+            "runs_with_entities": runs_with_entities,
+            "runs_without_entities": totals["runs"] - runs_with_entities,
+            "total_entity_mentions": totals["entity_mentions"],
+            "unique_entities": entities["total"],
             "top_competitors": top_competitors,
-            "detection_effectiveness": detection_effectiveness,
-            "competitor_detection_analysis": competitor_detection_analysis,
-            "extreme_networks_detailed_analysis": competitor_detection_analysis["extreme_networks_analysis"]
+            "detection_effectiveness": detection_effectiveness
         }
     
-    def compute_citation_analysis(self, runs: List[AutomatedRun]) -> Dict[str, Any]:
-        """Compute simplified citation analysis focusing on domain frequency."""
-        if not runs:
+    def compute_citation_analysis(self, scope: Dict[str, Any], totals: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute simplified citation analysis focusing on domain frequency, from the metrics cube."""
+        if not totals["runs"]:
             return {}
         
-        domain_counts = {}
-        all_citations = []
-        
-        for run in runs:
-            try:
-                # Extract links and domains
-                links = run.links or []
-                domains = run.domains or []
-                
-                # Count domain mentions
-                for i, link in enumerate(links):
-                    domain = domains[i] if i < len(domains) else ""
-                    
-                    # Skip invalid domains (empty, single characters, etc.)
-                    if not domain or len(domain) < 3 or domain in ['"', '.', 'w', 'e', '[', ']']:
-                        continue
-                    
-                    if domain not in domain_counts:
-                        domain_counts[domain] = {
-                            "count": 0,
-                            "total_mentions": 0,
-                            "urls": [],
-                            "mentions_by_date": {},
-                            "avg_rank": 0,
-                            "runs_mentioned": set()
-                        }
-                    
-                    domain_counts[domain]["count"] += 1
-                    domain_counts[domain]["total_mentions"] += 1
-                    domain_counts[domain]["urls"].append(link)
-                    domain_counts[domain]["runs_mentioned"].add(run.id)
-                    
-                    # Track mentions by date
-                    date_key = run.ts.date().isoformat()
-                    if date_key not in domain_counts[domain]["mentions_by_date"]:
-                        domain_counts[domain]["mentions_by_date"][date_key] = 0
-                    domain_counts[domain]["mentions_by_date"][date_key] += 1
-                    
-                    citation_data = {
-                        "url": link,
-                        "domain": domain,
-                        "rank": i + 1,
-                        "run_id": run.id,
-                        "query": run.query,
-                        "engine": run.engine,
-                        "date": run.ts.date().isoformat()
-                    }
-                    all_citations.append(citation_data)
-                    
-            except Exception as e:
-                self.logger.warning(f"Error processing citations for run {run.id}: {e}")
-                continue
-        
-        # Calculate domain averages and convert sets to counts
-        for domain, stats in domain_counts.items():
-            if stats["count"] > 0:
-                # Calculate average rank
-                ranks = [c["rank"] for c in all_citations if c["domain"] == domain]
-                stats["avg_rank"] = round(sum(ranks) / len(ranks), 2) if ranks else 0
-                stats["runs_mentioned"] = len(stats["runs_mentioned"])
-        
-        # Top 5 domains by frequency (total mentions)
-        top_domains_by_frequency = sorted(
-            domain_counts.items(),
-            key=lambda x: x[1]["total_mentions"],
-            reverse=True
-        )[:5]
-        
-        # Top domains by count (unique URLs)
-        top_domains_by_count = sorted(
-            domain_counts.items(),
-            key=lambda x: x[1]["count"],
-            reverse=True
-        )[:10]
+        domains = facet_rollup(self.db, "domain", limit=10, **scope)
+        top_domains = [
+            {"domain": d["value"], "total_mentions": d["hits"], "runs_mentioned": d["runs"]}
+            for d in domains["items"]
+        ]
         
         return {
-            "total_citations": len(all_citations),
-            "unique_domains": len(domain_counts),
-            "top_5_domains_by_frequency": [
-                {
-                    "domain": domain,
-                    "total_mentions": stats["total_mentions"],
-                    "unique_urls": stats["count"],
-                    "avg_rank": stats["avg_rank"],
-                    "runs_mentioned": stats["runs_mentioned"],
-                    "mentions_by_date": stats["mentions_by_date"],
-                    "sample_urls": stats["urls"][:3]  # Show first 3 URLs
-                }
-                for domain, stats in top_domains_by_frequency
-            ],
-            "top_domains_by_count": [
-                {
-                    "domain": domain,
-                    "count": stats["count"],
-                    "total_mentions": stats["total_mentions"],
-                    "avg_rank": stats["avg_rank"],
-                    "runs_mentioned": stats["runs_mentioned"]
-                }
-                for domain, stats in top_domains_by_count
-            ],
+            "total_citations": totals["citations"],
+            "unique_domains": domains["total"],
+            "top_5_domains_by_frequency": top_domains[:5],
+            "top_domains_by_count": top_domains,
             "domain_breakdown": {
-                "total_domains_found": len(domain_counts),
-                "domains_with_multiple_mentions": len([d for d in domain_counts.values() if d["total_mentions"] > 1]),
-                "most_frequent_domain": top_domains_by_frequency[0][0] if top_domains_by_frequency else "None"
+                "total_domains_found": domains["total"],
+                "most_frequent_domain": top_domains[0]["domain"] if top_domains else "None"
             }
         }
     
@@ -624,21 +213,26 @@ class PostProcessPipeline:
         
         return max(0.0, min(score, 1.0))  # Cap between 0.0 and 1.0
     
-    def generate_dashboard_summary(self, runs: List[AutomatedRun]) -> Dict[str, Any]:
-        """Generate a comprehensive dashboard summary."""
-        if not runs:
+    def generate_dashboard_summary(self, days_back: int = SUMMARY_DAYS) -> Dict[str, Any]:
+        """Generate a comprehensive dashboard summary of the last `days_back` days.
+        
+        Everything is summed from the metrics cube, which run writes keep current, so the cost is
+        O(days x cells) no matter how many runs the window holds.
+        """
+        scope = self.summary_scope(days_back)
+        totals = cube_rollup(self.db, **scope)[0]
+        if not totals["runs"]:
             return {}
         
-        # Get date range
-        dates = [run.ts.date() for run in runs]
-        start_date = min(dates)
-        end_date = max(dates)
-        
         # Compute all metrics
-        share_of_voice = self.compute_share_of_voice_metrics(runs)
-        cost_metrics = self.compute_cost_metrics(runs)
-        competitor_insights = self.compute_competitor_insights(runs)
-        citation_analysis = self.compute_citation_analysis(runs)
+        share_of_voice = self.compute_share_of_voice_metrics(scope)
+        cost_metrics = self.compute_cost_metrics(scope, totals)
+        competitor_insights = self.compute_competitor_insights(scope)
+        citation_analysis = self.compute_citation_analysis(scope, totals)
+        
+        # Get date range (days that have runs)
+        start_date = date.fromisoformat(min(share_of_voice))
+        end_date = date.fromisoformat(max(share_of_voice))
         
         # Generate summary
         summary = {
@@ -648,9 +242,9 @@ class PostProcessPipeline:
                 "days": (end_date - start_date).days + 1
             },
             "execution_summary": {
-                "total_runs": len(runs),
-                "successful_runs": len([run for run in runs if run.status == "completed"]),
-                "failed_runs": len([run for run in runs if run.status != "completed"]),
+                "total_runs": totals["runs"],
+                "successful_runs": totals["runs"] - totals["failures"],
+                "failed_runs": totals["failures"],
                 "total_cost_usd": cost_metrics.get("total_cost_usd", 0)
             },
             "share_of_voice": share_of_voice,
@@ -680,33 +274,36 @@ class PostProcessPipeline:
             self.logger.error(f"Error saving dashboard summary: {e}")
             return False
     
-    def run_post_processing(self, target_date: Optional[date] = None) -> bool:
+    def run_post_processing(self, target_date: Optional[date] = None, force: bool = False) -> bool:
         """Run the complete post-processing pipeline."""
         try:
             self.logger.info("Starting post-processing pipeline")
             
-            # Use target date or default to today
-            if target_date is None:
-                target_date = date.today()
+            # An explicit date is recomputed even if none of its runs changed
+            if target_date is not None:
+                mark_day_dirty(self.db, "automated_runs", target_date)
+                self.db.commit()
+            
+            # Recompute only the (date, engine) partitions that new, late or changed runs marked dirty
+            counts = process_dirty_partitions(self.db)
+            self.logger.info(
+                f"Daily metrics recomputed for {counts['partitions']} dirty partitions "
+                f"({counts['metrics']} rows, {counts['failed']} failed)"
+            )
+            
+            if not counts["partitions"] and not force:
+                self.logger.info("No new runs since the last pass; dashboard summary left as is")
+                return True
             
-            # Get recent automated runs
-            runs = self.get_recent_automated_runs(days_back=7)  # Look back 7 days
+            # Generate dashboard summary from the cube rollups (no run rows are loaded)
+            summary = self.generate_dashboard_summary()
             
-            if not runs:
+            if not summary:
                 self.logger.warning("No automated runs found for post-processing")
                 return False
             
-            # Compute daily metrics from automated_runs
-            metrics = self.compute_daily_metrics_from_automated(target_date)
-            if metrics:
-                self.metrics_service.upsert_daily_metrics(metrics)
-                self.logger.info("Daily metrics computed and saved")
-            
-            # Generate dashboard summary
-            summary = self.generate_dashboard_summary(runs)
-            if summary:
-                self.save_dashboard_summary(summary)
-                self.logger.info("Dashboard summary generated and saved")
+            self.save_dashboard_summary(summary)
+            self.logger.info("Dashboard summary generated and saved")
             
             # Log completion
             self.logger.info("Post-processing pipeline completed successfully")
@@ -722,8 +319,8 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Post-Processing Pipeline for Automated Queries")
-    parser.add_argument("--date", type=str, help="Target date (YYYY-MM-DD). Defaults to today.")
-    parser.add_argument("--force", action="store_true", help="Force processing even if no recent runs")
+    parser.add_argument("--date", type=str, help="Also recompute this date (YYYY-MM-DD) even if none of its runs changed")
+    parser.add_argument("--force", action="store_true", help="Regenerate the dashboard summary even if no partition was dirty")
     
     args = parser.parse_args()
     
@@ -738,7 +335,7 @@ def main():
     
     # Run pipeline
     pipeline = PostProcessPipeline()
-    success = pipeline.run_post_processing(target_date)
+    success = pipeline.run_post_processing(target_date, force=args.force)
     
     if success:
         print("✅ Post-processing pipeline completed successfully")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of backend startup.
+Runs `python -X importtime -c "import backend.main"` in a fresh interpreter from the repo root and
+reports the total plus the slowest top-level packages (cumulative) and modules (self time), so a new
+eager import of a heavy dependency shows up by name. With --budget-ms it exits non-zero when over.
+"""
+
+import re
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# import time:  self [us] |  cumulative | imported package
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(module: str):
+    """(self_us, cumulative_us, depth, name) per module imported by a cold `import module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            # importtime indents nested imports by two spaces per level, after one separator space
+            entries.append((int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2, m.group(4)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile cold import time of the backend")
+    parser.add_argument("--module", default="backend.main", help="module to import (default: backend.main)")
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    parser.add_argument("--budget-ms", type=float, default=None, help="exit 1 when the total exceeds this")
+    args = parser.parse_args()
+
+    entries = profile(args.module)
+    total_us = sum(entry[0] for entry in entries)
+
+    # Cumulative time of each top-level package, counted where it is entered from another package
+    # (importtime lists children before parents, so walk the entries parents-first)
+    packages = defaultdict(int)
+    stack = []
+    for _, cumulative_us, depth, name in reversed(entries):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        package = name.split(".")[0]
+        if all(package != outer for _, outer in stack):
+            packages[package] += cumulative_us
+        stack.append((depth, package))
+
+    print(f"import {args.module}: {total_us / 1e3:.1f} ms across {len(entries)} modules")
+    print(f"\nTop {args.top} packages (cumulative, including what they import):")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1e3:8.1f} ms  {name}")
+    print(f"\nTop {args.top} modules (self):")
+    for self_us, _, _, name in sorted(entries, key=lambda entry: -entry[0])[:args.top]:
+        print(f"  {self_us / 1e3:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and total_us / 1e3 > args.budget_ms:
+        print(f"\n❌ over budget: {total_us / 1e3:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
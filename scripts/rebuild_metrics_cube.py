@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Metrics Cube Rebuild
+Recomputes metrics_cube / metrics_cube_facets day by day from runs and automated_runs.
+
+Run once after migration 0010 to fold in existing runs, and after any bulk change to run columns
+(e.g. backfill_is_branded.py). New runs are added to the cube as they are written, and
+reextract_runs.py rebuilds the days it touches on its own.
+"""
+
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, select
+
+from app.services.database import SessionLocal
+from app.services.metrics_cube import rebuild_cube
+from app.services.run_children import naive_utc
+from app.models.run import Run
+from app.models.automated_run import AutomatedRun
+
+TABLES = {"runs": Run, "automated_runs": AutomatedRun}
+
+
+def setup_logging() -> logging.Logger:
+    """Setup console logging."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    return logging.getLogger(__name__)
+
+
+def rebuild_table(table: str, since=None, logger: logging.Logger = None) -> int:
+    """Rebuild every day of one table (from `since` if given), committing per day. Returns runs folded."""
+    model = TABLES[table]
+    db = SessionLocal()
+    folded = 0
+    started = time.time()
+    try:
+        first, last = db.execute(select(func.min(model.ts), func.max(model.ts))).one()
+        if first is None:
+            logger.info(f"{table}: no runs")
+            return 0
+        day, last_day = naive_utc(first).date(), naive_utc(last).date()
+        if since and since > day:
+            day = since
+        while day <= last_day:
+            folded += rebuild_cube(db, table, [day])
+            db.commit()
+            day += timedelta(days=1)
+        logger.info(f"{table}: {folded} runs folded in {time.time() - started:.1f}s")
+        return folded
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Rebuild the metrics cube from stored runs")
+    parser.add_argument("--table", choices=["runs", "automated_runs", "all"], default="all", help="Table to rebuild")
+    parser.add_argument("--since", type=str, default=None, help="First day to rebuild (YYYY-MM-DD); defaults to the oldest run")
+
+    args = parser.parse_args()
+    logger = setup_logging()
+
+    since = datetime.strptime(args.since, "%Y-%m-%d").date() if args.since else None
+    tables = list(TABLES) if args.table == "all" else [args.table]
+    for table in tables:
+        rebuild_table(table, since, logger)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Historical Re-extraction Job
+Re-runs extract_competitors, extract_links and to_domains over stored answers after
+COMPETITORS / ALIASES change, and writes the refreshed columns back. Failed runs are skipped:
+their stored text is an error message, not an answer.
+
+Rows are streamed from a server-side cursor in batches, each batch is fanned out across a
+process pool via extract_many, and results are written back with one bulk UPDATE per batch.
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import select, update
+
+from app.services.database import SessionLocal
+from app.services.extract import extract_many
+from app.services.run_children import naive_utc, write_run_children
+from app.services.metrics_cube import SUCCESS_STATUSES, rebuild_cube
+from app.services.url_metadata import enrich_citations
+from app.models.run import Run
+from app.models.automated_run import AutomatedRun
+from app.routes.runs import _normalize_entities
+
+
+def _extreme_rank(vendors: List[Dict[str, Any]]) -> Optional[int]:
+    """Return the 1-based rank of Extreme Networks in the vendor list, if present."""
+    for idx, v in enumerate(vendors, start=1):
+        if (v.get("name") or "").lower() == "extreme networks":
+            return idx
+    return None
+
+
+def _run_values(run_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for a `runs` row (same fields run_single_engine writes)."""
+    vendors = result["vendors"]
+    rank = _extreme_rank(vendors)
+    return {
+        "id": run_id,
+        "vendors": vendors,
+        "links": result["links"],
+        "domains": result["domains"],
+        # Title-less citations for the new links; the old ones described the previous extraction
+        "citations_enriched": enrich_citations(result["links"], max_titles=0),
+        "entities_normalized": _normalize_entities(vendors),
+        "extreme_mentioned": rank is not None,
+        "extreme_rank": rank,
+    }
+
+
+def _automated_run_values(run_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for an `automated_runs` row (mirrors run_automated_queries.py)."""
+    vendors = result["vendors"]
+    names = [(v.get("name") or "").lower() for v in vendors]
+    extreme_mentioned = any("extreme" in n for n in names)
+    return {
+        "id": run_id,
+        "entities_normalized": vendors,
+        "links": result["links"],
+        "domains": result["domains"],
+        "citation_count": len(result["links"]),
+        "domain_count": len(result["domains"]),
+        "extreme_mentioned": extreme_mentioned,
+        "metrics_computed": False,
+        "competitor_mentions": {
+            "extreme_networks": extreme_mentioned,
+            "cisco": any("cisco" in n for n in names),
+            "juniper": any("juniper" in n for n in names),
+            "aruba": any("aruba" in n for n in names),
+        },
+    }
+
+
+# table name -> (model, answer column, row builder)
+TARGETS = {
+    "runs": (Run, Run.raw_excerpt, _run_values),
+    "automated_runs": (AutomatedRun, AutomatedRun.answer_text, _automated_run_values),
+}
+
+
+class ReextractionJob:
+    """Streams stored answers, re-extracts them on a process pool and bulk-writes results."""
+
+    def __init__(self, batch_size: int = 2000, processes: Optional[int] = None, dry_run: bool = False):
+        self.setup_logging()
+        self.batch_size = batch_size
+        self.processes = processes
+        self.dry_run = dry_run
+
+    def setup_logging(self):
+        """Setup console logging."""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[logging.StreamHandler(sys.stdout)]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def reextract_table(self, table: str, pool: ProcessPoolExecutor) -> int:
+        """Re-extract every row of one table. Returns the number of rows updated."""
+        model, text_col, build_values = TARGETS[table]
+
+        # Separate sessions: the reader holds a server-side cursor open while the writer commits per batch
+        read_db = SessionLocal()
+        write_db = SessionLocal()
+        updated = 0
+        touched_days = set()
+        started = time.time()
+        try:
+            stmt = (
+                select(model.id, text_col, model.ts, model.engine)
+                .where(model.status.in_(SUCCESS_STATUSES))
+                .order_by(model.id)
+                .execution_options(yield_per=self.batch_size)
+            )
+            for partition in read_db.execute(stmt).partitions():
+                ids = [row[0] for row in partition]
+                results = extract_many([row[1] for row in partition], executor=pool)
+                values = [build_values(run_id, res) for run_id, res in zip(ids, results)]
+
+                if not self.dry_run:
+                    # ORM bulk UPDATE by primary key: one executemany per batch
+                    write_db.execute(update(model), values)
+                    # Re-derive the normalized citation/entity rows from the refreshed columns and mark the
+                    # runs' daily_metrics partitions dirty
+                    run_keys = {row[0]: {"ts": row[2], "engine": row[3]} for row in partition}
+                    write_run_children(write_db, table, [{**v, **run_keys[v["id"]]} for v in values], replace=True)
+                    write_db.commit()
+                    touched_days.update(naive_utc(key["ts"]).date() for key in run_keys.values())
+
+                updated += len(values)
+                rate = updated / max(time.time() - started, 1e-6)
+                self.logger.info(f"{table}: {updated} rows re-extracted ({rate:.0f} rows/s)")
+
+            if touched_days:
+                # Mentions, citations and leaderboards changed, so recompute the cube days the batches touched
+                folded = rebuild_cube(write_db, table, touched_days)
+                write_db.commit()
+                self.logger.info(f"{table}: metrics cube rebuilt for {len(touched_days)} days ({folded} runs)")
+        except Exception as e:
+            write_db.rollback()
+            self.logger.error(f"Re-extraction of {table} failed after {updated} rows: {e}")
+            raise
+        finally:
+            read_db.close()
+            write_db.close()
+
+        return updated
+
+    def run(self, tables: List[str]) -> int:
+        """Main execution method."""
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            for table in tables:
+                self.logger.info(f"Starting re-extraction of {table}{' (dry run)' if self.dry_run else ''}")
+                count = self.reextract_table(table, pool)
+                self.logger.info(f"Finished {table}: {count} rows")
+        return 0
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Re-extract vendors, links and domains for stored runs")
+    parser.add_argument("--table", choices=["runs", "automated_runs", "all"], default="all", help="Table to re-extract")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Rows per streamed batch / bulk update")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Extract without writing results")
+
+    args = parser.parse_args()
+
+    tables = list(TARGETS) if args.table == "all" else [args.table]
+    job = ReextractionJob(batch_size=args.batch_size, processes=args.processes, dry_run=args.dry_run)
+    return job.run(tables)
+
+
+if __name__ == "__main__":
+    exit(main())
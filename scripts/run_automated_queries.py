@@ -19,6 +19,7 @@ from app.services.engines import call_engine
 from app.services.extract import extract_competitors, extract_links, to_domains
 from app.services.database import get_db
 from app.models.automated_run import AutomatedRun
+from app.services.run_children import write_run_children
 from app.services.pricing import estimate_cost
 
 class AutomatedQueryExecutor:
@@ -215,10 +216,7 @@ class AutomatedQueryExecutor:
                 result = self.execute_single_query(query_text, engine_key, intent_category)
                 if result:
                     all_results.append(result)
-                
-                # Small delay between queries to avoid rate limits
-                import time
-                time.sleep(1)
+                # No fixed delay: call_engine paces each provider through the shared rate limiter
         
         return all_results
     
@@ -238,6 +236,9 @@ class AutomatedQueryExecutor:
                 # Add to database
                 self.db.add(automated_run)
             
+            # Normalized citation/entity rows for indexed leaderboards
+            write_run_children(self.db, "automated_runs", results)
+            
             # Commit all changes
             self.db.commit()
             print(f"✅ Successfully saved {len(results)} automated runs to database")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQL-side dashboard aggregations.
+The statements need Postgres JSON functions, so a recording session stands in for the database here;
+these checks cover the generated SQL, bound parameters and response shaping. Set EGT_TEST_DATABASE_URL
+to a scratch Postgres database to also run the SQL itself (in a rolled-back transaction).
+"""
+
+import os
+import sys
+import uuid
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models.automated_run import AutomatedRun
+from app.services.aggregations import automated_engine_clause, domain_leaderboard, entity_leaderboard, extreme_trends_by_day
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+    def one(self):
+        return self._rows[0]
+
+
+class _RecordingSession:
+    """Returns the given row lists in order, one per execute call."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def execute(self, stmt, params=None):
+        self.calls.append((str(stmt), params or {}))
+        return _Result(self.results[min(len(self.calls), len(self.results)) - 1])
+
+
+def test_engine_clause():
+    """openai also matches legacy gpt-* engine values; other engines bind exactly."""
+    assert automated_engine_clause(None) == ("", {})
+    sql, params = automated_engine_clause("openai")
+    assert "gpt%" in sql and params == {}
+    assert automated_engine_clause("perplexity") == ("AND engine = :engine", {"engine": "perplexity"})
+
+
+def test_extreme_trends_grouped_in_sql():
+    """Grouping, citation counting and domain matching happen in one statement; Python only shapes rows."""
+    db = _RecordingSession([
+        {"day": datetime(2025, 9, 1), "runs_count": 3, "total_cost": 0.12, "total_citations": 9, "extreme_citations": 2},
+        {"day": datetime(2025, 9, 2), "runs_count": 1, "total_cost": 0, "total_citations": 0, "extreme_citations": 0},
+    ])
+    start = datetime(2025, 8, 1)
+    trends = extreme_trends_by_day(db, start, engine="perplexity")
+
+    sql, params = db.calls[0]
+    assert len(db.calls) == 1
+    assert "GROUP BY day" in sql and "date_trunc('day', ts)" in sql
+    assert "json_array_elements" in sql and "extremenetworks.com" in sql
+    assert "answer_text" not in sql
+    assert params == {"start_ts": start, "engine": "perplexity"}
+    assert trends == [
+        {"date": "2025-09-01", "runs_count": 3, "total_cost": 0.12, "total_citations": 9, "extreme_citations": 2},
+        {"date": "2025-09-02", "runs_count": 1, "total_cost": 0.0, "total_citations": 0, "extreme_citations": 0},
+    ]
+
+
+def test_leaderboards_use_child_tables():
+    """Domain and entity leaderboards aggregate run_citations / run_entities joined to automated_runs by id."""
+    db = _RecordingSession([
+        {"domain": "extremenetworks.com", "citations": 4, "unique_urls": 3, "runs": 2, "total_domains": 7,
+         "queries": ["best wifi"], "urls": ["https://extremenetworks.com/a"]},
+    ])
+    start = datetime(2025, 8, 1)
+    board = domain_leaderboard(db, limit=5, collapse_brand=True, rank_by="unique_urls", with_details=True,
+                               start_ts=start, engine="openai", is_branded=False, extreme_only=True)
+
+    sql, params = db.calls[0]
+    assert "FROM run_citations c JOIN automated_runs ar ON ar.id = c.run_id" in sql
+    assert "c.is_brand_domain" in sql and "ORDER BY unique_urls DESC" in sql
+    assert "ar.extreme_mentioned = true" in sql and "ar.engine LIKE 'gpt%'" in sql
+    assert params == {"start_ts": start, "is_branded": False, "limit": 5}
+    assert board == {"total_domains": 7, "items": [
+        {"domain": "extremenetworks.com", "citations": 4, "unique_urls": 3, "runs": 2,
+         "queries": ["best wifi"], "urls": ["https://extremenetworks.com/a"]},
+    ]}
+
+    db = _RecordingSession(
+        [{"unique_entities": 2, "total_mentions": 3, "runs_with_entities": 2}],
+        [{"name": "Cisco", "mentions": 2, "avg_rank": 1.5}, {"name": "Extreme Networks", "mentions": 1, "avg_rank": 2}],
+    )
+    board = entity_leaderboard(db, start_ts=start, engine="perplexity", exact_engine=True)
+    assert all("FROM run_entities c" in sql for sql, _ in db.calls)
+    assert db.calls[1][1] == {"start_ts": start, "engine": "perplexity", "limit": 15}
+    assert board == {"unique_entities": 2, "total_mentions": 3, "runs_with_entities": 2, "items": [
+        {"name": "Cisco", "mentions": 2, "avg_rank": 1.5},
+        {"name": "Extreme Networks", "mentions": 1, "avg_rank": 2.0},
+    ]}
+
+
+def _migration(name):
+    path = backend_dir / "alembic" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.skipif(not os.getenv("EGT_TEST_DATABASE_URL"), reason="EGT_TEST_DATABASE_URL not set")
+def test_malformed_legacy_links_do_not_fail_postgres_aggregates():
+    """Against Postgres: legacy string links are parsed, malformed ones count as no links."""
+    engine = create_engine(os.environ["EGT_TEST_DATABASE_URL"])
+    schema = f"egt_test_{uuid.uuid4().hex[:8]}"
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(f"SET search_path TO {schema}"))
+        try:
+            conn.exec_driver_sql(_migration("0016_create_links_array_function").LINKS_ARRAY_FUNCTION)
+            AutomatedRun.__table__.create(conn)
+            base = {"ts": datetime(2025, 9, 1, 12), "query": "q", "engine": "perplexity", "model": "sonar",
+                    "is_branded": False, "extreme_mentioned": True, "cost_usd": 0.01}
+            for run_id, links in (
+                ("array", ["https://extremenetworks.com/a", "https://cisco.com/a"]),
+                ("legacy", '["https://www.extremenetworks.com/b"]'),
+                ("malformed", '["https://cisco.com/c", '),
+                ("not-a-list", "https://cisco.com/d"),
+                ("null", None),
+            ):
+                conn.execute(AutomatedRun.__table__.insert().values(id=run_id, links=links, **base))
+            trends = extreme_trends_by_day(Session(bind=conn), datetime(2025, 9, 1), engine="perplexity")
+        finally:
+            # Schema, function and rows were created in this one transaction
+            conn.rollback()
+    assert len(trends) == 1
+    assert trends[0]["runs_count"] == 5 and trends[0]["total_cost"] == pytest.approx(0.05)
+    assert (trends[0]["total_citations"], trends[0]["extreme_citations"]) == (3, 2)
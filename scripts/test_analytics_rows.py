@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the column-projected analytics row layer.
+Runs against an in-memory SQLite database.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.automated_run import AutomatedRun
+from app.services.analytics_rows import iter_rows, merged_columns, row_columns, select_rows
+from _sqlite_testdb import sqlite_engine
+
+
+def _session():
+    engine = sqlite_engine(AutomatedRun)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = sessionmaker(bind=engine, future=True)()
+    for i in range(3):
+        db.add(AutomatedRun(id=f"r{i}", ts=datetime(2025, 9, 1 + i), query="q", engine="openai", model="m",
+                            answer_text="long answer " * 500, cost_usd=0.5, extreme_mentioned=i == 1))
+    db.commit()
+    db.expunge_all()
+    return db, statements
+
+
+def test_rows_carry_only_the_declared_columns():
+    db, statements = _session()
+    statements.clear()
+
+    rows = list(iter_rows(db, select_rows(AutomatedRun, ("ts", "cost_usd", "extreme_mentioned")).order_by(AutomatedRun.ts), batch=2))
+    assert [(row.cost_usd, row.extreme_mentioned) for row in rows] == [(0.5, False), (0.5, True), (0.5, False)]
+    assert rows[0]._fields == ("ts", "cost_usd", "extreme_mentioned")
+    assert "answer_text" not in statements[0] and "links" not in statements[0]
+    # Plain rows, never ORM objects in the session
+    assert not db.identity_map
+
+
+def test_large_text_is_deferred_unless_named():
+    default = [column.key for column in row_columns(AutomatedRun)]
+    assert "answer_text" not in default and "links" in default
+    assert [column.key for column in row_columns(AutomatedRun, ("id", "answer_text"))] == ["id", "answer_text"]
+    assert merged_columns(("id", "ts"), ("ts", "answer_text")) == ("id", "ts", "answer_text")
+
+    with pytest.raises(ValueError):
+        row_columns(AutomatedRun, ("missing",))
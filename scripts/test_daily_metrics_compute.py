@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for MetricsService.compute_daily_metrics.
+Runs against an in-memory SQLite database; JSONB columns are rendered as SQLite JSON.
+"""
+
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+
+from app.models.run import Run
+from app.services.metrics import MetricsService, citation_quality
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def _citation(domain, rank, title=""):
+    return {"domain": domain, "url": f"https://{domain}/x", "title": title, "rank": rank}
+
+
+def test_citations_scored_once_and_shared_across_contexts(monkeypatch):
+    db = sqlite_sessionmaker(Run)()
+    ts = datetime(2025, 9, 1, 12, tzinfo=timezone.utc)
+    db.add_all([
+        Run(id="r1", ts=ts, engine="openai", query="q", status="ok", extreme_mentioned=True, citations_enriched=[
+            _citation("b.com", 1, "A meaningful page title"), _citation("a.org", 2), _citation("", 3),
+        ]),
+        Run(id="r2", ts=ts, engine="openai", query="q", status="ok", entities_normalized=[{"name": "Cisco"}], citations_enriched=[
+            _citation("a.org", 12), _citation("b.com", 7), _citation("c.io", 1),
+        ]),
+    ])
+    db.commit()
+
+    calls = []
+    monkeypatch.setattr(MetricsService, "_calculate_citation_quality", lambda self, c: calls.append(c) or citation_quality(c))
+    metrics = MetricsService(db).compute_daily_metrics(date(2025, 9, 1))
+
+    assert [m.brand_context for m in metrics] == ["overall", "extreme_networks", "competitors"]
+    assert len(calls) == 6
+    overall = metrics[0]
+    assert (overall.total_citations, overall.unique_domains, overall.high_quality_citations) == (6, 3, 1)
+    # Count ties keep first-seen order; quality is each domain's mean score
+    assert overall.top_domains == [
+        {"domain": "b.com", "count": 2, "quality_score": 0.65},
+        {"domain": "a.org", "count": 2, "quality_score": 0.6},
+        {"domain": "c.io", "count": 1, "quality_score": 0.3},
+    ]
+    assert all(m.top_domains == overall.top_domains for m in metrics)
+    assert (metrics[1].share_of_voice_pct, metrics[2].share_of_voice_pct) == (50.0, 50.0)
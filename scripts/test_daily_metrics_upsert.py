@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for the batched daily_metrics upsert.
+Runs against an in-memory SQLite database (INSERT ... ON CONFLICT compiles there too); JSONB renders as JSON.
+"""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.data_version import DataVersion
+from app.models.metrics import DailyMetrics
+from app.services.metrics import MetricsService
+from _sqlite_testdb import sqlite_engine
+
+
+def _metric(day, context="overall", **overrides):
+    values = {"date": day, "engine": "openai", "brand_context": context, "total_runs": 1, "last_updated": "t0"}
+    values.update(overrides)
+    return DailyMetrics(**values)
+
+
+def test_upsert_inserts_then_updates_in_batches():
+    engine = sqlite_engine(DailyMetrics, DataVersion)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = sessionmaker(bind=engine, future=True)()
+    service = MetricsService(db)
+    start = date(2022, 1, 1)
+
+    # A multi-year backfill streamed from a generator
+    assert service.upsert_daily_metrics((_metric(start + timedelta(days=i)) for i in range(1000)), batch_size=300) == 1000
+    assert len([s for s in statements if s.startswith("INSERT INTO daily_metrics")]) == 4
+    assert not db.new and not db.identity_map
+    row = db.get(DailyMetrics, (start, "openai", "overall", "runs"))
+    assert (row.top_domains, row.data_version, row.share_of_voice_pct) == ([], "1.0", 0)
+    db.expunge_all()
+
+    # Existing keys are updated in place; a key repeated within a batch keeps its last value
+    updates = [_metric(start, total_runs=5, last_updated="t1"), _metric(start, total_runs=7, last_updated="t2"), _metric(start, "competitors")]
+    assert service.upsert_daily_metrics(updates) == 2
+    assert db.scalar(select(func.count()).select_from(DailyMetrics)) == 1001
+    row = db.get(DailyMetrics, (start, "openai", "overall", "runs"))
+    assert (row.total_runs, row.last_updated) == (7, "t2")
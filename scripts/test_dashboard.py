@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-scan /metrics/dashboard endpoint.
+Runs against an in-memory SQLite database; JSONB columns are rendered as SQLite JSON.
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.automated_run import AutomatedRun
+from app.models.data_version import DataVersion
+from app.routes.metrics import router
+from app.services import metrics_cache
+from app.services.dashboard import build_dashboard
+from app.services.database import get_db
+from app.services.metrics_cache import MetricsResponseCache
+from _sqlite_testdb import sqlite_engine
+
+
+def _run(run_id, day, query, engine="gpt-4o", **overrides):
+    run = {
+        "id": run_id,
+        "ts": datetime(2025, 9, day, 12),
+        "query": query,
+        "engine": engine,
+        "model": "m",
+        "status": "completed",
+        "answer_text": "Extreme Networks and Cisco both sell campus switches.",
+        "links": ["https://www.extremenetworks.com/a", "https://cisco.com/b"],
+        "entities_normalized": [{"name": "Campus Switch", "type": "product"}],
+        "extreme_mentioned": True,
+        "citation_count": 2,
+        "cost_usd": 0.01,
+        "latency_ms": 1000,
+        "intent_category": "informational",
+        "is_branded": False,
+    }
+    run.update(overrides)
+    return AutomatedRun(**run)
+
+
+def _engine():
+    engine = sqlite_engine(AutomatedRun, DataVersion, shared=True)
+    Session = sessionmaker(bind=engine, future=True)
+    db = Session()
+    db.add_all([
+        _run("a", 1, "best campus switch"),
+        _run("b", 8, "best wifi 7 access point", extreme_mentioned=False, answer_text="Aruba leads.", links=["https://aruba.com/x"], citation_count=1, latency_ms=3000),
+        _run("c", 9, "cisco vs extreme", is_branded=True, status="error", cost_usd=0, latency_ms=None),
+        _run("d", 9, "best campus switch", engine="perplexity"),
+        _run("outside", 20, "best campus switch"),
+    ])
+    db.commit()
+    db.close()
+    return engine, Session
+
+
+def test_dashboard_panels_from_one_scan():
+    engine, Session = _engine()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    dashboard = build_dashboard(Session(), date(2025, 9, 1), date(2025, 9, 10), "openai")
+    assert [s for s in statements if "FROM automated_runs" in s] == statements and len(statements) == 1
+    # Only the projected columns are read
+    assert "competitor_set" not in statements[0]
+
+    panels = dashboard["panels"]
+    assert dashboard["total_runs_analyzed"] == 3
+    assert panels["ai_search_visibility"]["total_mentions"] == 1
+    assert panels["ai_search_visibility"]["branded_queries_excluded"] == 1
+    assert panels["coverage_gaps"]["total_gaps"] == 1 and panels["coverage_gaps"]["branded_queries_filtered"] == 1
+    assert panels["answer_positioning"]["intent_breakdown"]["comparison"] == 1
+    assert panels["entity_associations"]["product_associations"] == {"campus switch": 2}
+    assert panels["citations"]["total_citations"] == 5 and panels["citations"]["extreme_domain_citations"] == 2
+    assert {d["domain"]: d["count"] for d in panels["citations"]["top_domains"]}["cisco.com"] == 2
+    assert (panels["cost"]["failed_runs"], panels["cost"]["avg_cost_per_query"]) == (1, 0.01)
+    assert (panels["latency"]["runs_with_latency"], panels["latency"]["p95_response_time"]) == (2, 3.0)
+    assert set(panels["visibility_trends"]["weekly"]["data"]) == {"2025-09-01", "2025-09-08"}
+
+
+def _client(Session, monkeypatch):
+    monkeypatch.setattr(metrics_cache, "_cache", MetricsResponseCache(ttl_s=600, max_stale_s=3600))
+    monkeypatch.setattr(metrics_cache, "SessionLocal", Session)
+    app = FastAPI()
+    app.include_router(router)
+
+    def session_dependency():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = session_dependency
+    return TestClient(app)
+
+
+def test_dashboard_endpoint_validates_window(monkeypatch):
+    _, Session = _engine()
+    client = _client(Session, monkeypatch)
+
+    response = client.get("/metrics/dashboard", params={"start_date": "2025-09-01", "end_date": "2025-09-30"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total_runs_analyzed"], body["filters"]) == (5, {"engine": None})
+    assert body["panels"]["cost"]["by_engine"]["Perplexity"]["runs"] == 1
+
+    assert client.get("/metrics/dashboard", params={"start_date": "2025-09-30", "end_date": "2025-09-01"}).status_code == 400
+    assert client.get("/metrics/dashboard", params={"start_date": "2024-01-01", "end_date": "2025-09-01"}).status_code == 400
+
+
+def test_branded_runs_are_the_same_in_every_panel(monkeypatch):
+    """Visibility and coverage gaps both classify by query text, even where the stored is_branded flag disagrees."""
+    _, Session = _engine()
+    with Session() as db:
+        db.add_all([
+            _run("intent-generic", 2, "cisco campus market share", is_branded=False),
+            _run("intent-branded", 2, "best stadium wifi", is_branded=True, extreme_mentioned=False, answer_text="Aruba leads."),
+        ])
+        db.commit()
+    params = {"start_date": "2025-09-01", "end_date": "2025-09-10", "engine": "gpt"}
+
+    focus = _client(Session, monkeypatch).get("/metrics/extreme-focus", params=params).json()["metrics"]
+    dashboard = build_dashboard(Session(), date(2025, 9, 1), date(2025, 9, 10), "gpt")["panels"]
+    for panels in (focus, dashboard):
+        assert panels["ai_search_visibility"]["branded_queries_excluded"] == 2
+        assert panels["coverage_gaps"]["branded_queries_filtered"] == 2
+        assert panels["ai_search_visibility"]["neutral_queries_analyzed"] == panels["coverage_gaps"]["total_queries_analyzed"] == 3
+        # The Cisco query's mention is not counted as neutral visibility
+        assert panels["ai_search_visibility"]["total_mentions"] == 1
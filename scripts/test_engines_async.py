@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio engine layer.
+Checks that /query/run fans engines out concurrently and isolates per-engine failures.
+Provider adapters and persistence are replaced with local stand-ins, so no API keys or database are needed.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.schemas.query_schemas import QueryRequest
+from app.services import engines, response_cache, run_query
+
+
+def _patch(monkeypatch, openai_delay, pplx_delay, pplx_error=None):
+    """Swap adapters for sleeps and persistence for in-memory results."""
+    async def fake_openai(prompt, model=None, max_output_tokens=500, temperature=None):
+        await asyncio.sleep(openai_delay)
+        return {"text": "Cisco and Extreme Networks", "model": "gpt-test", "usage": {}}
+
+    async def fake_pplx(prompt, temperature=0.2, model="sonar", timeout=None):
+        await asyncio.sleep(pplx_delay)
+        if pplx_error:
+            raise pplx_error
+        return {"choices": [{"message": {"content": "Arista"}}], "model": "sonar", "usage": {}}
+
+    # Every call must reach the stand-in adapters
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setenv("EGT_RESPONSE_CACHE_BACKEND", "off")
+    monkeypatch.setattr(engines.openai_adapter, "run_query_async", fake_openai)
+    monkeypatch.setattr(engines.perplexity_adapter, "run_query_async", fake_pplx)
+    monkeypatch.setattr(run_query, "_finish_run", lambda req, eng, ts, norm: (eng, "ok", norm.get("text")))
+    monkeypatch.setattr(run_query, "run_single_engine_error", lambda req, eng, ts, exc: (eng, "error", type(exc).__name__))
+
+
+def _request():
+    return QueryRequest(query="best campus switches", engines=["openai", "perplexity"])
+
+
+def test_engines_run_concurrently(monkeypatch):
+    """Total wall time tracks the slowest engine, not the sum."""
+    _patch(monkeypatch, openai_delay=0.3, pplx_delay=0.3)
+    start = time.perf_counter()
+    runs = asyncio.run(run_query.run_engines(_request(), "2025-01-01T00:00:00Z"))
+    elapsed = time.perf_counter() - start
+    print(f"Two 0.3s engines took {elapsed:.2f}s")
+    assert [r[:2] for r in runs] == [("openai", "ok"), ("perplexity", "ok")]
+    assert elapsed < 0.5
+
+
+def test_failures_and_timeouts_are_isolated(monkeypatch):
+    """One engine erroring or timing out does not affect the other."""
+    _patch(monkeypatch, openai_delay=0.0, pplx_delay=0.0, pplx_error=RuntimeError("boom"))
+    runs = asyncio.run(run_query.run_engines(_request(), "2025-01-01T00:00:00Z"))
+    assert runs[0][:2] == ("openai", "ok")
+    assert runs[1] == ("perplexity", "error", "RuntimeError")
+
+    _patch(monkeypatch, openai_delay=0.0, pplx_delay=1.0)
+    monkeypatch.setitem(engines.ENGINE_TIMEOUTS, "perplexity", 0.1)
+    runs = asyncio.run(run_query.run_engines(_request(), "2025-01-01T00:00:00Z"))
+    assert runs[0][1] == "ok"
+    assert runs[1][:2] == ("perplexity", "error")
+
+
+def test_timeout_covers_retries(monkeypatch):
+    """The engine budget bounds the whole call, not each retried attempt."""
+    class APITimeoutError(Exception):
+        pass
+
+    calls = []
+
+    async def flaky_pplx(prompt, temperature=0.2, model="sonar", timeout=None):
+        calls.append(time.perf_counter())
+        await asyncio.sleep(0.15)
+        raise APITimeoutError("read timed out")
+
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setenv("EGT_RESPONSE_CACHE_BACKEND", "off")
+    monkeypatch.setattr(engines.perplexity_adapter, "run_query_async", flaky_pplx)
+    start = time.perf_counter()
+    try:
+        asyncio.run(engines.call_engine_async("perplexity", "q", 0.2, model="sonar-timeout-test", timeout=0.4))
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise AssertionError("expected the engine budget to expire")
+    elapsed = time.perf_counter() - start
+    print(f"{len(calls)} attempts in {elapsed:.2f}s")
+    assert elapsed < 0.6
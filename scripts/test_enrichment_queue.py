@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for background run enrichment.
+GET /runs/{id} goes through FastAPI's TestClient against an in-memory SQLite database; title
+fetches go to a slow httpx MockTransport. JSONB columns are rendered as SQLite JSON.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.data_version import DataVersion
+from app.models.metrics import DailyMetrics
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.metrics_dirty import DirtyMetricsPartition
+from app.models.run import Run
+from app.models.run_citation import RunCitation
+from app.models.run_entity import RunEntity
+from app.models.url_metadata import UrlMetadata
+from app.routes.runs import router
+from app.services import enrichment_queue, query_scheduler, url_metadata
+from app.services.database import get_db
+from app.services.dirty_metrics import pending_partitions, process_dirty_partitions
+from app.services.enrichment_queue import EnrichmentQueue, enrich_run
+from app.services.metrics_cache import data_version
+from app.services.metrics_cube import cube_rollup
+from _sqlite_testdb import sqlite_sessionmaker
+
+FETCH_DELAY_S = 0.5
+
+
+def _client(monkeypatch):
+    Session = sqlite_sessionmaker(Run, UrlMetadata, MetricsCube, MetricsCubeFacet, DirtyMetricsPartition, DataVersion,
+                                  shared=True, autoflush=False)
+    db = Session()
+    db.add(Run(id="r1", ts=datetime(2025, 9, 1, tzinfo=timezone.utc), engine="openai", query="q", status="ok",
+               links=["https://site.com/a", "https://www.site.com/b?utm_source=x"], vendors=[{"name": "Cisco"}]))
+    db.add(Run(id="r2", ts=datetime(2025, 9, 1, tzinfo=timezone.utc), engine="openai", query="q", status="ok"))
+    db.commit()
+    db.close()
+
+    async def slow_site(request):
+        await asyncio.sleep(FETCH_DELAY_S)
+        return httpx.Response(200, html=f"<title>Page {request.url.path}</title>")
+
+    monkeypatch.setattr(url_metadata, "_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(slow_site)))
+    queue = EnrichmentQueue(worker=lambda run_id: enrich_run(run_id, Session), workers=2)
+    monkeypatch.setattr(enrichment_queue, "_queue", queue)
+
+    app = FastAPI()
+    app.include_router(router)
+
+    def session_dependency():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = session_dependency
+    return TestClient(app), Session, queue
+
+
+def test_run_detail_returns_before_titles_are_fetched(monkeypatch):
+    client, Session, queue = _client(monkeypatch)
+
+    started = time.perf_counter()
+    detail = client.get("/runs/r1").json()
+    assert time.perf_counter() - started < FETCH_DELAY_S
+    assert detail["enrichment_pending"] is True
+    assert [(c["url"], c["title"]) for c in detail["citations"]] == [("https://site.com/a", None), ("https://site.com/b", None)]
+    assert detail["entities"][0]["name"] == "Cisco"
+
+    # Polling while the worker runs does not queue the run again
+    assert client.get("/runs/r1/enrichment").json()["enrichment_pending"] is True
+    queue.close()
+    assert queue.stats()["submitted"] == 1 and queue.stats()["completed"] == 1
+
+    polled = client.get("/runs/r1/enrichment").json()
+    assert polled["enrichment_pending"] is False
+    assert [c["title"] for c in polled["citations"]] == ["Page /a", "Page /b"]
+    row = Session().get(Run, "r1")
+    assert row.citations_enriched[1]["title"] == "Page /b" and row.entities_normalized[0]["name"] == "Cisco"
+
+
+def test_runs_without_links_are_never_pending(monkeypatch):
+    client, _, queue = _client(monkeypatch)
+    detail = client.get("/runs/r2").json()
+    assert (detail["enrichment_pending"], detail["citations"], detail["entities"]) == (False, [], [])
+    assert queue.stats()["submitted"] == 0
+    assert client.get("/runs/missing/enrichment").status_code == 404
+
+
+def test_enriching_a_scheduled_run_refreshes_cube_and_daily_metrics(monkeypatch):
+    """Scheduled runs are stored without citations_enriched; enrichment must update what was counted as zero."""
+    Session = sqlite_sessionmaker(Run, RunCitation, RunEntity, UrlMetadata, MetricsCube, MetricsCubeFacet,
+                                  DirtyMetricsPartition, DailyMetrics, DataVersion, autoflush=False)
+    monkeypatch.setattr(query_scheduler, "call_engine", lambda **kwargs: {
+        "text": "Extreme Networks and Cisco, see https://site.com/a", "latency_ms": 900, "cost_usd": 0.01,
+    })
+    monkeypatch.setattr(url_metadata, "_client", lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, html="<title>A meaningful page title</title>"))
+    ))
+    scheduler = query_scheduler.QueryScheduler()
+    run = scheduler._execute_query({"query": "best campus wifi", "engine": "openai", "intent": "generic_intent"})
+    db = Session()
+    scheduler._persist_batch(db, [(0, run)], [{"run_id": run["id"]}])
+    process_dirty_partitions(db)
+
+    day = run["ts"].date()
+    scope = {"run_source": "runs", "start_day": day, "end_day": day}
+    metrics_key = (day, "openai", "overall", "runs")
+    assert cube_rollup(db, **scope)[0]["scored_citations"] == 0
+    assert db.get(DailyMetrics, metrics_key).total_citations == 0
+    version = data_version(db)
+    db.close()
+
+    assert enrich_run(run["id"], Session) is True
+
+    db = Session()
+    totals = cube_rollup(db, **scope)[0]
+    assert totals["runs"] == 1 and totals["scored_citations"] == 1 and totals["quality_sum"] > 0
+    assert pending_partitions(db) == 1 and data_version(db) > version
+    process_dirty_partitions(db)
+    metrics = db.get(DailyMetrics, metrics_key)
+    assert metrics.total_citations == 1 and metrics.avg_visibility_score > 0
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for entity extraction.
+Checks the single-pass vendor matcher against known answers.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services import extract
+from app.services.extract import (
+    IncrementalExtractor,
+    extract_all,
+    extract_competitors,
+    extract_links,
+    extract_many,
+    get_vendor_matcher,
+)
+
+
+def _names(text):
+    return [(v.name, v.first_pos) for v in extract_competitors(text)]
+
+
+def test_aliases_and_overlaps():
+    """Aliases map to canonical names and overlapping mentions are all found."""
+    text = "HPE Aruba and Cisco Meraki lead; Mist Systems follows."
+    found = _names(text)
+    print(f"Found: {found}")
+    assert found == [("HPE", 0), ("Aruba", 0), ("Cisco", 14), ("Juniper", 33)]
+
+
+def test_earliest_position_wins():
+    """A vendor mentioned at offset 0 keeps its earliest position."""
+    found = _names("Cisco Systems, then meraki again")
+    assert found == [("Cisco", 0)]
+
+
+def test_word_boundaries():
+    """Terms inside longer words are not matched."""
+    assert _names("ciscoware and the sale of palo altos") == []
+    assert _names("") == []
+
+
+def test_matcher_rebuilds_on_alias_change():
+    """Adding an alias rebuilds the shared matcher once."""
+    before = get_vendor_matcher()
+    assert get_vendor_matcher() is before
+    extract.ALIASES["egt test vendor"] = "Cisco"
+    try:
+        assert _names("EGT Test Vendor") == [("Cisco", 0)]
+        assert get_vendor_matcher() is not before
+    finally:
+        del extract.ALIASES["egt test vendor"]
+
+
+def test_extract_many_matches_single():
+    """Pool fan-out returns the same results, in order, as per-text extraction."""
+    texts = [f"Answer {i}: Cisco vs Arista, see https://www.cisco.com/x{i}." for i in range(40)] + ["", None]
+    expected = [extract_all(t or "") for t in texts]
+    assert extract_many(texts, processes=1) == expected
+    assert extract_many(texts, processes=2, chunksize=4) == expected
+    assert expected[0]["domains"] == ["cisco.com"]
+
+
+def test_incremental_matches_full_text():
+    """Streaming in small chunks (matches straddling chunk edges) gives the same final result."""
+    text = "Leaders: HPE Aruba, Cisco Meraki and Extreme Networks. See https://www.extremenetworks.com/wifi and [doc](https://docs.example.org/a)."
+    for size in (1, 3, 7, 50):
+        inc = IncrementalExtractor()
+        seen_vendors, seen_links = [], []
+        for i in range(0, len(text), size):
+            vendors, links = inc.feed(text[i:i + size])
+            seen_vendors += vendors
+            seen_links += links
+        vendors, links = inc.finish()
+        seen_vendors += vendors
+        seen_links += links
+
+        assert [(v.name, v.first_pos) for v in inc.vendors] == _names(text)
+        assert inc.links == extract_links(text)
+        assert sorted(v.name for v in seen_vendors) == sorted(v.name for v in inc.vendors)
+        assert sorted(seen_links) == sorted(inc.links)
+
+
+if __name__ == "__main__":
+    test_aliases_and_overlaps()
+    test_earliest_position_wins()
+    test_word_boundaries()
+    test_matcher_rebuilds_on_alias_change()
+    test_extract_many_matches_single()
+    test_incremental_matches_full_text()
+    print("✅ All extraction tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled provider HTTP clients.
+Sends several requests through the shared client to a local keep-alive server and checks
+that they reuse one connection and that reuse is reported in the pool stats.
+"""
+
+import sys
+import asyncio
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services import http_clients
+from app.services.http_clients import close_http_clients, get_async_http_client, get_http_client, get_pool_stats
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_sync_client_is_shared_and_reused(monkeypatch):
+    """Five calls through the registry open a single connection."""
+    monkeypatch.setitem(http_clients._stats, "openai", http_clients.ConnectionStats())
+    server, url = _serve()
+    try:
+        client = get_http_client("openai")
+        assert get_http_client("openai") is client
+        for _ in range(5):
+            assert client.get(url).status_code == 200
+        stats = get_pool_stats()["providers"]["openai"]
+        print(f"Pool stats: {stats}")
+        assert stats["requests"] == 5
+        assert stats["new_connections"] == 1
+        assert stats["reuse_rate"] == 0.8
+    finally:
+        asyncio.run(close_http_clients())
+        server.shutdown()
+    assert get_http_client("openai") is not client
+
+
+def test_async_client_is_reused_per_loop(monkeypatch):
+    """The async client is shared within an event loop and reuses its connection."""
+    monkeypatch.setitem(http_clients._stats, "perplexity", http_clients.ConnectionStats())
+    server, url = _serve()
+
+    async def main():
+        client = get_async_http_client("perplexity")
+        assert get_async_http_client("perplexity") is client
+        for _ in range(3):
+            assert (await client.get(url)).status_code == 200
+        await close_http_clients()
+
+    try:
+        asyncio.run(main())
+        stats = get_pool_stats()["providers"]["perplexity"]
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_async_client_of_a_finished_loop_is_closed(monkeypatch):
+    """Moving to a new event loop closes the previous loop's client instead of leaking its pool."""
+    monkeypatch.setitem(http_clients._stats, "perplexity", http_clients.ConnectionStats())
+    server, url = _serve()
+
+    async def first():
+        client = get_async_http_client("perplexity")
+        assert (await client.get(url)).status_code == 200
+        return client
+
+    async def second(old):
+        client = get_async_http_client("perplexity")
+        assert client is not old
+        await close_http_clients()
+        return client
+
+    try:
+        old = asyncio.run(first())
+        assert not old.is_closed
+        new = asyncio.run(second(old))
+        assert old.is_closed and new.is_closed
+    finally:
+        server.shutdown()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for the scheduled-batch job queue.
+Runs against an in-memory SQLite database (FOR UPDATE SKIP LOCKED is a no-op there),
+so claiming, leases, retries and resume can be checked without Postgres or API keys.
+"""
+
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import Column, String, create_engine, select, update
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.query_job import QueryJob
+from app.models.run_citation import RunCitation
+from app.models.run_entity import RunEntity
+from app.services import job_queue, query_scheduler
+from app.services.job_queue import batch_progress, claim_jobs, find_unfinished_batch, mark_done, mark_failed, materialize_plan
+from app.services.query_scheduler import QueryScheduler
+
+BATCH = date(2025, 9, 1)
+PLAN = [{"query": f"query {i}", "engine": "openai" if i % 2 else "perplexity", "model": None, "intent": "generic_intent"} for i in range(6)]
+
+_TestBase = declarative_base()
+
+
+class _StubRun(_TestBase):
+    """Stands in for runs (JSONB columns do not exist in SQLite)."""
+    __tablename__ = "runs_stub"
+    id = Column(String, primary_key=True)
+
+    def __init__(self, **row):
+        self.id = row["id"]
+
+
+def _session_factory(url: str = "sqlite://"):
+    if url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        # Workers in separate threads need their own connections
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+    QueryJob.__table__.create(engine)
+    RunCitation.__table__.create(engine)
+    RunEntity.__table__.create(engine)
+    MetricsCube.__table__.create(engine)
+    MetricsCubeFacet.__table__.create(engine)
+    _TestBase.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, future=True)
+
+
+def test_materialize_is_idempotent():
+    Session = _session_factory()
+    db = Session()
+    assert materialize_plan(db, BATCH, PLAN) == 6
+    assert materialize_plan(db, BATCH, list(reversed(PLAN))) == 6
+    assert [j.query for j in db.scalars(select(QueryJob).order_by(QueryJob.seq))] == [q["query"] for q in PLAN]
+
+
+def test_claims_do_not_overlap_and_expired_leases_are_reclaimed():
+    Session = _session_factory()
+    db = Session()
+    materialize_plan(db, BATCH, PLAN)
+
+    first = claim_jobs(db, BATCH, "worker-a", 4)
+    second = claim_jobs(db, BATCH, "worker-b", 4)
+    assert [j.seq for j in first] == [0, 1, 2, 3]
+    assert [j.seq for j in second] == [4, 5]
+    assert claim_jobs(db, BATCH, "worker-c", 4) == []
+
+    # worker-a crashes: once its leases lapse, another worker picks the jobs up
+    db.execute(update(QueryJob).where(QueryJob.worker_id == "worker-a")
+               .values(lease_expires_at=job_queue._now() - timedelta(seconds=1)))
+    db.commit()
+    reclaimed = claim_jobs(db, BATCH, "worker-c", 10)
+    assert [j.seq for j in reclaimed] == [0, 1, 2, 3]
+    assert all(j.attempts == 2 for j in reclaimed)
+
+    # the crashed worker can no longer settle jobs it lost
+    assert mark_done(db, first[0].id, "worker-a", "run-x") is False
+    db.rollback()
+    assert mark_done(db, reclaimed[0].id, "worker-c", "run-0") is True
+    db.commit()
+    assert batch_progress(db, BATCH) == {"done": 1, "running": 5}
+
+
+def test_failed_jobs_retry_until_max_attempts():
+    Session = _session_factory()
+    db = Session()
+    materialize_plan(db, BATCH, PLAN[:1], max_attempts=2)
+    job = claim_jobs(db, BATCH, "w", 1)[0]
+    assert mark_failed(db, job, "w", "boom") == "pending"
+    job = claim_jobs(db, BATCH, "w", 1)[0]
+    assert mark_failed(db, job, "w", "boom again") == "failed"
+    assert claim_jobs(db, BATCH, "w", 1) == []
+    assert find_unfinished_batch(db) is None
+
+
+def test_drain_resumes_and_splits_work(monkeypatch, tmp_path):
+    """Two workers drain one batch together; a restart after a crash only runs what is left."""
+    Session = _session_factory(f"sqlite:///{tmp_path / 'jobs.db'}")
+    db = Session()
+    materialize_plan(db, BATCH, PLAN)
+    # A previous worker finished seq 0 and 1 before crashing
+    for job in claim_jobs(db, BATCH, "crashed", 2):
+        mark_done(db, job.id, "crashed", f"run-{job.seq}")
+    db.commit()
+
+    executed = []
+    lock = threading.Lock()
+
+    def fake_execute(self, query_info):
+        with lock:
+            executed.append(query_info["query"])
+        if query_info["query"] == "query 3":
+            raise RuntimeError("429 Too Many Requests")
+        return {"id": f"run-{query_info['query']}", "ts": datetime(2025, 9, 1, 6), "links": [f"https://example.com/{query_info['query']}"]}
+
+    monkeypatch.setattr(QueryScheduler, "_execute_query", fake_execute)
+    monkeypatch.setattr(query_scheduler, "Run", _StubRun)
+    monkeypatch.setattr(query_scheduler, "get_db", lambda: iter([Session()]))
+
+    scheduler = QueryScheduler()
+    threads = [threading.Thread(target=scheduler.drain_job_queue, args=(BATCH, f"w{i}")) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"Executed: {sorted(executed)}")
+    assert "query 0" not in executed and "query 1" not in executed
+    # query 3 is retried until it runs out of attempts; everything else runs exactly once
+    assert sorted(q for q in executed if q != "query 3") == ["query 2", "query 4", "query 5"]
+    assert executed.count("query 3") == job_queue.DEFAULT_MAX_ATTEMPTS
+    assert batch_progress(Session(), BATCH) == {"done": 5, "failed": 1}
+    # Citation rows are committed with their run, so only completed runs have them
+    assert len(Session().scalars(select(RunCitation)).all()) == 3
+    assert Session().scalar(select(MetricsCube.runs)) == 3
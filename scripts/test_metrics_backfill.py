@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the daily_metrics backfill.
+Runs inline (workers=1) against a shared in-memory SQLite database; JSONB renders as JSON.
+"""
+
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import func, select
+
+from app.models.automated_run import AutomatedRun
+from app.models.data_version import DataVersion
+from app.models.metrics import DailyMetrics
+from app.models.metrics_dirty import DirtyMetricsPartition
+from app.services.metrics_backfill import backfill_daily_metrics, backfill_range, queue_backfill, split_range
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+START = date(2024, 12, 30)
+
+
+def _session_factory():
+    factory = sqlite_sessionmaker(AutomatedRun, DailyMetrics, DirtyMetricsPartition, DataVersion, shared=True, autoflush=False)
+    db = factory()
+    for i in range(10):
+        for engine_name in ("openai", "perplexity"):
+            db.add(AutomatedRun(
+                id=f"{engine_name}-{i}",
+                ts=datetime.combine(START + timedelta(days=i), datetime.min.time()) + timedelta(hours=9),
+                query="q",
+                engine=engine_name,
+                model="m",
+                extreme_mentioned=i % 2 == 0,
+                domains=["cisco.com"],
+                citation_count=1,
+            ))
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_split_range_covers_days_once():
+    assert split_range(date(2025, 1, 1), date(2025, 1, 10), 4) == [
+        (date(2025, 1, 1), date(2025, 1, 4)),
+        (date(2025, 1, 5), date(2025, 1, 8)),
+        (date(2025, 1, 9), date(2025, 1, 10)),
+    ]
+    assert split_range(date(2025, 1, 2), date(2025, 1, 1)) == []
+
+
+def test_backfill_reports_progress_and_fills_range():
+    factory = _session_factory()
+    reports = []
+    report = backfill_daily_metrics(
+        "automated_runs", START, START + timedelta(days=9), workers=1, partition_days=3,
+        progress=reports.append, session_factory=factory,
+    )
+    assert (report["queued"], report["partitions"], report["failed"], report["remaining"]) == (20, 20, 0, 0)
+    # 10 days x 2 engines x (overall + extreme_networks on even days, competitors on odd days)
+    assert report["metrics"] == 40
+    assert [r["ranges_done"] for r in reports] == [1, 2, 3, 4]
+
+    db = factory()
+    assert db.scalar(select(func.count()).select_from(DailyMetrics)) == 40
+    assert all(db.scalars(select(AutomatedRun.metrics_computed)))
+
+
+def test_interrupted_backfill_resumes_from_checkpoint():
+    factory = _session_factory()
+    end = START + timedelta(days=9)
+    db = factory()
+    assert queue_backfill(db, "automated_runs", START, end) == 20
+    # The first worker finishes before the process is interrupted
+    assert backfill_range("automated_runs", START, START + timedelta(days=2), factory)["partitions"] == 6
+
+    report = backfill_daily_metrics("automated_runs", START, end, workers=1, resume=True, session_factory=factory)
+    assert (report["queued"], report["pending"], report["partitions"], report["remaining"]) == (0, 14, 14, 0)
+    assert db.scalar(select(func.count(func.distinct(DailyMetrics.date)))) == 10
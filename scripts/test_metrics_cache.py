@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the /metrics response cache.
+Drives a cached endpoint through FastAPI's TestClient against an in-memory SQLite database.
+"""
+
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from fastapi import APIRouter, Depends, FastAPI, Query
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.data_version import DataVersion
+from app.services import metrics_cache
+from app.services.database import get_db
+from app.services.metrics_cache import MetricsResponseCache, bump_data_version, cached_metrics, etag_matches
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def _client(monkeypatch):
+    Session = sqlite_sessionmaker(DataVersion, shared=True)
+    cache = MetricsResponseCache(ttl_s=600, max_stale_s=3600)
+    monkeypatch.setattr(metrics_cache, "_cache", cache)
+    monkeypatch.setattr(metrics_cache, "SessionLocal", Session)
+
+    calls = []
+    router = APIRouter()
+
+    @router.get("/report")
+    @cached_metrics
+    def report(days: int = Query(30), engine: Optional[str] = Query(None), db: Session = Depends(get_db)):
+        calls.append((days, engine))
+        return {"days": days, "engine": engine, "computed": len(calls)}
+
+    app = FastAPI()
+    app.include_router(router)
+
+    def session_dependency():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = session_dependency
+    return TestClient(app), Session, cache, calls
+
+
+def test_repeat_loads_hit_and_revalidate(monkeypatch):
+    client, _, cache, calls = _client(monkeypatch)
+
+    first = client.get("/report", params={"days": 7, "engine": "openai"})
+    assert (first.status_code, first.headers["X-Cache"], first.json()["computed"]) == (200, "miss", 1)
+
+    again = client.get("/report", params={"engine": " openai", "days": "7"})
+    assert (again.headers["X-Cache"], again.json()) == ("hit", first.json())
+    assert client.get("/report", headers={"If-None-Match": first.headers["ETag"]}, params={"days": 7, "engine": "openai"}).status_code == 304
+    weak = f'"stale", W/{first.headers["ETag"]}'
+    assert client.get("/report", headers={"If-None-Match": weak}, params={"days": 7, "engine": "openai"}).status_code == 304
+
+    # Other parameters are a separate entry
+    assert client.get("/report", params={"days": 14}).headers["X-Cache"] == "miss"
+    assert len(calls) == 2
+    assert cache.stats()["not_modified"] == 2
+
+
+def test_data_version_bump_serves_stale_then_refreshes(monkeypatch):
+    client, Session, cache, calls = _client(monkeypatch)
+    etag = client.get("/report").headers["ETag"]
+
+    db = Session()
+    bump_data_version(db)
+    db.commit()
+
+    # The outdated entry answers (still 304 for its ETag) while a background task recomputes it
+    stale = client.get("/report", headers={"If-None-Match": etag})
+    assert (stale.status_code, stale.headers["X-Cache"]) == (304, "stale")
+    assert len(calls) == 2
+
+    fresh = client.get("/report", headers={"If-None-Match": etag})
+    assert (fresh.status_code, fresh.headers["X-Cache"], fresh.json()["computed"]) == (200, "hit", 2)
+    assert fresh.headers["ETag"] != etag
+
+    # Entries past the max-stale window are recomputed inline
+    bump_data_version(db)
+    db.commit()
+    cache.max_stale_s = 0
+    assert client.get("/report").headers["X-Cache"] == "miss"
+    assert len(calls) == 3
+
+
+def test_metrics_routes_keep_their_query_parameters():
+    from app.routes.metrics import router
+
+    route = next(r for r in router.routes if r.path == "/metrics/extreme-trends")
+    assert sorted(p.name for p in route.dependant.query_params) == ["days", "engine"]
+
+
+def test_if_none_match_lists_and_weak_validators():
+    """Proxies and browsers may send several validators or weak ones; any match revalidates."""
+    etag = '"abc123"'
+    assert etag_matches('"abc123"', etag)
+    assert etag_matches('W/"abc123"', etag)
+    assert etag_matches('"old", W/"abc123" ,"older"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"old", W/"abc1234"', etag)
+    assert not etag_matches(None, etag) and not etag_matches("", etag)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the metrics cube.
+Runs against an in-memory SQLite database (the ON CONFLICT upsert compiles there too), so folding
+runs in, window rollups, facets and rebuilds can be checked without Postgres.
+"""
+
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+
+from app.models.automated_run import AutomatedRun
+from app.models.data_version import DataVersion
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.metrics_dirty import DirtyMetricsPartition
+from app.models.run import Run
+from app.routes.runs import delete_run
+from app.services.metrics_cube import add_runs_to_cube, cube_rollup, facet_rollup, latency_bucket, latency_percentiles, rebuild_cube
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def _run(run_id, day, **overrides):
+    run = {
+        "id": run_id,
+        "ts": datetime(2025, 9, day, 12),
+        "engine": "openai",
+        "model": "gpt-4o",
+        "intent_category": "generic_intent",
+        "status": "completed",
+        "is_branded": False,
+        "extreme_mentioned": False,
+        "latency_ms": 800,
+        "input_tokens": 10,
+        "output_tokens": 20,
+        "cost_usd": 0.01,
+        "links": ["https://www.cisco.com/a", "https://cisco.com/b"],
+        "entities_normalized": [{"name": "Cisco"}, {"name": "Juniper"}],
+    }
+    run.update(overrides)
+    return run
+
+
+def _session():
+    return sqlite_sessionmaker(MetricsCube, MetricsCubeFacet, AutomatedRun, Run, DirtyMetricsPartition, DataVersion)()
+
+
+SCOPE = {"run_source": "automated_runs", "start_day": date(2025, 9, 1), "end_day": date(2025, 9, 30)}
+
+
+def test_runs_fold_in_additively():
+    """Separate write batches land in the same cells; windows sum cells and facets in SQL."""
+    db = _session()
+    add_runs_to_cube(db, "automated_runs", [_run("a", 1), _run("b", 1, extreme_mentioned=True, links=["https://extremenetworks.com/x"])])
+    add_runs_to_cube(db, "automated_runs", [
+        _run("c", 2, status="error", cost_usd=0, latency_ms=0, links=[], entities_normalized=[]),
+        _run("d", 2, engine="gpt-4o-search-preview", is_branded=True, latency_ms=40000),
+    ])
+    db.commit()
+
+    totals = cube_rollup(db, **SCOPE)[0]
+    assert (totals["runs"], totals["failures"], totals["brand_mentions"]) == (4, 1, 1)
+    assert (totals["citations"], totals["brand_citations"], totals["runs_with_links"]) == (5, 1, 3)
+    assert (totals["mention_citations"], totals["mention_domains"]) == (1, 1)
+    assert (totals["priced_runs"], totals["latency_runs"], totals["latency_ms_sum"]) == (3, 3, 41600)
+    assert round(totals["cost_usd"], 6) == 0.03
+
+    by_day = cube_rollup(db, group_by=("day",), **SCOPE)
+    assert [(row["day"], row["runs"]) for row in by_day] == [(date(2025, 9, 1), 2), (date(2025, 9, 2), 2)]
+    # openai matches legacy gpt-* engine values unless exact
+    assert cube_rollup(db, engine="openai", exact_engine=True, **SCOPE)[0]["runs"] == 3
+    assert cube_rollup(db, engine="openai", is_branded=False, **SCOPE)[0]["runs"] == 3
+
+    domains = facet_rollup(db, "domain", limit=1, **SCOPE)
+    assert domains == {"total": 2, "items": [{"value": "cisco.com", "hits": 4, "runs": 2, "rank_sum": 0}]}
+    entities = facet_rollup(db, "entity", **SCOPE)
+    assert [(e["value"], e["hits"], e["rank_sum"]) for e in entities["items"]] == [("Cisco", 3, 3), ("Juniper", 3, 6)]
+    assert latency_percentiles(db, (0.5, 0.95), **SCOPE) == {0.5: 1000, 0.95: 64000}
+
+
+def test_latency_bucket_bounds():
+    assert latency_bucket(250) == "250"
+    assert latency_bucket(251) == "500"
+    assert latency_bucket(10 ** 6) == "inf"
+
+
+def test_rebuild_replaces_day_from_parent_table():
+    """Rebuilding a day drops its cells and refolds the stored runs, so repeated rebuilds do not double count."""
+    db = _session()
+    for run in (_run("a", 1), _run("b", 1, extreme_mentioned=True), _run("c", 2)):
+        db.add(AutomatedRun(query="q", **run))
+    db.commit()
+    add_runs_to_cube(db, "automated_runs", [_run("a", 1)])  # stale partial state for day 1
+    db.commit()
+
+    assert rebuild_cube(db, "automated_runs", [date(2025, 9, 1)]) == 2
+    assert rebuild_cube(db, "automated_runs", [date(2025, 9, 1)]) == 2
+    db.commit()
+    day_one = cube_rollup(db, **{**SCOPE, "end_day": date(2025, 9, 1)})[0]
+    assert (day_one["runs"], day_one["brand_mentions"], day_one["citations"]) == (2, 1, 4)
+    # Day 2 was not rebuilt and never folded in
+    assert cube_rollup(db, **SCOPE)[0]["runs"] == 2
+
+
+def test_deleted_runs_leave_the_cube():
+    """Soft-deleting a run takes it out of its day's cells and facets; rebuilds keep it out."""
+    db = _session()
+    scope = {**SCOPE, "run_source": "runs"}
+    runs = []
+    for run_id, links in (("r1", ["https://cisco.com/a"]), ("r2", ["https://arista.com/a"])):
+        run = _run(run_id, 1, ts=datetime(2025, 9, 1, 12, tzinfo=timezone.utc), intent="generic_intent", links=links, deleted=False)
+        run.pop("intent_category")
+        db.add(Run(query="q", **run))
+        runs.append(run)
+    add_runs_to_cube(db, "runs", runs)
+    db.commit()
+    assert cube_rollup(db, **scope)[0]["runs"] == 2
+
+    delete_run("r2", db=db)
+    assert cube_rollup(db, **scope)[0]["runs"] == 1
+    assert [item["value"] for item in facet_rollup(db, "domain", **scope)["items"]] == ["cisco.com"]
+
+    assert rebuild_cube(db, "runs", [date(2025, 9, 1)]) == 1
@@ -144,6 +144,69 @@ def test_single_query():
         return None
 
 
+def test_concurrent_execution(monkeypatch):
+    """Concurrent execution keeps plan order, isolates errors and commits in batches."""
+    print("\n=== Testing Concurrent Execution ===")
+    import time
+    from app.services import query_scheduler
+
+    plan = [
+        {"query": f"query {i}", "engine": "openai" if i % 2 else "perplexity", "model": None, "intent": "generic_intent"}
+        for i in range(12)
+    ]
+
+    def fake_call_engine(engine, prompt, temperature, model=None):
+        time.sleep(0.05)
+        if prompt == "query 5":
+            raise RuntimeError("429 Too Many Requests")
+        return {"text": f"{prompt}: Cisco and Extreme Networks", "model": "stub", "latency_ms": 50}
+
+    class FakeSession:
+        def __init__(self):
+            self.commits = []
+            self.staged = []
+
+        def add_all(self, rows):
+            self.staged.extend(rows)
+
+        def add(self, row):
+            self.staged.append(row)
+
+        def execute(self, statement, params=None):
+            pass  # run_citations / run_entities inserts
+
+        def commit(self):
+            self.commits.append(len(self.staged))
+            self.staged = []
+
+        def rollback(self):
+            self.staged = []
+
+        def close(self):
+            pass
+
+    session = FakeSession()
+    monkeypatch.setattr(query_scheduler, "call_engine", fake_call_engine)
+    monkeypatch.setattr(query_scheduler, "get_db", lambda: iter([session]))
+    monkeypatch.setattr(QueryScheduler, "get_daily_queries", lambda self, target_date: list(plan))
+    monkeypatch.setenv("EGT_SCHEDULER_OPENAI_PARALLELISM", "6")
+    monkeypatch.setenv("EGT_SCHEDULER_PERPLEXITY_PARALLELISM", "6")
+
+    progress = []
+    started = time.perf_counter()
+    results = QueryScheduler().execute_daily_queries(
+        date.today(), batch_size=4, progress=lambda done, total, counts: progress.append(done)
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"12 queries in {elapsed:.2f}s, commits: {session.commits}")
+    assert [r["query"] for r in results] == [q["query"] for q in plan]
+    assert [r["status"] for r in results].count("error") == 1 and results[5]["status"] == "error"
+    assert sum(session.commits) == 11 and max(session.commits) <= 4
+    assert progress == list(range(1, 13))
+    assert elapsed < 0.5
+
+
 def main():
     """Main test function."""
     print("🚀 Testing Query Scheduler")
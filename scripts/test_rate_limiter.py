@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-provider rate limiter.
+Simulates 429s and slow calls locally; no API keys needed.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services.rate_limiter import RateLimiter, classify_error
+
+
+class _FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+class _FakeStatusError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _FakeResponse(status_code, retry_after)
+
+
+def test_classify_error():
+    """429 and 5xx are throttling signals, 4xx are not."""
+    assert classify_error(_FakeStatusError(429, "2")) == ("throttle", 2.0)
+    assert classify_error(_FakeStatusError(503))[0] == "throttle"
+    assert classify_error(_FakeStatusError(400))[0] is None
+    assert classify_error(ValueError("bad"))[0] is None
+
+
+def test_throttle_retries_and_halves_concurrency():
+    """A 429 is retried after Retry-After and halves the window; success ramps it back up."""
+    limiter = RateLimiter("test", rpm=6000, tpm=1_000_000, max_concurrency=8)
+    start_window = limiter.concurrency
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise _FakeStatusError(429, "0.05")
+        return {"input_tokens": 10, "output_tokens": 20}
+
+    result = limiter.call(flaky, 100, lambda r: r["input_tokens"] + r["output_tokens"])
+    stats = limiter.snapshot()
+    print(f"Limiter after throttling: {stats}")
+    assert result["output_tokens"] == 20
+    assert len(attempts) == 3
+    assert stats["throttled"] == 2 and stats["succeeded"] == 1
+    assert limiter.concurrency < start_window
+
+    before = limiter.concurrency
+    for _ in range(5):
+        limiter.call(lambda: {}, 10)
+    assert limiter.concurrency > before
+
+
+def test_non_retryable_errors_raise_immediately():
+    limiter = RateLimiter("test", rpm=6000, tpm=1_000_000, max_concurrency=4)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise _FakeStatusError(400)
+
+    try:
+        limiter.call(bad_request, 10)
+        assert False, "expected the 400 to propagate"
+    except _FakeStatusError:
+        pass
+    assert len(calls) == 1
+    assert limiter.snapshot()["failed"] == 1 and limiter.in_flight == 0
+
+
+def test_concurrency_window_is_enforced():
+    """No more calls run at once than the current window allows."""
+    limiter = RateLimiter("test", rpm=60000, tpm=10_000_000, max_concurrency=2)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def slow():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: limiter.call(slow, 10), range(8)))
+    assert peak[0] == 2
+
+
+def test_request_bucket_paces_bursts():
+    """Calls beyond the burst capacity wait for the bucket to refill."""
+    limiter = RateLimiter("test", rpm=600, tpm=1_000_000, max_concurrency=50)  # 10/s, burst of 100
+    limiter.requests.level = 2
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.call(lambda: {}, 1)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_stream_and_engine_calls_share_a_limiter():
+    """The streaming route keys its limiter on the resolved model id, like the engine layer."""
+    from app.routes.query import _rate_limited
+    from app.services.engines import _limiter_for
+
+    leases = []
+    list(_rate_limited("openai", "gpt-5-nano-2025-08-07", "hello", lambda lease: iter([leases.append(lease)])))
+    assert leases[0].limiter is _limiter_for("openai", "gpt-5-mini")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the historical re-extraction job.
+Runs against an in-memory SQLite database with a thread pool in place of the process pool;
+JSONB columns are rendered as SQLite JSON.
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+from app.models.data_version import DataVersion
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.metrics_dirty import DirtyMetricsPartition
+from app.models.run import Run
+from app.models.run_citation import RunCitation
+from app.models.run_entity import RunEntity
+
+import reextract_runs
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def test_reextract_refreshes_citations_and_skips_failed_runs(monkeypatch):
+    """Successful runs get links and citations_enriched from the new extraction; error rows are left alone."""
+    Session = sqlite_sessionmaker(Run, RunCitation, RunEntity, MetricsCube, MetricsCubeFacet, DirtyMetricsPartition, DataVersion, shared=True)
+    ts = datetime(2025, 9, 1, 12, tzinfo=timezone.utc)
+    stale = [{"url": "https://old.example.com", "domain": "old.example.com", "rank": 1, "title": "Old"}]
+    with Session() as db:
+        db.add(Run(id="ok", ts=ts, engine="openai", query="q", status="ok", citations_enriched=stale,
+                   raw_excerpt="Cisco and Extreme Networks, see https://www.cisco.com/wifi?utm_source=x"))
+        db.add(Run(id="err", ts=ts, engine="openai", query="q", status="error", citations_enriched=stale,
+                   raw_excerpt="Error: 429 from https://api.openai.com/v1/responses"))
+        db.commit()
+
+    monkeypatch.setattr(reextract_runs, "SessionLocal", Session)
+    job = reextract_runs.ReextractionJob(batch_size=10)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert job.reextract_table("runs", pool) == 1
+
+    with Session() as db:
+        ok, err = db.get(Run, "ok"), db.get(Run, "err")
+        assert ok.links == ["https://www.cisco.com/wifi?utm_source=x"]
+        assert ok.citations_enriched == [{"url": "https://cisco.com/wifi", "domain": "cisco.com", "rank": 1, "title": None}]
+        assert ok.extreme_mentioned
+        assert err.links == [] and err.citations_enriched == stale
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the engine response cache.
+Uses the in-memory backend and a stand-in adapter, so no API keys or database are needed.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services import engines, response_cache
+from app.services.response_cache import MemoryCacheBackend, ResponseCache, cache_key, cadence_ttl_s
+
+
+def _fresh_cache(monkeypatch, ttl_s=60):
+    cache = ResponseCache(MemoryCacheBackend(max_entries=10), ttl_s=ttl_s)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
+
+
+def _counting_adapter(monkeypatch):
+    calls = []
+
+    def fake_run_query(prompt, temperature=0.2, model="sonar"):
+        calls.append(prompt)
+        return {"choices": [{"message": {"content": "Cisco leads, see https://cisco.com"}}], "model": "sonar",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 20, "cost_usd": 0.01}}
+
+    monkeypatch.setattr(engines.perplexity_adapter, "run_query", fake_run_query)
+    return calls
+
+
+def test_identical_queries_hit_cache(monkeypatch):
+    """A repeated query (modulo case/whitespace) is served from cache at zero cost."""
+    cache = _fresh_cache(monkeypatch)
+    calls = _counting_adapter(monkeypatch)
+
+    first = engines.call_engine("perplexity", "Best WiFi vendors", 0.2, prompt_version="v1", use_cache=True)
+    second = engines.call_engine("perplexity", "  best wifi   vendors ", 0.2, prompt_version="v1", use_cache=True)
+    print(f"Cache stats: {cache.stats()}")
+    assert len(calls) == 1
+    assert second["text"] == first["text"]
+    assert second["cached"] is True and second["cost_usd"] == 0.0
+    assert (first["input_tokens"], first["output_tokens"]) == (10, 20)
+    assert (second["input_tokens"], second["output_tokens"]) == (0, 0)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_force_and_key_changes_bypass_cache(monkeypatch):
+    """use_cache=False (force) and a different temperature/prompt_version/model all call the engine."""
+    _fresh_cache(monkeypatch)
+    calls = _counting_adapter(monkeypatch)
+
+    engines.call_engine("perplexity", "Best WiFi vendors", 0.2, prompt_version="v1", use_cache=True)
+    engines.call_engine("perplexity", "Best WiFi vendors", 0.2, prompt_version="v1", use_cache=False)
+    engines.call_engine("perplexity", "Best WiFi vendors", 0.5, prompt_version="v1", use_cache=True)
+    engines.call_engine("perplexity", "Best WiFi vendors", 0.2, prompt_version="v2", use_cache=True)
+    engines.call_engine("perplexity", "Best WiFi vendors", 0.2, model="sonar-pro", prompt_version="v1", use_cache=True)
+    assert len(calls) == 5
+    assert cache_key("perplexity", "sonar", "q", 0.2, "v1", "a") != cache_key("perplexity", "sonar", "q", 0.2, "v1", "b")
+
+
+def test_memory_backend_expiry_and_lru():
+    """Entries expire after the TTL and the least recently used entry is evicted first."""
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", {"text": "a"}, 60, "perplexity", "sonar")
+    backend.set("b", {"text": "b"}, 60, "perplexity", "sonar")
+    assert backend.get("a") == {"text": "a"}
+    backend.set("c", {"text": "c"}, 60, "perplexity", "sonar")
+    assert backend.get("b") is None and backend.get("a") is not None
+
+    backend.set("d", {"text": "d"}, 0, "perplexity", "sonar")
+    time.sleep(0.01)
+    assert backend.get("d") is None
+
+
+def test_default_ttl_follows_scheduler_cadence(tmp_path):
+    """The TTL is one cycle of the configured cadence; unknown or unreadable configs fall back to a day."""
+    config = tmp_path / "system_queries.json"
+    config.write_text('{"schedule": {"cadence": "every_3_days"}}')
+    assert cadence_ttl_s(config) == 3 * 24 * 3600
+    config.write_text('{"schedule": {"cadence": "daily"}}')
+    assert cadence_ttl_s(config) == 24 * 3600
+    assert cadence_ttl_s(tmp_path / "missing.json") == 24 * 3600
+    # The shipped schedule parses
+    assert cadence_ttl_s() == 3 * 24 * 3600
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for write-time normalization into run_citations / run_entities.
+Runs against an in-memory SQLite database, so no Postgres is needed.
+"""
+
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import select
+
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.run_citation import RunCitation
+from app.models.run_entity import RunEntity
+from app.services.run_children import child_rows, write_run_children
+from _sqlite_testdb import sqlite_sessionmaker
+
+RUN = {
+    "id": "run_openai_1",
+    "ts": datetime(2025, 9, 1, 14, 0, tzinfo=timezone.utc),
+    "links": ["https://www.Cisco.com/wifi", {"url": "https://een.extremenetworks.com/t/1"}, "", 42],
+    "vendors": [],
+    "entities_normalized": [{"name": "Cisco", "first_pos": 3}, {"name": "Extreme Networks", "first_pos": 40}, {"name": ""}],
+}
+
+
+def _session():
+    return sqlite_sessionmaker(RunCitation, RunEntity, MetricsCube, MetricsCubeFacet)()
+
+
+def test_child_rows_normalize_links_and_entities():
+    """Domains drop www., brand subdomains are flagged, ranks keep list positions and bad elements are skipped."""
+    citations, entities = child_rows("runs", RUN)
+    assert [(c["rank"], c["domain"], c["is_brand_domain"]) for c in citations] == [
+        (1, "cisco.com", False),
+        (2, "een.extremenetworks.com", True),
+    ]
+    assert citations[0]["ts"] == datetime(2025, 9, 1, 14, 0) and citations[0]["ts"].tzinfo is None
+    # vendors is empty on scheduled runs, so entities come from entities_normalized
+    assert [(e["rank"], e["name"], e["first_pos"], e["is_brand"]) for e in entities] == [
+        (1, "Cisco", 3, False),
+        (2, "Extreme Networks", 40, True),
+    ]
+
+
+def test_child_rows_accept_json_string_columns():
+    """Older automated_runs rows hold JSON arrays serialized as strings."""
+    run = {"id": "a1", "ts": datetime(2025, 9, 1), "links": '["https://juniper.net/a"]', "entities_normalized": '[{"name": "Juniper"}]'}
+    citations, entities = child_rows("automated_runs", run)
+    assert [c["domain"] for c in citations] == ["juniper.net"]
+    assert [e["name"] for e in entities] == ["Juniper"]
+
+
+def test_write_run_children_replace():
+    """New runs append child rows; re-extraction replaces them instead of duplicating."""
+    db = _session()
+    write_run_children(db, "runs", [RUN])
+    db.commit()
+    assert len(db.scalars(select(RunCitation)).all()) == 2
+    assert len(db.scalars(select(RunEntity)).all()) == 2
+
+    write_run_children(db, "runs", [{**RUN, "links": ["https://arista.com"]}], replace=True)
+    db.commit()
+    assert [c.domain for c in db.scalars(select(RunCitation)).all()] == ["arista.com"]
+    assert len(db.scalars(select(RunEntity)).all()) == 2
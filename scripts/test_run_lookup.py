@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for POST /runs/lookup matching.
+Runs against an in-memory SQLite database (trigram similarity is computed in Python there);
+JSONB columns are rendered as SQLite JSON.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import insert, select
+
+from app.models.run import Run
+from app.services.run_lookup import lookup_runs, normalize_query, trigram_similarity, window_start
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def _session():
+    db = sqlite_sessionmaker(Run)()
+    now = datetime.now(timezone.utc)
+
+    def run(run_id, query, engine, minutes_ago):
+        return {"id": run_id, "ts": now - timedelta(minutes=minutes_ago), "engine": engine, "query": query, "status": "ok"}
+
+    db.add(Run(**run("old-openai", "Best Wi-Fi 7 access point for campus?", "openai", 30)))
+    # Bulk inserts (the run writer's path) fill query_norm too
+    db.execute(insert(Run), [
+        run("new-openai", "best wifi 7 access point for campus", "openai", 10),
+        run("perplexity", '"BEST wi-fi 7, access point for campus"', "perplexity", 20),
+        run("other", "top firewall vendors", "openai", 5),
+        run("last-week", "best SASE vendor", "openai", 6 * 24 * 60),
+    ])
+    db.commit()
+    return db
+
+
+def test_normalized_query_is_stored_on_insert():
+    db = _session()
+    assert normalize_query('  "Best Wi-Fi 7,   access point?" ') == "best wi fi 7 access point"
+    assert db.scalar(select(Run.query_norm).where(Run.id == "perplexity")) == "best wi fi 7 access point for campus"
+    assert db.scalar(select(Run.query_norm).where(Run.id == "new-openai")) == "best wifi 7 access point for campus"
+
+
+def test_exact_then_fuzzy_latest_per_engine():
+    db = _session()
+    exact = lookup_runs(db, "best wi-fi 7 access point for CAMPUS!", lookback_hours=1)
+    assert [(m["id"], m["engine"]) for m in exact] == [("perplexity", "perplexity"), ("old-openai", "openai")]
+    assert [m["id"] for m in lookup_runs(db, "best wi-fi 7 access point for campus", engines=["openai"], lookback_hours=1)] == ["old-openai"]
+
+    # No exact match: near-duplicates by trigram similarity, most recent first
+    fuzzy = lookup_runs(db, "best wifi 7 access points for campus", lookback_hours=1)
+    assert [m["id"] for m in fuzzy] == ["new-openai", "perplexity"]
+    assert lookup_runs(db, "cheapest campus switches", lookback_hours=1) == []
+
+
+def test_lookback_window():
+    db = _session()
+    assert lookup_runs(db, "best sase vendor", lookback_hours=1) == []
+    assert [m["id"] for m in lookup_runs(db, "best sase vendor", lookback_hours=7 * 24)] == ["last-week"]
+
+    # Default window is the current UTC day; look-back is capped at 30 days
+    now = datetime(2025, 9, 10, 15, 30, tzinfo=timezone.utc)
+    assert window_start(now=now) == datetime(2025, 9, 10, tzinfo=timezone.utc)
+    assert window_start(10_000, now=now) == now - timedelta(days=30)
+
+
+def test_trigram_similarity_matches_pg_trgm():
+    # Documented pg_trgm example: similarity('word', 'two words') = 0.363636
+    assert round(trigram_similarity("word", "two words"), 6) == 0.363636
+    assert trigram_similarity("", "anything") == 0.0
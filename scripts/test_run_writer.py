@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for write-behind run persistence.
+Uses an in-memory sink in place of Postgres, so batching, retries and draining can be checked without a database;
+the real multi-row insert is checked against in-memory SQLite (JSONB rendered as SQLite JSON).
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import select
+
+from app.models.data_version import DataVersion
+from app.models.metrics_cube import MetricsCube, MetricsCubeFacet
+from app.models.metrics_dirty import DirtyMetricsPartition
+from app.models.run import Run
+from app.models.run_citation import RunCitation
+from app.models.run_entity import RunEntity
+from app.services.db_writer import run_values
+from app.services.run_query import make_run_id
+from app.services.run_writer import RunWriteBehind, insert_runs
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+class _MemorySink:
+    """Mimics INSERT ... ON CONFLICT (id) DO NOTHING."""
+
+    def __init__(self, fail_times=0):
+        self.rows = {}
+        self.batches = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self._lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("connection refused")
+            self.batches.append(len(rows))
+            inserted = 0
+            for row in rows:
+                if row["id"] not in self.rows:
+                    self.rows[row["id"]] = row
+                    inserted += 1
+            return inserted
+
+
+def _row(i):
+    return run_values({
+        "run_id": f"run_openai_{i}", "ts": "2025-09-01T12:00:00Z", "engine": "openai", "model": "gpt-4o",
+        "query": "best wifi vendors vs cisco", "intent": "generic_intent", "status": "ok", "vendors": [], "links": [],
+    })
+
+
+def test_flushes_in_batches_by_size():
+    """A full batch is written as one multi-row insert without waiting for the timer."""
+    sink = _MemorySink()
+    writer = RunWriteBehind(sink=sink, batch_size=10, flush_ms=60_000)
+    for i in range(25):
+        writer.submit(_row(i))
+    time.sleep(0.2)
+    print(f"Batches so far: {sink.batches}")
+    assert sink.batches and sink.batches[0] >= 10
+    writer.close()
+    assert len(sink.rows) == 25
+    assert all(n <= 10 for n in sink.batches)
+    assert writer.stats()["pending"] == 0
+
+
+def test_flushes_on_timer():
+    """A partial batch is written once the oldest row has waited flush_ms."""
+    sink = _MemorySink()
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=50)
+    writer.submit(_row(1))
+    assert writer.pending("run_openai_1")
+    deadline = time.time() + 2
+    while writer.pending("run_openai_1") and time.time() < deadline:
+        time.sleep(0.01)
+    assert "run_openai_1" in sink.rows
+    writer.close()
+
+
+def test_exactly_once_per_run_id():
+    """Re-submitting an id, buffered or already written, never produces a second row."""
+    sink = _MemorySink()
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=60_000)
+    writer.submit(_row(1))
+    writer.submit(_row(1))
+    writer.flush()
+    writer.submit(_row(1))
+    writer.close()
+    stats = writer.stats()
+    print(f"Writer stats: {stats}")
+    assert len(sink.rows) == 1
+    # The buffered re-submission and the already-stored one are both counted
+    assert stats["written"] == 1 and stats["duplicates"] == 2
+
+
+def test_run_ids_unique_within_one_millisecond():
+    """Concurrent runs on one engine get distinct ids, so the writer never skips a real run."""
+    ids = {make_run_id("openai") for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(run_id.startswith("run_openai_") for run_id in ids)
+
+
+def test_failed_batch_is_retried_row_by_row():
+    """A failed multi-row insert is retried one row at a time within the same flush."""
+    sink = _MemorySink(fail_times=1)
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=60_000)
+    for i in range(3):
+        writer.submit(_row(i))
+    assert writer.flush() == 3
+    assert sorted(sink.rows) == ["run_openai_0", "run_openai_1", "run_openai_2"]
+    assert sink.batches == [1, 1, 1]
+    writer.close()
+    assert writer.stats()["errors"] == 1
+
+    # Submissions after close are written inline instead of being dropped
+    writer.submit(_row(9))
+    assert "run_openai_9" in sink.rows
+
+
+class _PoisonSink(_MemorySink):
+    """Rejects any batch containing one bad id, like a constraint violation on that row."""
+
+    def __init__(self, bad_id):
+        super().__init__()
+        self.bad_id = bad_id
+
+    def __call__(self, rows):
+        if any(row["id"] == self.bad_id for row in rows):
+            raise ValueError("A string literal cannot contain NUL (0x00) characters.")
+        return super().__call__(rows)
+
+
+def test_bad_row_is_isolated_and_dropped_after_max_attempts():
+    """One row that always fails neither blocks later runs nor stays buffered forever."""
+    sink = _PoisonSink("run_openai_1")
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=60_000, max_attempts=3)
+    for i in range(3):
+        writer.submit(_row(i))
+    assert writer.flush() == 2
+    assert sorted(sink.rows) == ["run_openai_0", "run_openai_2"]
+    assert writer.pending("run_openai_1")
+
+    writer.submit(_row(3))
+    writer.flush()
+    assert "run_openai_3" in sink.rows and writer.pending("run_openai_1")
+    writer.flush()
+    stats = writer.stats()
+    print(f"Writer stats: {stats}")
+    assert not writer.pending("run_openai_1")
+    assert stats["dropped"] == 1 and stats["pending"] == 0
+
+
+def test_close_drops_rows_still_failing():
+    """Shutdown writes every good row and logs the ones that still fail instead of hanging on them."""
+    sink = _PoisonSink("run_openai_0")
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=60_000)
+    for i in range(2):
+        writer.submit(_row(i))
+    writer.close()
+    assert sorted(sink.rows) == ["run_openai_1"]
+    assert writer.stats()["dropped"] == 1 and writer.stats()["pending"] == 0
+
+
+def test_failed_rows_back_off_before_timer_retry():
+    """A failed row is not retried on every flush_ms tick."""
+    sink = _PoisonSink("run_openai_0")
+    writer = RunWriteBehind(sink=sink, batch_size=100, flush_ms=50, max_attempts=10)
+    writer.submit(_row(0))
+    time.sleep(0.5)
+    errors = writer.stats()["errors"]
+    writer.close()
+    # Attempts at ~50, 150, 350ms (then 750ms); a fixed 50ms timer would have made ~10
+    assert 1 <= errors <= 4
+
+
+def test_run_values_shape():
+    """Every row carries the same columns so batches can be one multi-row insert."""
+    values = _row(1)
+    assert values["id"] == "run_openai_1"
+    assert values["is_branded"] is True and values["source"] == "manual" and values["deleted"] is False
+    assert values["ts"].tzinfo is not None
+
+
+
+def test_insert_runs_multi_row():
+    """The real sink writes a multi-row batch (query_norm included) and skips ids already in the table."""
+    Session = sqlite_sessionmaker(Run, RunCitation, RunEntity, MetricsCube, MetricsCubeFacet, DirtyMetricsPartition, DataVersion)
+
+    rows = [_row(i) for i in range(3)]
+    rows[0]["links"] = ["https://www.cisco.com/wifi"]
+    assert insert_runs(rows, session_factory=Session) == 3
+    assert insert_runs(rows[:1], session_factory=Session) == 0
+
+    with Session() as db:
+        norms = set(db.scalars(select(Run.query_norm)))
+        citations = db.scalars(select(RunCitation.domain)).all()
+    assert norms == {"best wifi vendors vs cisco"}
+    assert citations == ["cisco.com"]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent, cached citation title enrichment.
+Fetches go to an httpx MockTransport; url_metadata lives in an in-memory SQLite database.
+"""
+
+import asyncio
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from sqlalchemy import update
+
+from app.models.url_metadata import UrlMetadata
+from app.services import url_metadata
+from app.services.url_metadata import enrich_citations, resolve_titles
+from _sqlite_testdb import sqlite_sessionmaker
+
+
+def _setup(monkeypatch):
+    db = sqlite_sessionmaker(UrlMetadata)()
+
+    requests = Counter()
+    in_flight = Counter()
+    peak = Counter()
+
+    async def handler(request):
+        host = request.url.host
+        requests[str(request.url)] += 1
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        try:
+            await asyncio.sleep(0.02)
+            if host == "slow.com":
+                raise httpx.ConnectTimeout("timed out", request=request)
+            if host == "gone.com":
+                return httpx.Response(404)
+            return httpx.Response(200, html=f"<html><head><title>  Page {request.url.path} </title></head></html>")
+        finally:
+            in_flight[host] -= 1
+
+    monkeypatch.setattr(url_metadata, "_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return db, requests, peak
+
+
+def test_titles_fetched_concurrently_once_per_url(monkeypatch):
+    db, requests, peak = _setup(monkeypatch)
+    urls = [f"https://site.com/{i}" for i in range(6)] + ["https://gone.com/x", "https://slow.com/y"]
+
+    titles = resolve_titles(db, urls)
+    assert titles["https://site.com/3"] == "Page /3"
+    assert titles["https://gone.com/x"] is None and titles["https://slow.com/y"] is None
+    # Same-host fetches overlap but stay within the per-host limit
+    assert peak["site.com"] == url_metadata.PER_HOST_LIMIT
+    assert db.get(UrlMetadata, "https://slow.com/y").error == "timeout"
+    assert db.get(UrlMetadata, "https://gone.com/x").status_code == 404
+
+    # Titles and failures are both cached: a second run citing the same URLs fetches nothing
+    assert resolve_titles(db, urls) == titles
+    assert sum(requests.values()) == len(urls)
+
+    # Failures expire first and are retried on their own
+    assert db.get(UrlMetadata, "https://gone.com/x").expires_at < db.get(UrlMetadata, "https://site.com/0").expires_at
+    db.execute(update(UrlMetadata).where(UrlMetadata.title.is_(None)).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    resolve_titles(db, urls)
+    assert requests["https://gone.com/x"] == 2 and requests["https://site.com/0"] == 1
+
+
+def test_enrich_citations_normalizes_and_titles_first_links(monkeypatch):
+    db, requests, _ = _setup(monkeypatch)
+    links = ["https://www.site.com/a?utm_source=x", "https://site.com/a", "https://site.com/b", None, "https://site.com/c"]
+
+    citations = enrich_citations(links, max_titles=2, db=db)
+    assert [(c["url"], c["rank"], c["title"]) for c in citations] == [
+        ("https://site.com/a", 1, "Page /a"),
+        ("https://site.com/b", 3, "Page /b"),
+        ("https://site.com/c", 5, None),
+    ]
+    # Write-time enrichment never fetches
+    assert enrich_citations(["https://site.com/d"], max_titles=0)[0]["title"] is None
+    assert sum(requests.values()) == 2
+
+
+def test_streamed_fetch_stops_at_title_and_skips_non_html(monkeypatch):
+    db, _, _ = _setup(monkeypatch)
+    read = Counter()
+
+    async def body(name, *head, chunks=1000):
+        # A huge page: the title sits in the first chunks, then megabytes of filler follow
+        for chunk in head:
+            read[name] += 1
+            yield chunk
+        for _ in range(chunks):
+            read[name] += 1
+            yield b"x" * 65536
+
+    async def handler(request):
+        path = request.url.path
+        if path == "/big":
+            return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=body(path, b"<html><head><TITLE>Big \xe2\x9c\x93</TI", b"TLE></head>"))
+        if path == "/latin1":
+            return httpx.Response(200, headers={"content-type": "text/html; charset=iso-8859-1"}, content=body(path, b"<title>Caf\xe9</title>"))
+        if path == "/meta":
+            return httpx.Response(200, headers={"content-type": "text/html"}, content=body(path, b'<meta charset="windows-1252"><title>Na\xefve</title>'))
+        if path == "/notitle":
+            return httpx.Response(200, headers={"content-type": "text/html"}, content=body(path, b"<html>", chunks=100))
+        return httpx.Response(200, headers={"content-type": "application/pdf"}, content=body(path, b"%PDF-1.7"))
+
+    monkeypatch.setattr(url_metadata, "_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    urls = [f"https://files.com/{name}" for name in ("big", "latin1", "meta", "notitle", "report.pdf")]
+    titles = resolve_titles(db, urls)
+
+    assert [titles[url] for url in urls] == ["Big ✓", "Café", "Naïve", None, None]
+    # The tag split across chunks is found in the second one; nothing after it is read
+    assert read["/big"] == 2 and read["/latin1"] == 1
+    # Pages without a title stop at the byte cap; non-HTML bodies are never read
+    assert read["/notitle"] * 65536 <= url_metadata.MAX_TITLE_BYTES + 65536
+    assert read["/report.pdf"] == 0
+    assert db.get(UrlMetadata, "https://files.com/report.pdf").error == "not_html"